@@ -1,9 +1,13 @@
 import json
 from auto_llama.agent import Agent
+from auto_llama.long_term_memory import LongTermMemory
 import auto_llama.const as const
 from auto_llama.utils import print_pretty
 from auto_llama.actions import run_command
+from llama_agi.completion_cache import CachedChatModel, enable_completion_cache
+from llama_agi.scheduler import LLMScheduler, ScheduledChatModel, ScheduledEmbedding
 from langchain.chat_models import ChatOpenAI
+from llama_index.embeddings.openai import OpenAIEmbedding
 
 import logging
 
@@ -15,17 +19,38 @@ def main():
     # import os
     # os.environ["OPENAI_API_KEY"] = 'YOUR OPENAI API KEY'
 
-    openaichat = ChatOpenAI(
-        model_name="gpt-4",
-        temperature=0.0,
-        max_tokens=400,
+    if const.COMPLETION_CACHE_PATH:
+        enable_completion_cache(const.COMPLETION_CACHE_PATH)
+    # every LLM and embedding call goes through the scheduler, which retries
+    # failed calls itself; cached completions skip it
+    scheduler = LLMScheduler(
+        requests_per_minute=const.REQUESTS_PER_MINUTE,
+        tokens_per_minute=const.TOKENS_PER_MINUTE,
+    )
+    openaichat = CachedChatModel(
+        llm=ScheduledChatModel(
+            llm=ChatOpenAI(
+                model_name="gpt-4",
+                temperature=0.0,
+                max_tokens=400,
+                max_retries=1,
+            ),
+            scheduler=scheduler,
+        )
     )
 
     user_query = input("Enter what you would like AutoLlama to do:\n")
     if user_query == "":
         user_query = "Summarize the financial news from the past week."
         print("I will summarize the financial news from the past week.\n")
-    agent = Agent(const.DEFAULT_AGENT_PREAMBLE, user_query, openaichat)
+    agent = Agent(
+        const.DEFAULT_AGENT_PREAMBLE,
+        user_query,
+        openaichat,
+        long_term_memory=LongTermMemory(
+            embed_model=ScheduledEmbedding(OpenAIEmbedding(), scheduler)
+        ),
+    )
     while True:
         print("Thinking...")
         response = agent.get_response()
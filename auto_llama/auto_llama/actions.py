@@ -1,23 +1,28 @@
+import hashlib
 import json
-import os
+from concurrent.futures import ThreadPoolExecutor
 
-from duckduckgo_search import ddg
-from llama_index.readers.web import BeautifulSoupWebReader
 from llama_index import GPTListIndex
 from auto_llama.data_models import Response
-from typing import Dict
+from typing import Dict, List
 from auto_llama.const import SEARCH_RESULTS_TEMPLATE, format_web_download
 from llama_index import Document
-from llama_index.indices.composability import ComposableGraph
-from llama_index import GPTListIndex, LLMPredictor, ServiceContext
+from llama_index import GPTListIndex, ServiceContext
 from langchain.llms.base import BaseLLM
 from llama_index.logger import LlamaLogger
+from auto_llama.summary_cache import get_web_summary_cache
+from llama_agi.completion_cache import CachedLLMPredictor
+from auto_llama.index_cache import index_cache
+from llama_agi.scheduler import Priority, prioritized
+from auto_llama.search import get_web_search
+from auto_llama.storage import get_index_path, save_index
+from auto_llama.web import DEFAULT_TIMEOUT, fetch_web_documents
 
 
 def run_command(user_query: str, command: str, args: Dict, llm: BaseLLM) -> str:
     llama_logger = LlamaLogger()
     service_context = ServiceContext.from_defaults(
-        llm_predictor=LLMPredictor(llm), llama_logger=llama_logger
+        llm_predictor=CachedLLMPredictor(llm), llama_logger=llama_logger
     )
     if command == "search":
         search_terms = args["search_terms"]
@@ -38,35 +43,12 @@ def run_command(user_query: str, command: str, args: Dict, llm: BaseLLM) -> str:
         if isinstance(url, list):
             if len(url) != len(doc_name):
                 raise ValueError("url and doc_name must have the same length")
-            results = []
-            if os.path.exists("data/web_summary_cache.json"):
-                with open("data/web_summary_cache.json", "r") as f:
-                    web_summary_cache = json.load(f)
-            else:
-                web_summary_cache = {}
-            for i in range(len(url)):
-                web_summary = download_web(url[i], doc_name[i], service_context)
-                results.append(format_web_download(url[i], doc_name[i], web_summary))
-                web_summary_cache[doc_name[i]] = web_summary
-            print("Writing web summary cache to file")
-
-            with open("data/web_summary_cache.json", "w") as f:
-                json.dump(web_summary_cache, f)
+            results = download_web_many(url, doc_name, service_context)
             response = "\n".join(results)
             print(response)
             return response
         else:
-            if os.path.exists("data/web_summary_cache.json"):
-                with open("data/web_summary_cache.json", "r") as f:
-                    web_summary_cache = json.load(f)
-            else:
-                web_summary_cache = {}
             web_summary = download_web(url, doc_name, service_context)
-            web_summary_cache[doc_name] = web_summary
-            print("Writing web summary cache to file")
-
-            with open("data/web_summary_cache.json", "w") as f:
-                json.dump(web_summary_cache, f)
             response = format_web_download(url, doc_name, web_summary)
             print(response)
             return response
@@ -86,70 +68,114 @@ def run_command(user_query: str, command: str, args: Dict, llm: BaseLLM) -> str:
 
 
 def search_web(search_terms, max_results=5):
-    """Search the Web and obtain a list of web results."""
-    results = ddg(search_terms, max_results=max_results)
+    """Search the Web and obtain a list of web results.
+
+    search_terms may hold several queries, which are searched concurrently.
+    Their results are merged and deduplicated by URL, and cached for an hour.
+    """
+    results = get_web_search().search(search_terms, max_results=max_results)
     return results
 
 
+@prioritized(Priority.SUMMARIZATION)
 def analyze_search_results(user_query, search_terms, results, service_context):
     """Analyze the results of the search using llm."""
     doc = Document(json.dumps(results))
     index = GPTListIndex.from_documents([doc], service_context=service_context)
-    response = index.query(
+    response = index.as_query_engine().query(
         SEARCH_RESULTS_TEMPLATE.format(search_terms=search_terms, user_query=user_query)
     )
     return response.response
 
 
-def download_web(url: str, doc_name: str, service_context: ServiceContext):
+@prioritized(Priority.SUMMARIZATION)
+def download_web(
+    url: str,
+    doc_name: str,
+    service_context: ServiceContext,
+    timeout: float = DEFAULT_TIMEOUT,
+    use_async: bool = True,
+):
     """Download the html of the url and save a reference under doc_name.
     Return the summary of the web page.
+
+    The summary is stored in the web summary cache. If the page content is
+    unchanged since it was last summarized, the cached summary is reused.
     """
-    reader = BeautifulSoupWebReader()
-    docs = reader.load_data([url])
+    docs = fetch_web_documents(url, timeout=timeout)
     index = GPTListIndex.from_documents(docs, service_context=service_context)
-    if not os.path.exists("data"):
-        os.mkdir("data")
-    index.save_to_disk("data/" + doc_name + ".json")
-    summary = index.query(
-        "Summarize the contents of this web page.", response_mode="tree_summarize", use_async=True
-    )
-    return summary.response
+    save_index(index, doc_name)
+
+    web_summary_cache = get_web_summary_cache()
+    content_hash = hashlib.sha256(
+        "".join(doc.get_text() for doc in docs).encode()
+    ).hexdigest()
+    summary = web_summary_cache.get_by_content(url, content_hash)
+    if summary is None:
+        query_engine = index.as_query_engine(
+            response_mode="tree_summarize", use_async=use_async
+        )
+        response = query_engine.query("Summarize the contents of this web page.")
+        summary = response.response
+    web_summary_cache.set(doc_name, summary, url=url, content_hash=content_hash)
+    return summary
+
+
+def download_web_many(
+    urls: List[str],
+    doc_names: List[str],
+    service_context: ServiceContext,
+    max_workers: int = 5,
+    timeout: float = DEFAULT_TIMEOUT,
+) -> List[str]:
+    """Download several web pages at once, with at most max_workers in flight.
+
+    Returns one formatted download result per url, in the original order. A
+    page that fails to download is reported in its result instead of
+    failing the whole command.
+    """
+
+    def _download(url: str, doc_name: str) -> str:
+        try:
+            # each page runs in its own worker thread, which has no event loop
+            # for the async tree summarize
+            web_summary = download_web(
+                url, doc_name, service_context, timeout=timeout, use_async=False
+            )
+        except Exception as e:
+            return f"Failed to download {url}: {e}"
+        return format_web_download(url, doc_name, web_summary)
 
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(_download, urls, doc_names))
 
+
+@prioritized(Priority.EXECUTION)
 def query_docs(docs, query, service_context):
-    query_configs = [
-        {
-            "index_struct_type": "list",
-            "query_mode": "default",
-            "query_kwargs": {"response_mode": "tree_summarize", "use_async": True},
-        }
-    ]
-    print("Opening web summary cache")
-    with open("data/web_summary_cache.json", "r") as f:
-        doc_summary_cache = json.load(f)
+    doc_summary_cache = get_web_summary_cache()
     if isinstance(docs, list):
-        indices = []
-        for doc_name in docs:
-            index = GPTListIndex.load_from_disk(
-                "data/" + doc_name + ".json", service_context=service_context
-            )
-            indices.append((index, doc_summary_cache[doc_name]))
-        graph = ComposableGraph.from_indices(
-            GPTListIndex,
-            [index[0] for index in indices],
-            index_summaries=[index[1] for index in indices],
-            service_context=service_context,
-        )
-        response = graph.query(
-            query, query_configs=query_configs, service_context=service_context
+        # indexes and the composed graph are cached in memory between queries
+        graph = index_cache.load_graph(
+            [get_index_path(doc_name) for doc_name in docs],
+            [doc_summary_cache[doc_name] for doc_name in docs],
+            service_context,
         )
+        # every list index in the graph summarizes its nodes as a tree
+        custom_query_engines = {
+            index_id: index.as_query_engine(
+                response_mode="tree_summarize",
+                use_async=True,
+                service_context=service_context,
+            )
+            for index_id, index in graph.all_indices.items()
+        }
+        query_engine = graph.as_query_engine(custom_query_engines=custom_query_engines)
+        response = query_engine.query(query)
         return response.response
     else:
-        index = GPTListIndex.load_from_disk(
-            "data/" + docs + ".json", service_context=service_context
-        )
-        response = index.query(query, service_context=service_context)
+        index = index_cache.load(get_index_path(docs), service_context)
+        query_engine = index.as_query_engine(service_context=service_context)
+        response = query_engine.query(query)
         return response.response
 
 
@@ -7,8 +7,11 @@ from langchain.prompts import (
     HumanMessagePromptTemplate,
 )
 from langchain.schema import AIMessage
-from typing import List
-from auto_llama.tokens import count_tokens
+from typing import List, Optional, Union
+from auto_llama.memory import Memory
+from auto_llama.long_term_memory import LongTermMemory
+from auto_llama.const import LONG_TERM_MEMORIES_HEADER, RECENT_MEMORIES_HEADER
+from llama_agi.scheduler import Priority, prioritized
 
 
 class Agent:
@@ -19,10 +22,14 @@ class Agent:
             A description of the agent used in the preamble.
         task(str):
             The task the agent is supposed to perform.
-        memory(list):
-            A list of the agent's memories.
+        memory(Memory):
+            The agent's memories, bounded in RAM with older memories spilled
+            to disk. Each agent gets its own store unless one is passed in.
         llm(BaseLLM):
             The LLM used by the agent.
+        long_term_memory(LongTermMemory):
+            An optional vector store of memories older than the recent window.
+            The most relevant ones are added to the prompt.
     """
 
     def __init__(
@@ -30,16 +37,24 @@ class Agent:
         desc,
         task,
         llm,
-        memory=[],
+        memory: Optional[Union[Memory, List[str]]] = None,
+        long_term_memory: Optional[LongTermMemory] = None,
     ):
         """Initialize the agent."""
         self.desc = desc
         self.task = task
-        self.memory = memory
+        if memory is None:
+            memory = Memory()
+        self.memory = memory if isinstance(memory, Memory) else Memory(memory)
         self.llm = llm
+        self.long_term_memory = long_term_memory
+        if long_term_memory is not None:
+            # memories spilled to disk are embedded before leaving RAM
+            self.memory.on_spill = long_term_memory.add
 
-        memory.append("Here is a list of your previous actions:")
+        self.memory.append("Here is a list of your previous actions:")
 
+    @prioritized(Priority.EXECUTION)
     def get_response(self) -> Response:
         """Get the response given the agent's current state."""
         parser: PydanticOutputParser = PydanticOutputParser(pydantic_object=Response)
@@ -56,7 +71,11 @@ class Agent:
         return response_obj
 
     def create_chat_messages(
-        self, desc: str, task: str, memory: List[str], format_instructions: str
+        self,
+        desc: str,
+        task: str,
+        memory: Union[Memory, List[str]],
+        format_instructions: str,
     ):
         """Create the messages for the agent."""
         messages = []
@@ -85,15 +104,29 @@ class Agent:
 
         return prompt
 
-    def create_memories(self, memory: List[str], max_tokens: int = 2000):
-        # print(memory)
-        token_counter = 0
-        memories: List[str] = []
-        memories.insert(0, memory[0])  # always include memories header.
-        token_counter += count_tokens(memory[0])
-        memory_index = len(memory) - 1
-        while memory_index > 0 and token_counter < max_tokens:
-            memories.insert(1, memory[memory_index])
-            token_counter += count_tokens(memory[memory_index])
-            memory_index -= 1
+    def create_memories(self, memory: Union[Memory, List[str]], max_tokens: int = 2000):
+        if not isinstance(memory, Memory):
+            memory = Memory(memory)
+        # always includes the memories header.
+        memories = memory.get_recent(max_tokens)
+        if self.long_term_memory is None or memory is not self.memory:
+            return "\n".join(memories)
+
+        # embed the memories that have fallen out of the recent window, and
+        # add the ones most relevant to the task and the latest memory
+        window_start = memory.get_recent_start(max_tokens)
+        self.long_term_memory.add(
+            memory.get_range(self.long_term_memory.next_id, window_start)
+        )
+        relevant_memories = self.long_term_memory.search(
+            self.task + "\n" + memories[-1], before_id=window_start
+        )
+        if relevant_memories:
+            memories = (
+                memories[:1]
+                + [LONG_TERM_MEMORIES_HEADER]
+                + relevant_memories
+                + [RECENT_MEMORIES_HEADER]
+                + memories[1:]
+            )
         return "\n".join(memories)
@@ -1,3 +1,20 @@
+import os
+
+# "binary" saves downloaded page indexes in a compact memory-mapped format,
+# "json" saves llama_index's storage context as a single JSON file
+INDEX_STORAGE_FORMAT = os.environ.get("AUTO_LLAMA_INDEX_FORMAT", "binary")
+
+# LLM completions are cached in this SQLite database; set it to an empty
+# string to always call the LLM
+COMPLETION_CACHE_PATH = os.environ.get(
+    "AUTO_LLAMA_COMPLETION_CACHE", "data/completion_cache.db"
+)
+
+# LLM and embedding calls are paced to stay under these limits of the OpenAI
+# account; leave them unset to only retry the calls that are rate limited
+REQUESTS_PER_MINUTE = float(os.environ.get("AUTO_LLAMA_REQUESTS_PER_MINUTE", 0)) or None
+TOKENS_PER_MINUTE = float(os.environ.get("AUTO_LLAMA_TOKENS_PER_MINUTE", 0)) or None
+
 DEFAULT_AGENT_PREAMBLE = """
 I am an AI assistant with chain of thought reasoning that only responds in JSON.
 I should never respond with a natural language sentence.
@@ -19,7 +36,7 @@ All my responses should be in the following format and contain all the fields:
     }
 }
 command_action should exclusively consist of these commands:
-{"action": "search", "args": {"search_terms": search_terms: str}}
+{"action": "search", "args": {"search_terms": search_terms: list[str]}}
 {"action": "download", "args": {"url": url: list[str], "doc_name": doc_name: list[str]}}
 {"action": "query", "args": {"docs": [doc_name1: str, doc_name2: str, ...], "query": query: str}}
 {"action": "write", "args": {"file_name": file_name: str, "data": data: str}}
@@ -28,6 +45,10 @@ command_action should exclusively consist of these commands:
 If you already got good search results, you should not need to search again.
 """
 
+LONG_TERM_MEMORIES_HEADER = "Some of your earlier actions that may be relevant:"
+
+RECENT_MEMORIES_HEADER = "Your most recent actions:"
+
 SEARCH_RESULTS_TEMPLATE = """I searched for {search_terms} and found the following results.
 If any of these results help to answer the user's query {user_query}
 I should respond with which web urls I should download and state I don't need
@@ -0,0 +1,121 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import List, Tuple
+
+from llama_index import GPTListIndex, ServiceContext
+from llama_index.indices.composability import ComposableGraph
+
+from auto_llama.storage import load_index
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_MAX_GRAPHS = 16
+
+FileSignature = Tuple[int, int]
+
+
+def get_file_signature(path: str) -> FileSignature:
+    """The mtime and size of a file, which change whenever it is rewritten."""
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+class IndexCache:
+    """A process-level LRU cache of document indexes loaded from disk.
+
+    Loaded indexes are kept until the cache holds more than max_bytes, at
+    which point the least recently used ones are evicted. The size of an
+    index is estimated by the size of its file on disk. An index is reloaded
+    when its file's mtime or size changes.
+
+    Graphs composed over several documents are memoized by the sorted set of
+    documents (and their file signatures and summaries), so repeated queries
+    over the same documents skip all disk I/O and deserialization.
+
+    Attributes:
+        max_bytes(int):
+            The estimated memory budget for loaded indexes.
+        max_graphs(int):
+            The number of composed graphs kept.
+    """
+
+    def __init__(
+        self, max_bytes: int = DEFAULT_MAX_BYTES, max_graphs: int = DEFAULT_MAX_GRAPHS
+    ):
+        self.max_bytes = max_bytes
+        self.max_graphs = max_graphs
+        self.num_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._indexes: OrderedDict = OrderedDict()
+        self._graphs: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _load(self, path: str, service_context: ServiceContext):
+        """Load an index, returning it with its file signature."""
+        signature = get_file_signature(path)
+        with self._lock:
+            cached = self._indexes.get(path)
+            if cached is not None and cached[0] == signature:
+                self._indexes.move_to_end(path)
+                self.hits += 1
+                return cached[1], signature
+
+        index = load_index(path, service_context)
+        with self._lock:
+            self.misses += 1
+            if path in self._indexes:
+                self.num_bytes -= self._indexes.pop(path)[0][1]
+            self._indexes[path] = (signature, index)
+            self.num_bytes += signature[1]
+            while self.num_bytes > self.max_bytes and len(self._indexes) > 1:
+                _, (evicted_signature, _) = self._indexes.popitem(last=False)
+                self.num_bytes -= evicted_signature[1]
+        return index, signature
+
+    def load(self, path: str, service_context: ServiceContext):
+        """Get the index saved at path, loading it only if needed."""
+        return self._load(path, service_context)[0]
+
+    def load_graph(
+        self,
+        paths: List[str],
+        summaries: List[str],
+        service_context: ServiceContext,
+    ) -> ComposableGraph:
+        """Get a list graph composed over the indexes saved at paths."""
+        docs = sorted(zip(paths, summaries))
+        indices = []
+        key = []
+        for path, summary in docs:
+            index, signature = self._load(path, service_context)
+            indices.append(index)
+            key.append((path, signature, summary))
+        key = tuple(key)
+
+        with self._lock:
+            graph = self._graphs.get(key)
+            if graph is not None:
+                self._graphs.move_to_end(key)
+                return graph
+
+        graph = ComposableGraph.from_indices(
+            GPTListIndex,
+            indices,
+            index_summaries=[summary for _, summary in docs],
+            service_context=service_context,
+        )
+        with self._lock:
+            self._graphs[key] = graph
+            while len(self._graphs) > self.max_graphs:
+                self._graphs.popitem(last=False)
+        return graph
+
+    def clear(self):
+        with self._lock:
+            self._indexes.clear()
+            self._graphs.clear()
+            self.num_bytes = 0
+
+
+index_cache = IndexCache()
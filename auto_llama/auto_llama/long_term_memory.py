@@ -0,0 +1,82 @@
+from typing import List, Optional, Tuple
+
+import numpy as np
+from llama_index.embeddings.base import BaseEmbedding
+from llama_index.embeddings.openai import OpenAIEmbedding
+
+
+class LongTermMemory:
+    """A small local vector store of the agent's older memories.
+
+    Memories that have fallen out of the recent window are embedded in
+    batches and stored as normalized float32 rows of one matrix, so finding
+    the memories most relevant to the current task is a single matrix-vector
+    product.
+
+    Attributes:
+        embed_model(BaseEmbedding):
+            The model used to embed memories and queries.
+        top_k(int):
+            The number of memories returned by search.
+        memory_ids(list):
+            The memory ids stored, in row order.
+    """
+
+    def __init__(self, embed_model: Optional[BaseEmbedding] = None, top_k: int = 3):
+        self.embed_model = embed_model or OpenAIEmbedding()
+        self.top_k = top_k
+        self.memory_ids: List[int] = []
+        self.texts: List[str] = []
+        self._embeddings = np.zeros((0, 0), dtype=np.float32)
+        self._next_id = 0
+
+    def __len__(self) -> int:
+        return len(self.memory_ids)
+
+    @property
+    def next_id(self) -> int:
+        """Memories with smaller ids have already been stored."""
+        return self._next_id
+
+    def add(self, memories: List[Tuple[int, str]]):
+        """Embed and store (id, memory) pairs that aren't stored yet."""
+        memories = [(i, text) for i, text in memories if i >= self._next_id]
+        if not memories:
+            return
+        for i, text in memories:
+            self.embed_model.queue_text_for_embedding(str(i), text)
+        _, embeddings = self.embed_model.get_queued_text_embeddings()
+
+        new_rows = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(new_rows, axis=1, keepdims=True)
+        new_rows /= np.maximum(norms, 1e-12)
+        if len(self.memory_ids) == 0:
+            self._embeddings = new_rows
+        else:
+            self._embeddings = np.vstack([self._embeddings, new_rows])
+
+        self.memory_ids.extend(i for i, _ in memories)
+        self.texts.extend(text for _, text in memories)
+        self._next_id = memories[-1][0] + 1
+
+    def search(self, query: str, before_id: Optional[int] = None) -> List[str]:
+        """Get the top_k stored memories most similar to the query.
+
+        If before_id is set, only memories with smaller ids are returned.
+        """
+        num_rows = len(self.memory_ids)
+        if before_id is not None:
+            num_rows = int(np.searchsorted(self.memory_ids, before_id))
+        if num_rows == 0:
+            return []
+
+        query_embedding = np.asarray(
+            self.embed_model.get_query_embedding(query), dtype=np.float32
+        )
+        query_embedding /= max(float(np.linalg.norm(query_embedding)), 1e-12)
+        scores = self._embeddings[:num_rows] @ query_embedding
+
+        k = min(self.top_k, num_rows)
+        top = np.argpartition(-scores, k - 1)[:k]
+        # return the memories in the order they happened
+        return [self.texts[i] for i in sorted(top)]
@@ -0,0 +1,193 @@
+import json
+import tempfile
+from bisect import bisect_right
+from typing import IO, Callable, Iterable, Iterator, List, Optional, Tuple
+
+from auto_llama.tokens import count_tokens, count_tokens_batch
+
+
+class Memory:
+    """A bounded store of the agent's memories, with cached token counts.
+
+    The first memory added is the memories header, which is always kept.
+    Later memories go into a ring buffer holding at most max_tokens tokens:
+    once it is full, the oldest memories are spilled to disk (a temporary file
+    by default) instead of being kept in RAM, so appends take constant time
+    and memory use stays bounded however long the agent runs.
+
+    Tokens are counted once, when a memory is appended. A running sum of the
+    counts lets the most recent window of memories that fits a token budget
+    be found with a binary search.
+
+    Memories after the header are numbered from 0 in the order they were
+    added, so they can be referred to after they are spilled.
+
+    Attributes:
+        header(str):
+            The memories header, included at the top of every window.
+        max_tokens(int):
+            The token budget of the memories kept in RAM, excluding the header.
+        spill_path(str):
+            The file that spilled memories are appended to, one JSON string
+            per line. If not set, a temporary file is used.
+        num_spilled(int):
+            The number of memories spilled to disk so far.
+        on_spill(callable):
+            Called with the (id, memory) pairs about to be spilled to disk.
+    """
+
+    def __init__(
+        self,
+        entries: Iterable[str] = (),
+        max_tokens: int = 8000,
+        spill_path: Optional[str] = None,
+        on_spill: Optional[Callable[[List[Tuple[int, str]]], None]] = None,
+    ):
+        self.header: Optional[str] = None
+        self.header_tokens = 0
+        self.max_tokens = max_tokens
+        self.spill_path = spill_path
+        self.num_spilled = 0
+        self.on_spill = on_spill
+        self._spill_file: Optional[IO[str]] = None
+
+        # ring buffer of memories: entries before _head have been spilled, and
+        # are compacted away once they make up half of the list
+        self._entries: List[str] = []
+        # _offsets[i] is the number of tokens appended before _entries[i]
+        self._offsets: List[int] = []
+        self._head = 0
+        # the id of _entries[0]
+        self._base = 0
+        self._total_tokens = 0
+
+        self.extend(entries)
+
+    def __len__(self) -> int:
+        return int(self.header is not None) + len(self._entries) - self._head
+
+    def __getitem__(self, index):
+        return list(self)[index]
+
+    def __iter__(self) -> Iterator[str]:
+        if self.header is not None:
+            yield self.header
+        yield from self._entries[self._head :]
+
+    @property
+    def num_tokens(self) -> int:
+        """The number of tokens held in RAM, including the header."""
+        return self.header_tokens + self._total_tokens - self._ram_offset
+
+    @property
+    def _ram_offset(self) -> int:
+        if self._head == len(self._entries):
+            return self._total_tokens
+        return self._offsets[self._head]
+
+    def _add(self, entry: str, num_tokens: int) -> None:
+        if self.header is None:
+            self.header = entry
+            self.header_tokens = num_tokens
+            return
+        self._entries.append(entry)
+        self._offsets.append(self._total_tokens)
+        self._total_tokens += num_tokens
+
+    def append(self, entry: str) -> None:
+        self._add(entry, count_tokens(entry))
+        self._spill()
+
+    def extend(self, entries: Iterable[str]) -> None:
+        entries = list(entries)
+        for entry, num_tokens in zip(entries, count_tokens_batch(entries)):
+            self._add(entry, num_tokens)
+        self._spill()
+
+    def _get_spill_file(self) -> IO[str]:
+        if self._spill_file is None:
+            if self.spill_path is not None:
+                self._spill_file = open(self.spill_path, "a+")
+            else:
+                self._spill_file = tempfile.TemporaryFile(
+                    mode="w+", prefix="auto_llama_memory_", suffix=".jsonl"
+                )
+        return self._spill_file
+
+    def _spill(self) -> None:
+        """Move the oldest memories to disk until the rest fit max_tokens.
+
+        The most recent memory is always kept in RAM.
+        """
+        spilled = []
+        while (
+            self._total_tokens - self._ram_offset > self.max_tokens
+            and len(self._entries) - self._head > 1
+        ):
+            spilled.append(self._entries[self._head])
+            self._head += 1
+        if not spilled:
+            return
+
+        if self.on_spill is not None:
+            first_id = self._base + self._head - len(spilled)
+            self.on_spill(list(enumerate(spilled, start=first_id)))
+
+        spill_file = self._get_spill_file()
+        spill_file.write("".join(json.dumps(x) + "\n" for x in spilled))
+        spill_file.flush()
+        self.num_spilled += len(spilled)
+
+        if self._head > len(self._entries) // 2:
+            self._entries = self._entries[self._head :]
+            self._offsets = self._offsets[self._head :]
+            self._base += self._head
+            self._head = 0
+
+    def iter_spilled(self) -> Iterator[str]:
+        """Read back the memories spilled to disk, oldest first."""
+        if self._spill_file is None:
+            return
+        self._spill_file.seek(0)
+        for line in self._spill_file:
+            yield json.loads(line)
+        self._spill_file.seek(0, 2)
+
+    @property
+    def next_id(self) -> int:
+        """The id the next memory will get."""
+        return self._base + len(self._entries)
+
+    def get_range(self, start_id: int, end_id: int) -> List[Tuple[int, str]]:
+        """Get the (id, memory) pairs still in RAM with start_id <= id < end_id."""
+        start = max(start_id - self._base, self._head)
+        end = max(end_id - self._base, start)
+        return list(enumerate(self._entries[start:end], start=self._base + start))
+
+    def get_recent_start(self, max_tokens: int) -> int:
+        """Get the id of the oldest memory in the window returned by get_recent.
+
+        Memories are taken newest first while fewer than max_tokens have been
+        used, so the last memory taken may go over the budget.
+        """
+        if self.header_tokens >= max_tokens or self._head == len(self._entries):
+            return self.next_id
+
+        # find the oldest memory at which the budget is used up: the largest
+        # start with header + tokens(entries[start:]) >= max_tokens
+        target = self._total_tokens + self.header_tokens - max_tokens
+        start = bisect_right(self._offsets, target, lo=self._head) - 1
+        return self._base + max(start, self._head)
+
+    def get_recent(self, max_tokens: int) -> List[str]:
+        """Get the header and the most recent memories that fit max_tokens."""
+        if self.header is None:
+            return []
+        start = self.get_recent_start(max_tokens) - self._base
+        return [self.header] + self._entries[start:]
+
+    def close(self) -> None:
+        """Close the spill file. A temporary spill file is deleted."""
+        if self._spill_file is not None:
+            self._spill_file.close()
+            self._spill_file = None
@@ -0,0 +1,221 @@
+import json
+import os
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple, Union
+
+from duckduckgo_search import ddg
+
+SearchResult = Dict[str, str]
+# the time some results were searched, and the results
+_CachedResults = Tuple[float, List[SearchResult]]
+
+DEFAULT_SEARCH_TTL = 60 * 60
+DEFAULT_MAX_CACHED_SEARCHES = 256
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase a query and collapse its whitespace, for use as a cache key."""
+    return " ".join(query.lower().split())
+
+
+def normalize_url(url: str) -> str:
+    """Strip the parts of a URL that don't change the page it points to."""
+    url = url.split("#", 1)[0].rstrip("/")
+    return re.sub(r"^https?://(www\.)?", "", url.lower())
+
+
+def get_query_variants(search_terms: Union[str, List[str]]) -> List[str]:
+    """Get the distinct queries to run for the search terms.
+
+    The terms may be a list of queries, or a string with several queries
+    separated by semicolons. A quoted query is also run without its quotes,
+    since exact phrase searches often return nothing.
+    """
+    if isinstance(search_terms, str):
+        search_terms = search_terms.strip()
+        if search_terms.startswith("[") and search_terms.endswith("]"):
+            search_terms = search_terms.strip("[").strip("]").split(", ")
+        else:
+            search_terms = search_terms.split(";")
+
+    variants = []
+    for query in search_terms:
+        query = query.strip().strip("'")
+        variants.append(query)
+        if '"' in query:
+            variants.append(query.replace('"', ""))
+
+    seen = set()
+    unique_variants = []
+    for query in variants:
+        key = normalize_query(query)
+        if key and key not in seen:
+            seen.add(key)
+            unique_variants.append(query)
+    return unique_variants
+
+
+class SearchBackend(ABC):
+    """A web search engine, returning results as dicts with title, href and body."""
+
+    @abstractmethod
+    def search(self, query: str, max_results: int) -> List[SearchResult]:
+        """Search for the query."""
+
+
+class DuckDuckGoBackend(SearchBackend):
+    def search(self, query: str, max_results: int) -> List[SearchResult]:
+        return ddg(query, max_results=max_results) or []
+
+
+class FixtureSearchBackend(SearchBackend):
+    """Reads search results from JSON files, so searches can run offline.
+
+    The results for a query are read from <fixture_dir>/<query>.json, where
+    <query> is the normalized query with every run of characters other than
+    letters and digits replaced by "_". If there is no such file, the results
+    in default.json are used, if it exists.
+
+    Attributes:
+        fixture_dir(str):
+            The directory holding the fixture files.
+    """
+
+    def __init__(self, fixture_dir: str):
+        self.fixture_dir = fixture_dir
+
+    def get_fixture_path(self, query: str) -> str:
+        name = re.sub(r"[^a-z0-9]+", "_", normalize_query(query)).strip("_")
+        return os.path.join(self.fixture_dir, name + ".json")
+
+    def search(self, query: str, max_results: int) -> List[SearchResult]:
+        for path in (
+            self.get_fixture_path(query),
+            os.path.join(self.fixture_dir, "default.json"),
+        ):
+            if os.path.exists(path):
+                with open(path, "r") as f:
+                    return json.load(f)[:max_results]
+        return []
+
+
+class WebSearch:
+    """Runs several search queries at once, with a cache of recent results.
+
+    Each query variant is searched concurrently. The results are merged by
+    taking the top result of each query, then the second, and so on, and
+    pages found by more than one query are only kept once, up to max_results
+    results in total. Results are cached for ttl seconds by normalized query,
+    so repeating a search is free. Once max_entries queries are cached, the
+    least recently used ones are evicted.
+
+    Attributes:
+        backend(SearchBackend):
+            The search engine to use.
+        ttl(float):
+            How long (in seconds) search results are cached.
+        max_workers(int):
+            The number of queries searched at the same time.
+        max_entries(int):
+            The number of queries whose results are cached.
+    """
+
+    def __init__(
+        self,
+        backend: SearchBackend,
+        ttl: float = DEFAULT_SEARCH_TTL,
+        max_workers: int = 4,
+        max_entries: int = DEFAULT_MAX_CACHED_SEARCHES,
+    ):
+        self.backend = backend
+        self.ttl = ttl
+        self.max_workers = max_workers
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._cache: "OrderedDict[Tuple[str, int], _CachedResults]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _search_one(self, query: str, max_results: int) -> List[SearchResult]:
+        key = (normalize_query(query), max_results)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                if time.time() - cached[0] < self.ttl:
+                    self._cache.move_to_end(key)
+                    self.hits += 1
+                    return cached[1]
+                del self._cache[key]
+
+        results = self.backend.search(query, max_results)
+        with self._lock:
+            self.misses += 1
+            self._cache[key] = (time.time(), results)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return results
+
+    def search(
+        self, search_terms: Union[str, List[str]], max_results: int = 5
+    ) -> List[SearchResult]:
+        """Search for every variant of the search terms, and merge the results.
+
+        At most max_results results are returned, however many queries ran.
+        """
+        queries = get_query_variants(search_terms)
+        if len(queries) <= 1:
+            result_lists = [self._search_one(query, max_results) for query in queries]
+        else:
+            with ThreadPoolExecutor(
+                max_workers=min(self.max_workers, len(queries))
+            ) as executor:
+                result_lists = list(
+                    executor.map(lambda q: self._search_one(q, max_results), queries)
+                )
+
+        merged = []
+        seen_urls = set()
+        for rank in range(max((len(results) for results in result_lists), default=0)):
+            for results in result_lists:
+                if rank >= len(results):
+                    continue
+                result = results[rank]
+                url = normalize_url(result.get("href", ""))
+                if url:
+                    if url in seen_urls:
+                        continue
+                    seen_urls.add(url)
+                merged.append(result)
+        return merged[:max_results]
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+
+_web_search: Optional[WebSearch] = None
+_web_search_lock = threading.Lock()
+
+
+def get_web_search() -> WebSearch:
+    """Get the process-wide web search.
+
+    If AUTO_LLAMA_SEARCH_FIXTURES is set to a directory, searches read
+    fixture files from it instead of using DuckDuckGo.
+    """
+    global _web_search
+    with _web_search_lock:
+        if _web_search is None:
+            fixture_dir = os.environ.get("AUTO_LLAMA_SEARCH_FIXTURES")
+            if fixture_dir:
+                backend: SearchBackend = FixtureSearchBackend(fixture_dir)
+            else:
+                backend = DuckDuckGoBackend()
+            _web_search = WebSearch(backend)
+        return _web_search
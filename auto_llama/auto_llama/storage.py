@@ -0,0 +1,265 @@
+import json
+import mmap
+import os
+import struct
+from typing import Dict, List, Optional, Sequence
+
+from llama_index import (
+    GPTListIndex,
+    ServiceContext,
+    StorageContext,
+    load_index_from_storage,
+)
+from llama_index.data_structs.node import DocumentRelationship, Node
+from llama_index.schema import BaseDocument
+from llama_index.storage.docstore.types import BaseDocumentStore
+
+from auto_llama.const import INDEX_STORAGE_FORMAT
+
+DATA_DIR = "data"
+BINARY_INDEX_EXT = ".idx"
+JSON_INDEX_EXT = ".json"
+
+# magic, format version, number of nodes, length of the metadata JSON
+_MAGIC = b"ALIX"
+_VERSION = 1
+_HEADER = struct.Struct("<4sIIQ")
+# byte offset and length of each node's text in the text blob
+_OFFSET = struct.Struct("<QQ")
+
+
+class MappedNode(Node):
+    """A node whose text stays in a memory-mapped index file until it is used.
+
+    The text is decoded from the map each time it is read, so loading an index
+    reads none of its text, and processes that load the same index share its
+    pages in the operating system's page cache. The map stays open for as long
+    as any of its nodes is alive.
+
+    Attributes:
+        buf(mmap.mmap):
+            The memory-mapped index file.
+        text_start(int):
+            The byte offset of the node's UTF-8 text in the file.
+        text_len(int):
+            The byte length of the node's text.
+    """
+
+    def __init__(self, buf: mmap.mmap, text_start: int, text_len: int, **kwargs):
+        self.buf = buf
+        self.text_start = text_start
+        self.text_len = text_len
+        self._text: Optional[str] = None
+        super().__init__(**kwargs)
+
+    def __post_init__(self):
+        # skip Node's check that the text is set, which would read it
+        BaseDocument.__post_init__(self)
+
+    @property
+    def text(self) -> str:
+        if self._text is not None:
+            return self._text
+        return self.buf[self.text_start : self.text_start + self.text_len].decode()
+
+    @text.setter
+    def text(self, value: Optional[str]):
+        # the dataclass __init__ sets the default text of None
+        self._text = value
+
+
+class MappedDocumentStore(BaseDocumentStore):
+    """A docstore keeping the nodes it is given as they are.
+
+    LlamaIndex's SimpleDocumentStore serializes every node it stores, which
+    would read the text of each MappedNode when the index is loaded.
+    """
+
+    def __init__(self):
+        self._docs: Dict[str, BaseDocument] = {}
+        self._hashes: Dict[str, str] = {}
+
+    @property
+    def docs(self) -> Dict[str, BaseDocument]:
+        return dict(self._docs)
+
+    def add_documents(
+        self, docs: Sequence[BaseDocument], allow_update: bool = True
+    ) -> None:
+        for doc in docs:
+            doc_id = doc.get_doc_id()
+            if not allow_update and doc_id in self._docs:
+                raise ValueError(f"doc_id {doc_id} already exists.")
+            self._docs[doc_id] = doc
+            self._hashes[doc_id] = doc.get_doc_hash()
+
+    def get_document(
+        self, doc_id: str, raise_error: bool = True
+    ) -> Optional[BaseDocument]:
+        doc = self._docs.get(doc_id)
+        if doc is None and raise_error:
+            raise ValueError(f"doc_id {doc_id} not found.")
+        return doc
+
+    def delete_document(self, doc_id: str, raise_error: bool = True) -> None:
+        if doc_id not in self._docs:
+            if raise_error:
+                raise ValueError(f"doc_id {doc_id} not found.")
+            return
+        del self._docs[doc_id]
+        self._hashes.pop(doc_id, None)
+
+    def document_exists(self, doc_id: str) -> bool:
+        return doc_id in self._docs
+
+    def set_document_hash(self, doc_id: str, doc_hash: str) -> None:
+        self._hashes[doc_id] = doc_hash
+
+    def get_document_hash(self, doc_id: str) -> Optional[str]:
+        return self._hashes.get(doc_id)
+
+
+def get_index_path(doc_name: str) -> str:
+    """Get the path of a saved index, preferring the binary format."""
+    binary_path = os.path.join(DATA_DIR, doc_name + BINARY_INDEX_EXT)
+    if os.path.exists(binary_path):
+        return binary_path
+    return os.path.join(DATA_DIR, doc_name + JSON_INDEX_EXT)
+
+
+def _get_nodes(index: GPTListIndex) -> List[Node]:
+    return index.docstore.get_nodes(index.index_struct.nodes)
+
+
+def save_index(index: GPTListIndex, doc_name: str) -> str:
+    """Save an index under doc_name in the configured format.
+
+    Returns the path the index was saved to.
+    """
+    os.makedirs(DATA_DIR, exist_ok=True)
+    if INDEX_STORAGE_FORMAT == "json":
+        path = os.path.join(DATA_DIR, doc_name + JSON_INDEX_EXT)
+        save_json_index(index, path)
+    else:
+        path = os.path.join(DATA_DIR, doc_name + BINARY_INDEX_EXT)
+        save_binary_index(index, path)
+    return path
+
+
+def save_binary_index(index: GPTListIndex, path: str):
+    """Save the nodes of a list index in a compact binary file.
+
+    Layout: a fixed size header, a JSON array with the metadata of each node,
+    a table with the offset and length of each node's text, and then the
+    UTF-8 text of all nodes back to back. The file is written to a temporary
+    path and renamed into place, so readers never see a partial file.
+    """
+    nodes = _get_nodes(index)
+    metadata = json.dumps(
+        [
+            {
+                "doc_id": node.doc_id,
+                "doc_hash": node.doc_hash,
+                "extra_info": node.extra_info,
+                "node_info": node.node_info,
+                "relationships": {
+                    relationship.value: related_id
+                    for relationship, related_id in node.relationships.items()
+                },
+            }
+            for node in nodes
+        ]
+    ).encode()
+    texts = [node.text.encode() for node in nodes]
+
+    offsets = []
+    text_offset = 0
+    for text in texts:
+        offsets.append(_OFFSET.pack(text_offset, len(text)))
+        text_offset += len(text)
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, _VERSION, len(nodes), len(metadata)))
+        f.write(metadata)
+        f.write(b"".join(offsets))
+        f.write(b"".join(texts))
+    os.replace(tmp_path, path)
+
+
+def load_binary_index(path: str, service_context: ServiceContext) -> GPTListIndex:
+    """Load a list index saved with save_binary_index.
+
+    The file is memory-mapped read-only and its nodes are MappedNodes, so only
+    the header, metadata and offset table are read up front. Each node's text
+    is read from the map when the node is used.
+    """
+    with open(path, "rb") as f:
+        # the map stays valid after the file is closed, or replaced on disk
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, version, num_nodes, metadata_len = _HEADER.unpack_from(buf, 0)
+    if magic != _MAGIC or version != _VERSION:
+        buf.close()
+        raise ValueError(f"{path} is not a binary index file")
+
+    position = _HEADER.size
+    metadata = json.loads(buf[position : position + metadata_len])
+    position += metadata_len
+    texts_start = position + num_nodes * _OFFSET.size
+
+    nodes = []
+    for i, node_metadata in enumerate(metadata):
+        text_offset, text_len = _OFFSET.unpack_from(buf, position + i * _OFFSET.size)
+        nodes.append(
+            MappedNode(
+                buf,
+                texts_start + text_offset,
+                text_len,
+                doc_id=node_metadata["doc_id"],
+                # files saved without it get their hash computed from the text
+                doc_hash=node_metadata.get("doc_hash"),
+                extra_info=node_metadata["extra_info"],
+                node_info=node_metadata["node_info"],
+                relationships={
+                    DocumentRelationship(relationship): related_id
+                    for relationship, related_id in node_metadata[
+                        "relationships"
+                    ].items()
+                },
+            )
+        )
+    return GPTListIndex(
+        nodes=nodes,
+        service_context=service_context,
+        storage_context=StorageContext.from_defaults(docstore=MappedDocumentStore()),
+    )
+
+
+def save_json_index(index: GPTListIndex, path: str):
+    """Save an index and its storage context in a single JSON file."""
+    data = {
+        "index_id": index.index_id,
+        "storage_context": index.storage_context.to_dict(),
+    }
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def load_json_index(path: str, service_context: ServiceContext) -> GPTListIndex:
+    """Load a list index saved with save_json_index."""
+    with open(path, "r") as f:
+        data = json.load(f)
+    return load_index_from_storage(
+        StorageContext.from_dict(data["storage_context"]),
+        index_id=data["index_id"],
+        service_context=service_context,
+    )
+
+
+def load_index(path: str, service_context: ServiceContext) -> GPTListIndex:
+    """Load an index saved in either format."""
+    if path.endswith(BINARY_INDEX_EXT):
+        return load_binary_index(path, service_context)
+    return load_json_index(path, service_context)
@@ -0,0 +1,148 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+DEFAULT_CACHE_PATH = "data/web_summary_cache.db"
+LEGACY_CACHE_PATH = "data/web_summary_cache.json"
+
+
+class WebSummaryCache:
+    """A SQLite store of downloaded web page summaries.
+
+    Summaries are keyed by doc_name, and also record the URL and a hash of
+    the page content, so an unchanged page never has to be summarized twice.
+    Each write is a single atomic upsert, and the database runs in WAL mode,
+    so several agents can read and write the cache at the same time.
+
+    The connection stays open across calls. An existing JSON cache at
+    data/web_summary_cache.json is imported the first time the cache is used.
+
+    Attributes:
+        path(str):
+            The path of the SQLite database.
+    """
+
+    def __init__(
+        self, path: str = DEFAULT_CACHE_PATH, legacy_path: str = LEGACY_CACHE_PATH
+    ):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS web_summaries ("
+                "doc_name TEXT PRIMARY KEY, "
+                "url TEXT, "
+                "content_hash TEXT, "
+                "summary TEXT NOT NULL, "
+                "updated_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS web_summaries_content "
+                "ON web_summaries (url, content_hash)"
+            )
+        self._import_legacy(legacy_path)
+
+    def _import_legacy(self, legacy_path: str):
+        if not os.path.exists(legacy_path) or len(self) > 0:
+            return
+        with open(legacy_path, "r") as f:
+            legacy_cache = json.load(f)
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO web_summaries "
+                "(doc_name, summary, updated_at) VALUES (?, ?, ?)",
+                [(name, summary, now) for name, summary in legacy_cache.items()],
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._conn.execute(
+                "SELECT COUNT(*) FROM web_summaries"
+            ).fetchone()
+        return count
+
+    def __contains__(self, doc_name: str) -> bool:
+        return self.get(doc_name) is not None
+
+    def __getitem__(self, doc_name: str) -> str:
+        summary = self.get(doc_name)
+        if summary is None:
+            raise KeyError(doc_name)
+        return summary
+
+    def get(self, doc_name: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT summary FROM web_summaries WHERE doc_name = ?", (doc_name,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def get_many(self, doc_names: Iterable[str]) -> Dict[str, str]:
+        doc_names = list(doc_names)
+        placeholders = ", ".join("?" for _ in doc_names)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT doc_name, summary FROM web_summaries "
+                f"WHERE doc_name IN ({placeholders})",
+                doc_names,
+            ).fetchall()
+        return dict(rows)
+
+    def get_by_content(self, url: str, content_hash: str) -> Optional[str]:
+        """Get the summary of a page that was already downloaded with this content."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT summary FROM web_summaries "
+                "WHERE url = ? AND content_hash = ? "
+                "ORDER BY updated_at DESC LIMIT 1",
+                (url, content_hash),
+            ).fetchone()
+        return row[0] if row else None
+
+    def set(
+        self,
+        doc_name: str,
+        summary: str,
+        url: Optional[str] = None,
+        content_hash: Optional[str] = None,
+    ):
+        """Insert or replace the summary of a single document, atomically."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO web_summaries "
+                "(doc_name, url, content_hash, summary, updated_at) "
+                "VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(doc_name) DO UPDATE SET "
+                "url = excluded.url, "
+                "content_hash = excluded.content_hash, "
+                "summary = excluded.summary, "
+                "updated_at = excluded.updated_at",
+                (doc_name, url, content_hash, summary, time.time()),
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_caches: Dict[str, WebSummaryCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_web_summary_cache(path: str = DEFAULT_CACHE_PATH) -> WebSummaryCache:
+    """Get the process-wide cache for path, opening it on first use."""
+    with _caches_lock:
+        if path not in _caches:
+            _caches[path] = WebSummaryCache(path)
+        return _caches[path]
@@ -1,6 +1,19 @@
+from functools import lru_cache
+from typing import List
+
 import tiktoken
 
 
+@lru_cache(maxsize=None)
+def get_encoder(encoding_name: str = "cl100k_base"):
+    """Load a tiktoken encoder once per process."""
+    return tiktoken.get_encoding(encoding_name)
+
+
 def count_tokens(input: str):
-    encoder = tiktoken.get_encoding("cl100k_base")
-    return len(encoder.encode(input))
+    return len(get_encoder().encode(input))
+
+
+def count_tokens_batch(inputs: List[str]) -> List[int]:
+    """Count the tokens of several strings in one call."""
+    return [len(tokens) for tokens in get_encoder().encode_batch(inputs)]
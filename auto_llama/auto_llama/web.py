@@ -0,0 +1,38 @@
+import threading
+from typing import List, Optional
+
+import requests
+from bs4 import BeautifulSoup
+from llama_agi.http_cache import get_http_cache
+from llama_index import Document
+from requests.adapters import HTTPAdapter
+
+DEFAULT_TIMEOUT = 20
+DEFAULT_USER_AGENT = "Mozilla/5.0 (compatible; AutoLlama)"
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def get_session(pool_size: int = 10) -> requests.Session:
+    """Get the process-wide HTTP session, so connections are pooled and reused."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+            _session.headers["User-Agent"] = DEFAULT_USER_AGENT
+        return _session
+
+
+def fetch_web_documents(url: str, timeout: float = DEFAULT_TIMEOUT) -> List[Document]:
+    """Fetch a web page and extract its text, like BeautifulSoupWebReader.
+
+    Responses go through the shared HTTP cache, so pages fetched recently
+    (by this or another agent) are read from disk.
+    """
+    response = get_http_cache().fetch(url, session=get_session(), timeout=timeout)
+    soup = BeautifulSoup(response.content, "html.parser")
+    return [Document(soup.getText(), extra_info={"URL": url})]
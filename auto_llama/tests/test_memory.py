@@ -0,0 +1,88 @@
+import random
+
+import pytest
+
+from auto_llama import memory as memory_module
+from auto_llama.memory import Memory
+
+
+@pytest.fixture(autouse=True)
+def word_tokens(monkeypatch):
+    # count words instead of downloading the tiktoken vocabulary
+    monkeypatch.setattr(memory_module, "count_tokens", lambda x: len(x.split()))
+    monkeypatch.setattr(
+        memory_module,
+        "count_tokens_batch",
+        lambda xs: [len(x.split()) for x in xs],
+    )
+
+
+def get_recent_reference(header, entries, max_tokens):
+    """Take memories newest first while fewer than max_tokens have been used."""
+    used = len(header.split())
+    window = []
+    for entry in reversed(entries):
+        if used >= max_tokens:
+            break
+        window.insert(0, entry)
+        used += len(entry.split())
+    return [header] + window
+
+
+def test_empty_buffer():
+    memory = Memory()
+    assert len(memory) == 0
+    assert list(memory) == []
+    assert memory.num_tokens == 0
+    assert memory.next_id == 0
+    assert memory.get_recent(100) == []
+    assert memory.get_range(0, 10) == []
+    assert list(memory.iter_spilled()) == []
+
+    memory.append("the memories header")
+    assert memory.get_recent(0) == ["the memories header"]
+    assert memory.get_recent(100) == ["the memories header"]
+    assert memory.get_recent_start(100) == 0
+
+
+def test_eviction_at_capacity():
+    spilled = []
+    memory = Memory(["header"], max_tokens=6, on_spill=spilled.extend)
+    for i in range(5):
+        memory.append(f"memory {i}")
+
+    # three memories of two tokens fit, the oldest two were spilled
+    assert list(memory) == ["header", "memory 2", "memory 3", "memory 4"]
+    assert memory.num_tokens == 7
+    assert memory.num_spilled == 2
+    assert spilled == [(0, "memory 0"), (1, "memory 1")]
+    assert list(memory.iter_spilled()) == ["memory 0", "memory 1"]
+    assert memory.get_range(0, 5) == [(2, "memory 2"), (3, "memory 3"), (4, "memory 4")]
+
+    # the most recent memory is kept, however large it is
+    memory.append("a memory larger than the whole budget")
+    assert list(memory) == ["header", "a memory larger than the whole budget"]
+    assert memory.next_id == 6
+    assert [x for x, _ in spilled] == [0, 1, 2, 3, 4]
+    memory.close()
+
+
+def test_windows_across_wrap_point():
+    rng = random.Random(0)
+    memory = Memory(["the memories header"], max_tokens=20)
+    entries = []
+    for i in range(200):
+        entry = " ".join(["word"] * rng.randint(1, 6) + [str(i)])
+        memory.append(entry)
+        entries.append(entry)
+
+        ram_entries = entries[memory.num_spilled :]
+        assert list(memory) == ["the memories header"] + ram_entries
+        for max_tokens in range(0, 30):
+            assert memory.get_recent(max_tokens) == get_recent_reference(
+                "the memories header", ram_entries, max_tokens
+            )
+    # the ring buffer was compacted along the way
+    assert memory._base > 0
+    assert list(memory.iter_spilled()) == entries[: memory.num_spilled]
+    memory.close()
@@ -0,0 +1,62 @@
+import os
+import tracemalloc
+
+import pytest
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+from llama_index import GPTListIndex, ServiceContext  # noqa: E402
+from llama_index.data_structs.node import Node  # noqa: E402
+from llama_index.utils import globals_helper  # noqa: E402
+
+from auto_llama.storage import (  # noqa: E402
+    MappedNode,
+    load_binary_index,
+    save_binary_index,
+)
+
+NUM_NODES = 2000
+TEXT_LEN = 2000
+
+
+@pytest.fixture
+def index_path(tmp_path, monkeypatch):
+    # skip downloading the tiktoken vocabulary
+    monkeypatch.setattr(globals_helper, "_tokenizer", str.split)
+    service_context = ServiceContext.from_defaults()
+    nodes = [
+        Node(text=f"node {i} " + "x" * TEXT_LEN, extra_info={"page": i})
+        for i in range(NUM_NODES)
+    ]
+    path = str(tmp_path / "page.idx")
+    save_binary_index(GPTListIndex(nodes=nodes, service_context=service_context), path)
+    return path, service_context, nodes
+
+
+def test_load_does_not_decode_text(index_path, monkeypatch):
+    path, service_context, nodes = index_path
+    read_nodes = set()
+    text = MappedNode.text
+
+    def record_read(self):
+        read_nodes.add(self.doc_id)
+        return text.fget(self)
+
+    monkeypatch.setattr(MappedNode, "text", property(record_read, text.fset))
+
+    tracemalloc.start()
+    try:
+        index = load_binary_index(path, service_context)
+        allocated = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+    assert not read_nodes
+    # well under the size of the text, which stays in the mapped file
+    assert allocated < NUM_NODES * TEXT_LEN / 2
+
+    loaded = index.docstore.get_nodes(index.index_struct.nodes)
+    assert all(isinstance(node, MappedNode) for node in loaded)
+    assert loaded[7].get_text() == nodes[7].get_text()
+    assert loaded[7].get_doc_hash() == nodes[7].get_doc_hash()
+    assert read_nodes == {loaded[7].doc_id}
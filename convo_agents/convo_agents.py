@@ -68,8 +68,10 @@ class ConvoAgent(BaseModel):
     ) -> "ConvoAgent":
         name = name or "Agent"
         st_memory = st_memory or deque()
-        lt_memory = lt_memory or GPTVectorStoreIndex([])
         service_context = service_context or ServiceContext.from_defaults()
+        lt_memory = lt_memory or GPTVectorStoreIndex(
+            [], service_context=service_context
+        )
         return cls(
             name=name,
             st_memory=st_memory,
@@ -100,7 +102,7 @@ class ConvoAgent(BaseModel):
         )
         
         # add both the long-term memory summary and the short-term conversation
-        list_builder = GPTListIndex([])
+        list_builder = GPTListIndex([], service_context=self.service_context)
         list_builder.insert_nodes([Node(str(summary_response))])
         list_builder.insert_nodes([Node(st_memory_text)])
         
@@ -0,0 +1,193 @@
+"""Measure the overhead of the AutoAGIRunner loop, using a fake LLM.
+
+The task manager is seeded with the given number of current and completed
+tasks, and the runner is run for a fixed number of iterations with FakeLLM
+and FakeEmbedding, so no API calls are made and results are reproducible.
+For each task count, this reports the latency of an iteration (p50, p95 and
+mean), the LLM calls and prompt size per iteration, and how much memory the
+loop allocated and kept while running (measured in a separate run, since
+tracing slows down the loop).
+
+With --latency, the fake LLM sleeps on every call, to see how the loop
+overhead compares to realistic LLM latencies.
+
+Usage:
+    python benchmarks/agi_loop_benchmark.py --sizes 10 100 1000 10000
+    python benchmarks/agi_loop_benchmark.py --save-baseline baseline.json
+    python benchmarks/agi_loop_benchmark.py --baseline baseline.json
+"""
+import argparse
+import contextlib
+import gc
+import os
+import time
+import tracemalloc
+from typing import Any, Dict, List
+
+import numpy as np
+
+from fakes import (
+    FakeEmbedding,
+    FakeLLM,
+    make_service_context,
+    make_task,
+    use_offline_tokenizer,
+)
+from regression import Results, add_regression_args, check_regressions
+
+from llama_agi.default_task_prompts import LC_EXECUTION_PROMPT
+from llama_agi.execution_agent.base import LlamaAgentPrompts
+from llama_agi.execution_agent.SimpleExecutionAgent import SimpleExecutionAgent
+from llama_agi.runners.AutoAGIRunner import AutoAGIRunner
+from llama_agi.task_manager.LlamaTaskManager import LlamaTaskManager
+
+OBJECTIVE = "Plan a product launch for a new line of kitchen appliances"
+
+# the minimum change of each metric that counts as a regression
+METRICS = {
+    "p50_ms": 1.0,
+    "p95_ms": 1.0,
+    "llm_calls_per_iteration": 0.0,
+    "memory_growth_kb": 256.0,
+}
+
+
+class _IterationTimer:
+    """Records when the runner starts executing each task.
+
+    With trace, also records the memory allocated (and still in use) between
+    the first task and stop(), which is called while the runner is alive.
+    """
+
+    def __init__(self, runner: AutoAGIRunner, llm: FakeLLM, trace: bool) -> None:
+        self.llm = llm
+        self.trace = trace
+        self.start_times: List[float] = []
+        self.start_calls = 0
+        self.start_prompt_chars = 0
+        self.memory_growth = 0
+        self._execute_task = runner.execution_agent.execute_task
+        setattr(runner.execution_agent, "execute_task", self.execute_task)
+
+    def execute_task(self, **prompt_kwargs: Any) -> Dict[str, str]:
+        if not self.start_times:
+            self.start_calls = self.llm.num_calls
+            self.start_prompt_chars = self.llm.num_prompt_chars
+            if self.trace:
+                gc.collect()
+                self.memory_growth = -tracemalloc.get_traced_memory()[0]
+        self.start_times.append(time.perf_counter())
+        return self._execute_task(**prompt_kwargs)
+
+    def stop(self) -> None:
+        self.start_times.append(time.perf_counter())
+        if self.trace:
+            gc.collect()
+            self.memory_growth += tracemalloc.get_traced_memory()[0]
+
+
+def make_runner(
+    num_tasks: int, llm: FakeLLM, embed_model: FakeEmbedding
+) -> AutoAGIRunner:
+    task_manager = LlamaTaskManager(
+        [], task_service_context=make_service_context(llm, embed_model)
+    )
+    for i in range(num_tasks):
+        task_manager.add_completed_task(make_task(num_tasks + i), "Done.")
+    execution_agent = SimpleExecutionAgent(
+        llm=llm,
+        prompts=LlamaAgentPrompts(
+            execution_prompt=LC_EXECUTION_PROMPT.replace("{task}", "{cur_task}")
+        ),
+    )
+    return AutoAGIRunner(task_manager, execution_agent)
+
+
+def run_loop(
+    num_tasks: int, iterations: int, latency: float, trace: bool
+) -> _IterationTimer:
+    llm = FakeLLM(latency=latency)
+    runner = make_runner(num_tasks, llm, FakeEmbedding(latency=latency))
+    timer = _IterationTimer(runner, llm, trace)
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        runner.run(
+            OBJECTIVE,
+            "Create a list of tasks",
+            sleep_time=0,
+            initial_task_list=[make_task(i) for i in range(num_tasks)],
+            max_iterations=iterations,
+        )
+        timer.stop()
+    return timer
+
+
+def benchmark(num_tasks: int, iterations: int, latency: float) -> Dict[str, float]:
+    timer = run_loop(num_tasks, iterations, latency, trace=False)
+    num_iterations = len(timer.start_times) - 1
+    latencies = np.diff(timer.start_times) * 1000
+    calls = timer.llm.num_calls - timer.start_calls
+    prompt_chars = timer.llm.num_prompt_chars - timer.start_prompt_chars
+
+    tracemalloc.start()
+    try:
+        memory_growth = run_loop(
+            num_tasks, iterations, latency, trace=True
+        ).memory_growth
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "iterations": num_iterations,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "mean_ms": float(latencies.mean()),
+        "llm_calls_per_iteration": calls / num_iterations,
+        "prompt_kchars_per_iteration": prompt_chars / num_iterations / 1000,
+        "memory_growth_kb": memory_growth / 1024,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark the AutoAGIRunner loop with a fake LLM."
+    )
+    parser.add_argument(
+        "--sizes",
+        nargs="+",
+        type=int,
+        default=[10, 100, 1000, 10000],
+        help="Number of current and completed tasks to benchmark with.",
+    )
+    parser.add_argument(
+        "--iterations",
+        type=int,
+        default=20,
+        help="Loop iterations to run for each size. Default=20",
+    )
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.0,
+        help="Seconds the fake LLM and embedding model sleep per call. Default=0",
+    )
+    add_regression_args(parser)
+    args = parser.parse_args()
+
+    use_offline_tokenizer()
+
+    results: Results = {}
+    print(
+        f"{'tasks':>8} {'p50 (ms)':>10} {'p95 (ms)':>10} {'mean (ms)':>10} "
+        f"{'LLM calls':>10} {'prompt kB':>10} {'memory (kB)':>12}"
+    )
+    for size in args.sizes:
+        result = benchmark(size, args.iterations, args.latency)
+        results[f"tasks={size}"] = result
+        print(
+            f"{size:>8} {result['p50_ms']:>10.2f} {result['p95_ms']:>10.2f} "
+            f"{result['mean_ms']:>10.2f} {result['llm_calls_per_iteration']:>10.1f} "
+            f"{result['prompt_kchars_per_iteration']:>10.1f} "
+            f"{result['memory_growth_kb']:>12.1f}"
+        )
+
+    check_regressions(args, results, METRICS)
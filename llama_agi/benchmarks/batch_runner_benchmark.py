@@ -0,0 +1,126 @@
+"""Measure the throughput of the BatchAGIRunner, using a fake LLM.
+
+For each number of objectives, a batch is run with FakeLLM and FakeEmbedding
+shared through one LLMPool, with a fixed number of iterations per objective.
+The fake LLM sleeps on every call, so this measures how well the batch
+overlaps LLM calls: throughput (tasks executed per second) should grow with
+the number of objectives until the pool's max_concurrency is reached, and
+stay flat after that, while the time calls wait for a slot grows.
+
+Usage:
+    python benchmarks/batch_runner_benchmark.py --sizes 1 2 4 8 16 32
+    python benchmarks/batch_runner_benchmark.py --max-concurrency 4 --latency 0.1
+"""
+import argparse
+import time
+from typing import Dict
+
+from fakes import FakeEmbedding, FakeLLM, make_task, use_offline_tokenizer
+from regression import Results, add_regression_args, check_regressions
+
+from llama_agi.default_task_prompts import LC_EXECUTION_PROMPT
+from llama_agi.execution_agent.base import LlamaAgentPrompts
+from llama_agi.execution_agent.SimpleExecutionAgent import SimpleExecutionAgent
+from llama_agi.llm_pool import LLMPool
+from llama_agi.runners.BatchAGIRunner import BatchAGIRunner, BatchObjective
+
+# the minimum change of each metric that counts as a regression
+METRICS = {
+    "seconds_per_task": 0.001,
+    "llm_calls_per_task": 0.0,
+}
+
+
+def benchmark(
+    num_objectives: int, iterations: int, latency: float, max_concurrency: int
+) -> Dict[str, float]:
+    pool = LLMPool(
+        FakeLLM(latency=latency),
+        embed_model=FakeEmbedding(),
+        max_concurrency=max_concurrency,
+    )
+    prompts = LlamaAgentPrompts(
+        execution_prompt=LC_EXECUTION_PROMPT.replace("{task}", "{cur_task}")
+    )
+    runner = BatchAGIRunner(
+        pool,
+        lambda: SimpleExecutionAgent(llm=pool.llm, prompts=prompts),
+        max_iterations=iterations,
+    )
+    objectives = [
+        BatchObjective(
+            objective=f"Objective {i}",
+            initial_task_list=[make_task(i * 1000 + j) for j in range(3)],
+        )
+        for i in range(num_objectives)
+    ]
+
+    start_time = time.perf_counter()
+    records = runner.run(objectives)
+    duration = time.perf_counter() - start_time
+
+    failed = [x for x in records if x["status"] != "completed"]
+    if failed:
+        raise RuntimeError(f"Objective failed: {failed[0]['error']}")
+    num_tasks = sum(x["metrics"]["num_completed_tasks"] for x in records)
+    pool_metrics = pool.metrics()
+    return {
+        "tasks": num_tasks,
+        "duration_s": duration,
+        "tasks_per_s": num_tasks / duration,
+        "seconds_per_task": duration / num_tasks,
+        "llm_calls_per_task": pool_metrics["llm_calls"] / num_tasks,
+        "max_in_flight": pool_metrics["max_in_flight"],
+        "mean_wait_ms": pool_metrics["mean_wait_ms"],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark the BatchAGIRunner throughput with a fake LLM."
+    )
+    parser.add_argument(
+        "--sizes",
+        nargs="+",
+        type=int,
+        default=[1, 2, 4, 8, 16, 32],
+        help="Number of objectives run at once.",
+    )
+    parser.add_argument(
+        "--iterations",
+        type=int,
+        default=5,
+        help="Tasks executed per objective. Default=5",
+    )
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.05,
+        help="Seconds the fake LLM sleeps per call. Default=0.05",
+    )
+    parser.add_argument(
+        "--max-concurrency",
+        type=int,
+        default=8,
+        help="LLM calls the pool makes at once. Default=8",
+    )
+    add_regression_args(parser)
+    args = parser.parse_args()
+
+    use_offline_tokenizer()
+
+    results: Results = {}
+    print(
+        f"{'objectives':>10} {'tasks':>6} {'time (s)':>9} {'tasks/s':>8} "
+        f"{'LLM calls':>10} {'in flight':>10} {'wait (ms)':>10}"
+    )
+    for size in args.sizes:
+        result = benchmark(size, args.iterations, args.latency, args.max_concurrency)
+        results[f"objectives={size}"] = result
+        print(
+            f"{size:>10} {result['tasks']:>6.0f} {result['duration_s']:>9.2f} "
+            f"{result['tasks_per_s']:>8.1f} {result['llm_calls_per_task']:>10.1f} "
+            f"{result['max_in_flight']:>10.0f} {result['mean_wait_ms']:>10.1f}"
+        )
+
+    check_regressions(args, results, METRICS)
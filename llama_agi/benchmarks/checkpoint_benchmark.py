@@ -0,0 +1,139 @@
+"""Measure the cost of checkpointing a run, and of restoring it, without an LLM.
+
+The task manager is seeded with the given number of current and completed
+tasks, then a fixed number of iterations is simulated without any LLM calls:
+each iteration completes the next task, adds new tasks and saves a
+checkpoint, like the runners do. For each task count, this reports the time
+taken to save a checkpoint (p50 and p95), the bytes written per iteration,
+compared to writing a full snapshot of the state every iteration, and the
+time taken to restore the run into a new task manager.
+
+With --fsync-every 1, every record is synced to disk as it is written.
+
+Usage:
+    python benchmarks/checkpoint_benchmark.py --sizes 10 100 1000 10000
+    python benchmarks/checkpoint_benchmark.py --fsync-every 1
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from typing import Dict
+
+import numpy as np
+from fakes import make_task
+from regression import Results, add_regression_args, check_regressions
+
+from llama_agi.checkpoint import CheckpointStore
+from llama_agi.task_manager.LlamaTaskManager import LlamaTaskManager
+
+OBJECTIVE = "Plan a product launch for a new line of kitchen appliances"
+RESULT = "Done. " * 50
+
+# the minimum change of each metric that counts as a regression
+METRICS = {
+    "p50_ms": 0.5,
+    "p95_ms": 0.5,
+    "kb_per_iteration": 1.0,
+    "restore_ms": 5.0,
+}
+
+
+def make_task_manager(num_tasks: int) -> LlamaTaskManager:
+    task_manager = LlamaTaskManager([])
+    task_manager.add_new_tasks([make_task(i) for i in range(num_tasks)])
+    for i in range(num_tasks):
+        task_manager.add_completed_task(make_task(num_tasks + i), RESULT)
+    return task_manager
+
+
+def benchmark(
+    num_tasks: int, iterations: int, fsync_every: int, directory: str
+) -> Dict[str, float]:
+    store = CheckpointStore(directory, fsync_every=fsync_every)
+    run_id = f"tasks-{num_tasks}-{fsync_every}"
+    task_manager = make_task_manager(num_tasks)
+
+    checkpoint = store.open(run_id)
+    checkpoint.write_start(OBJECTIVE, "Create a list of tasks", None, {})
+    checkpoint.write_iteration(0, "Summary", task_manager.get_state())
+    start_size = os.path.getsize(store.get_path(run_id))
+
+    save_times = []
+    snapshot_size = 0
+    next_task_id = 2 * num_tasks
+    for i in range(iterations):
+        task = task_manager.get_next_task()
+        task_manager.add_completed_task(task, RESULT)
+        task_manager.add_new_tasks(
+            [make_task(next_task_id), make_task(next_task_id + 1)]
+        )
+        next_task_id += 2
+
+        start_time = time.perf_counter()
+        state = task_manager.get_state()
+        checkpoint.write_iteration(i + 1, f"Summary after {i + 1} tasks", state)
+        save_times.append(time.perf_counter() - start_time)
+        snapshot_size += len(json.dumps(state))
+    checkpoint.close()
+    size = os.path.getsize(store.get_path(run_id)) - start_size
+
+    start_time = time.perf_counter()
+    run_state = store.load(run_id)
+    LlamaTaskManager([]).load_state(run_state.task_manager_state)
+    restore_time = time.perf_counter() - start_time
+
+    latencies = np.array(save_times) * 1000
+    return {
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "kb_per_iteration": size / iterations / 1024,
+        "snapshot_kb_per_iteration": snapshot_size / iterations / 1024,
+        "restore_ms": restore_time * 1000,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark saving and restoring checkpoints of a run."
+    )
+    parser.add_argument(
+        "--sizes",
+        nargs="+",
+        type=int,
+        default=[10, 100, 1000, 10000],
+        help="Number of current and completed tasks to benchmark with.",
+    )
+    parser.add_argument(
+        "--iterations",
+        type=int,
+        default=50,
+        help="Iterations to checkpoint for each size. Default=50",
+    )
+    parser.add_argument(
+        "--fsync-every",
+        type=int,
+        default=10,
+        help="Records written between syncs to disk. Default=10",
+    )
+    add_regression_args(parser)
+    args = parser.parse_args()
+
+    results: Results = {}
+    print(
+        f"{'tasks':>8} {'p50 (ms)':>10} {'p95 (ms)':>10} {'kB/iter':>10} "
+        f"{'snapshot kB/iter':>17} {'restore (ms)':>13}"
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            result = benchmark(size, args.iterations, args.fsync_every, directory)
+            results[f"tasks={size}"] = result
+            print(
+                f"{size:>8} {result['p50_ms']:>10.2f} {result['p95_ms']:>10.2f} "
+                f"{result['kb_per_iteration']:>10.2f} "
+                f"{result['snapshot_kb_per_iteration']:>17.1f} "
+                f"{result['restore_ms']:>13.1f}"
+            )
+
+    check_regressions(args, results, METRICS)
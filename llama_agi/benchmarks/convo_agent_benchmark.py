@@ -0,0 +1,148 @@
+"""Measure the overhead of a ConvoAgent conversation turn, using a fake LLM.
+
+Each agent's long-term memory is seeded with the given number of messages,
+then two agents talk for a fixed number of turns. A turn is one agent
+generating a message and both agents adding it to their memory. This reports
+the latency of a turn (p50, p95 and mean), the LLM and embedding calls per
+turn, and the memory kept by the conversation.
+
+ConvoAgent lives in the convo_agents folder of this repository, next to
+llama_agi.
+
+Usage:
+    python benchmarks/convo_agent_benchmark.py --sizes 10 100 1000 10000
+    python benchmarks/convo_agent_benchmark.py --baseline baseline.json
+"""
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+from typing import Dict, Tuple
+
+import numpy as np
+
+from fakes import FakeEmbedding, FakeLLM, make_service_context, use_offline_tokenizer
+from regression import Results, add_regression_args, check_regressions
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(__file__), os.pardir, os.pardir, "convo_agents")
+)
+from convo_agents import ConvoAgent  # noqa: E402
+
+# the minimum change of each metric that counts as a regression
+METRICS = {
+    "p50_ms": 1.0,
+    "p95_ms": 1.0,
+    "llm_calls_per_turn": 0.0,
+    "memory_growth_kb": 256.0,
+}
+
+
+def make_agents(
+    num_messages: int, llm: FakeLLM, embed_model: FakeEmbedding
+) -> Tuple[ConvoAgent, ConvoAgent]:
+    service_context = make_service_context(llm, embed_model)
+    agents = (
+        ConvoAgent.from_defaults(name="Alice", service_context=service_context),
+        ConvoAgent.from_defaults(name="Bob", service_context=service_context),
+    )
+    for i in range(num_messages):
+        message = llm(f"Earlier message {i}")
+        for agent in agents:
+            agent.add_message(message, agents[i % 2].name)
+    return agents
+
+
+def run_conversation(
+    agents: Tuple[ConvoAgent, ConvoAgent], turns: int
+) -> Tuple[np.ndarray, int]:
+    """Run the conversation, returning the turn latencies and memory growth."""
+    gc.collect()
+    start_memory = tracemalloc.get_traced_memory()[0]
+    start_times = [time.perf_counter()]
+    message = "Hi, nice to meet you!"
+    for turn in range(turns):
+        speaker = agents[turn % 2]
+        message = speaker.generate_message(message)
+        for agent in agents:
+            agent.add_message(message, speaker.name)
+        start_times.append(time.perf_counter())
+    gc.collect()
+    memory_growth = tracemalloc.get_traced_memory()[0] - start_memory
+    return np.diff(start_times) * 1000, memory_growth
+
+
+def benchmark(num_messages: int, turns: int, latency: float) -> Dict[str, float]:
+    llm = FakeLLM(latency=latency)
+    embed_model = FakeEmbedding(latency=latency)
+    agents = make_agents(num_messages, llm, embed_model)
+    start_llm_calls = llm.num_calls
+    start_embed_calls = embed_model.num_calls
+    latencies, _ = run_conversation(agents, turns)
+    llm_calls = llm.num_calls - start_llm_calls
+    embed_calls = embed_model.num_calls - start_embed_calls
+
+    agents = make_agents(num_messages, llm, embed_model)
+    tracemalloc.start()
+    try:
+        _, memory_growth = run_conversation(agents, turns)
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "turns": turns,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "mean_ms": float(latencies.mean()),
+        "llm_calls_per_turn": llm_calls / turns,
+        "embed_calls_per_turn": embed_calls / turns,
+        "memory_growth_kb": memory_growth / 1024,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark ConvoAgent conversation turns with a fake LLM."
+    )
+    parser.add_argument(
+        "--sizes",
+        nargs="+",
+        type=int,
+        default=[10, 100, 1000, 10000],
+        help="Number of messages in each agent's long-term memory.",
+    )
+    parser.add_argument(
+        "--turns",
+        type=int,
+        default=20,
+        help="Conversation turns to run for each size. Default=20",
+    )
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.0,
+        help="Seconds the fake LLM and embedding model sleep per call. Default=0",
+    )
+    add_regression_args(parser)
+    args = parser.parse_args()
+
+    use_offline_tokenizer()
+
+    results: Results = {}
+    print(
+        f"{'messages':>8} {'p50 (ms)':>10} {'p95 (ms)':>10} {'mean (ms)':>10} "
+        f"{'LLM calls':>10} {'embeds':>10} {'memory (kB)':>12}"
+    )
+    for size in args.sizes:
+        result = benchmark(size, args.turns, args.latency)
+        results[f"messages={size}"] = result
+        print(
+            f"{size:>8} {result['p50_ms']:>10.2f} {result['p95_ms']:>10.2f} "
+            f"{result['mean_ms']:>10.2f} {result['llm_calls_per_turn']:>10.1f} "
+            f"{result['embed_calls_per_turn']:>10.1f} "
+            f"{result['memory_growth_kb']:>12.1f}"
+        )
+
+    check_regressions(args, results, METRICS)
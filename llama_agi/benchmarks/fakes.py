@@ -0,0 +1,185 @@
+"""Deterministic stand-ins for the LLM and embedding model, for offline benchmarks.
+
+FakeLLM answers each prompt according to what the prompt asks for, so the
+AGI loop behaves like it does with a real LLM:
+
+- task prioritization prompts get the tasks in the prompt back as a
+  numbered list
+- task creation prompts get num_new_tasks new tasks as a numbered list
+  (refine prompts repeat the tasks created so far)
+- every other prompt gets output_words words of text
+
+Like a real LLM, the output is cut off after max_tokens tokens, so
+prioritizing a long task list only returns the tasks that fit.
+
+FakeEmbedding hashes the words of a text into a fixed size vector, so texts
+sharing words are similar.
+"""
+import asyncio
+import hashlib
+import re
+import time
+from typing import List, Optional
+
+import numpy as np
+from langchain.callbacks.manager import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain.llms.base import LLM
+from llama_index import LLMPredictor, ServiceContext
+from llama_index.embeddings.base import BaseEmbedding
+from llama_index.utils import globals_helper
+
+_SEPARATOR = "---------------------"
+_WORDS = (
+    "analyze research plan draft review compare measure collect summarize "
+    "evaluate design prototype test document survey interview estimate "
+    "identify prioritize outline"
+).split()
+
+
+def _approximate_tokenizer(text: str) -> List[str]:
+    return re.findall(r"\w+|[^\w\s]", text)
+
+
+def make_task(task_id: int) -> str:
+    """Get the task with the given id."""
+    return f"Research sub-problem number {task_id}"
+
+
+def _lines_between_separators(prompt: str) -> List[str]:
+    parts = prompt.split(_SEPARATOR)
+    if len(parts) < 3:
+        return []
+    return [x.strip() for x in parts[1].split("\n") if x.strip()]
+
+
+def _strip_number(line: str) -> str:
+    return re.sub(r"^[0-9]+\.", "", line).strip()
+
+
+class FakeLLM(LLM):
+    """A deterministic LLM with a configurable latency and output size."""
+
+    latency: float = 0.0
+    num_new_tasks: int = 2
+    output_words: int = 50
+    max_tokens: int = 512
+    num_calls: int = 0
+    num_prompt_chars: int = 0
+    num_tasks_created: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    def _next_task(self) -> str:
+        task_id = self.num_tasks_created
+        self.num_tasks_created += 1
+        # distinct from the tasks benchmarks start with
+        return f"Follow up on sub-problem number {task_id}"
+
+    def _prioritize(self, prompt: str) -> str:
+        tasks = []
+        if "following list of prioritized tasks:" in prompt:
+            existing_answer = prompt.split("following list of prioritized tasks:")[1]
+            existing_answer = existing_answer.split("Given the current objective")[0]
+            tasks = [_strip_number(x) for x in existing_answer.split("\n")]
+        tasks += [_strip_number(x) for x in _lines_between_separators(prompt)]
+        tasks = [x for x in tasks if x]
+        return "\n".join(f"{i + 1}. {task}" for i, task in enumerate(tasks))
+
+    def _create_tasks(self, prompt: str) -> str:
+        if "you have created the following new tasks:" in prompt:
+            existing_answer = prompt.split("you have created the following new tasks:")
+            return existing_answer[1].split("Given the current objective")[0].strip()
+        tasks = [self._next_task() for _ in range(self.num_new_tasks)]
+        return "\n".join(f"{i + 1}. {task}" for i, task in enumerate(tasks))
+
+    def _text(self, prompt: str) -> str:
+        seed = int(hashlib.md5(prompt.encode()).hexdigest()[:8], 16)
+        return " ".join(
+            _WORDS[(seed + i) % len(_WORDS)] for i in range(self.output_words)
+        )
+
+    def _truncate(self, text: str) -> str:
+        lines = []
+        num_tokens = 0
+        for line in text.split("\n"):
+            num_tokens += len(_approximate_tokenizer(line))
+            if num_tokens > self.max_tokens:
+                break
+            lines.append(line)
+        return "\n".join(lines)
+
+    def _call(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+    ) -> str:
+        if self.latency:
+            time.sleep(self.latency)
+        return self._respond(prompt)
+
+    async def _acall(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+    ) -> str:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._respond(prompt)
+
+    def _respond(self, prompt: str) -> str:
+        self.num_calls += 1
+        self.num_prompt_chars += len(prompt)
+        if "prioritize the current list of tasks" in prompt:
+            return self._truncate(self._prioritize(prompt))
+        if "new tasks" in prompt:
+            return self._truncate(self._create_tasks(prompt))
+        return self._text(prompt)
+
+
+class FakeEmbedding(BaseEmbedding):
+    """Embeds texts by hashing their words into a dim sized vector."""
+
+    def __init__(self, dim: int = 256, latency: float = 0.0) -> None:
+        super().__init__()
+        self.dim = dim
+        self.latency = latency
+        self.num_calls = 0
+
+    def _embed(self, text: str) -> List[float]:
+        if self.latency:
+            time.sleep(self.latency)
+        self.num_calls += 1
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for word in re.findall(r"\w+", text.lower()):
+            digest = hashlib.md5(word.encode()).digest()
+            vector[int.from_bytes(digest[:4], "little") % self.dim] += 1.0
+        norm = float(np.linalg.norm(vector))
+        return (vector / norm if norm else vector).tolist()
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return self._embed(query)
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+def use_offline_tokenizer() -> None:
+    """Count tokens with a regex instead of tiktoken, which downloads its vocabulary."""
+    globals_helper._tokenizer = _approximate_tokenizer
+
+
+def make_service_context(
+    llm: FakeLLM, embed_model: Optional[FakeEmbedding] = None
+) -> ServiceContext:
+    return ServiceContext.from_defaults(
+        llm_predictor=LLMPredictor(llm=llm),
+        embed_model=embed_model or FakeEmbedding(),
+        chunk_size_limit=512,
+    )
@@ -0,0 +1,295 @@
+"""A local stand-in for the OpenAI API, which rate limits its clients.
+
+RateLimitedServer answers the completions, chat completions and embeddings
+endpoints of the OpenAI API with canned responses, after a fixed latency.
+Like the real API, it limits the requests and tokens (the prompt plus
+max_tokens) per minute with token buckets, and answers requests over the
+limits with a 429 and a Retry-After header. It counts the requests it
+accepted and rate limited, so a client can check how often it was throttled.
+
+Point the openai package at it to test rate limit handling offline:
+
+    with RateLimitedServer(requests_per_minute=60) as server:
+        openai.api_base = server.api_base
+        openai.api_key = "test"
+        ...
+
+Or run it on its own:
+    python benchmarks/rate_limited_server.py --port 8000 --requests-per-minute 60
+"""
+import argparse
+import json
+import math
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+
+def _count_tokens(text: str) -> int:
+    # the same approximation as the offline tokenizer of the benchmarks
+    return len(re.findall(r"\w+|[^\w\s]", text))
+
+
+def _as_list(value: Union[str, List[str]]) -> List[str]:
+    return [value] if isinstance(value, str) else list(value)
+
+
+class _Bucket:
+    def __init__(self, per_minute: float, burst_seconds: float) -> None:
+        self.rate = per_minute / 60
+        self.capacity = self.rate * burst_seconds
+        self.level = self.capacity
+        self.last_time = time.monotonic()
+
+    def wait_time(self, amount: float, now: float) -> float:
+        self.level = min(self.capacity, self.level + (now - self.last_time) * self.rate)
+        self.last_time = now
+        return max(min(amount, self.capacity) - self.level, 0.0) / self.rate
+
+
+class RateLimitedServer:
+    """Rate Limited Server
+
+    Serves the OpenAI API on a local port, from a background thread, while
+    used as a context manager.
+
+    Args:
+        requests_per_minute (Optional[float]): The requests accepted per minute.
+        tokens_per_minute (Optional[float]): The tokens accepted per minute.
+        burst_seconds (float): The seconds of quota that can be used at once.
+        latency (float): The seconds taken to answer each accepted request.
+        completion_words (int): The number of words in each completion.
+        port (int): The port to listen on. Defaults to any free port.
+
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        burst_seconds: float = 1.0,
+        latency: float = 0.0,
+        completion_words: int = 20,
+        port: int = 0,
+    ) -> None:
+        self.request_bucket = (
+            _Bucket(requests_per_minute, burst_seconds) if requests_per_minute else None
+        )
+        self.token_bucket = (
+            _Bucket(tokens_per_minute, burst_seconds) if tokens_per_minute else None
+        )
+        self.latency = latency
+        self.completion_words = completion_words
+        self.num_accepted = 0
+        self.num_rate_limited = 0
+        self._lock = threading.Lock()
+
+        server = self
+
+        class Handler(_OpenAIHandler):
+            rate_limited_server = server
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def api_base(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def admit(self, tokens: int) -> float:
+        """Admit a request, or get the seconds until it would be admitted."""
+        with self._lock:
+            now = time.monotonic()
+            wait_time = 0.0
+            if self.request_bucket is not None:
+                wait_time = max(wait_time, self.request_bucket.wait_time(1, now))
+            if self.token_bucket is not None:
+                wait_time = max(wait_time, self.token_bucket.wait_time(tokens, now))
+            if wait_time > 0:
+                self.num_rate_limited += 1
+                return wait_time
+            if self.request_bucket is not None:
+                self.request_bucket.level -= 1
+            if self.token_bucket is not None:
+                self.token_bucket.level -= tokens
+            self.num_accepted += 1
+            return 0.0
+
+    def completion(self) -> str:
+        return " ".join(["done"] * self.completion_words)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "accepted": self.num_accepted,
+                "rate_limited": self.num_rate_limited,
+            }
+
+    def __enter__(self) -> "RateLimitedServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+
+class _OpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    rate_limited_server: RateLimitedServer
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def _send_json(
+        self, status: int, body: Dict[str, Any], headers: Optional[Dict] = None
+    ) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _completions(self, request: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        prompts = _as_list(request.get("prompt", ""))
+        prompt_tokens = sum(_count_tokens(x) for x in prompts)
+        max_tokens = request.get("max_tokens") or 16
+        text = self.rate_limited_server.completion()
+        choices = [
+            {"text": text, "index": i, "logprobs": None, "finish_reason": "stop"}
+            for i in range(len(prompts))
+        ]
+        completion_tokens = _count_tokens(text) * len(prompts)
+        body = {"object": "text_completion", "choices": choices}
+        return prompt_tokens + max_tokens * len(prompts), self._usage(
+            body, prompt_tokens, completion_tokens
+        )
+
+    def _chat_completions(self, request: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        prompt_tokens = sum(
+            _count_tokens(x.get("content", "")) + 4 for x in request.get("messages", [])
+        )
+        max_tokens = request.get("max_tokens") or 0
+        text = self.rate_limited_server.completion()
+        choices = [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": text},
+                "finish_reason": "stop",
+            }
+        ]
+        body = {"object": "chat.completion", "choices": choices}
+        return prompt_tokens + max_tokens, self._usage(
+            body, prompt_tokens, _count_tokens(text)
+        )
+
+    def _embeddings(self, request: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        texts = _as_list(request.get("input", ""))
+        tokens = sum(_count_tokens(x) for x in texts)
+        data = [
+            {
+                "object": "embedding",
+                "index": i,
+                "embedding": [float(len(x) % (j + 2)) for j in range(8)],
+            }
+            for i, x in enumerate(texts)
+        ]
+        return tokens, self._usage({"object": "list", "data": data}, tokens, 0)
+
+    def _usage(
+        self, body: Dict[str, Any], prompt_tokens: int, completion_tokens: int
+    ) -> Dict[str, Any]:
+        body.update(
+            {
+                "id": f"stand-in-{time.monotonic_ns()}",
+                "created": int(time.time()),
+                "model": "stand-in",
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                },
+            }
+        )
+        return body
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+
+        endpoints = {
+            "/v1/completions": self._completions,
+            "/v1/chat/completions": self._chat_completions,
+            "/v1/embeddings": self._embeddings,
+        }
+        endpoint = endpoints.get(self.path.rstrip("/"))
+        if endpoint is None or request.get("stream"):
+            error = {"message": "Not supported by the stand-in server"}
+            self._send_json(404, {"error": error})
+            return
+
+        tokens, body = endpoint(request)
+        server = self.rate_limited_server
+        wait_time = server.admit(tokens)
+        if wait_time > 0:
+            error = {
+                "message": "Rate limit reached. Please try again later.",
+                "type": "requests",
+                "code": "rate_limit_exceeded",
+            }
+            headers = {"Retry-After": str(max(1, math.ceil(wait_time)))}
+            self._send_json(429, {"error": error}, headers)
+            return
+
+        if server.latency:
+            time.sleep(server.latency)
+        self._send_json(200, body)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Serve a rate limited stand-in for the OpenAI API."
+    )
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--requests-per-minute",
+        type=float,
+        default=60,
+        help="Requests accepted per minute. Default=60",
+    )
+    parser.add_argument(
+        "--tokens-per-minute",
+        type=float,
+        default=None,
+        help="Tokens accepted per minute. Default=no limit",
+    )
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.2,
+        help="Seconds taken to answer each request. Default=0.2",
+    )
+    args = parser.parse_args()
+
+    with RateLimitedServer(
+        requests_per_minute=args.requests_per_minute,
+        tokens_per_minute=args.tokens_per_minute,
+        latency=args.latency,
+        port=args.port,
+    ) as server:
+        print(f"Serving the OpenAI API at {server.api_base}, press Ctrl+C to stop")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            print(server.stats())
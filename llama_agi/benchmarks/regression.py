@@ -0,0 +1,87 @@
+"""Save benchmark results and compare them against a saved baseline.
+
+Results are stored as JSON, mapping each benchmark case (e.g. "tasks=100")
+to its metrics. Only metrics where lower is better are compared, and a
+metric only regresses if it grew by more than both the relative threshold and
+the metric's own minimum change, so noise in tiny values is ignored.
+"""
+import argparse
+import json
+import sys
+from typing import Dict, List
+
+Results = Dict[str, Dict[str, float]]
+
+
+def add_regression_args(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--save-baseline",
+        type=str,
+        default=None,
+        help="Save the results as a baseline JSON file.",
+    )
+    parser.add_argument(
+        "--baseline",
+        type=str,
+        default=None,
+        help="Compare the results against a baseline JSON file.",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="Relative increase of a metric that counts as a regression. "
+        "Default=0.2",
+    )
+
+
+def save_results(path: str, results: Results) -> None:
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+
+
+def load_results(path: str) -> Results:
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def find_regressions(
+    results: Results,
+    baseline: Results,
+    metrics: Dict[str, float],
+    threshold: float,
+) -> List[str]:
+    """Describe every metric that grew by more than threshold over the baseline."""
+    regressions = []
+    for case, case_results in results.items():
+        for metric, min_change in metrics.items():
+            old = baseline.get(case, {}).get(metric)
+            new = case_results.get(metric)
+            if old is None or new is None:
+                continue
+            if new > old * (1 + threshold) and new - old > min_change:
+                regressions.append(
+                    f"{case} {metric}: {old:.3f} -> {new:.3f} "
+                    f"(+{(new - old) / max(old, 1e-9):.0%})"
+                )
+    return regressions
+
+
+def check_regressions(
+    args: argparse.Namespace, results: Results, metrics: Dict[str, float]
+) -> None:
+    """Save or compare the results as requested, exiting with 1 on a regression."""
+    if args.save_baseline:
+        save_results(args.save_baseline, results)
+        print(f"Saved baseline to {args.save_baseline}")
+
+    if args.baseline:
+        regressions = find_regressions(
+            results, load_results(args.baseline), metrics, args.threshold
+        )
+        if regressions:
+            print(f"Regressions over {args.threshold:.0%}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print("No regressions.")
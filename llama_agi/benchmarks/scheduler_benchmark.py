@@ -0,0 +1,198 @@
+"""Measure how LLM calls cope with rate limits, against a local stand-in server.
+
+A RateLimitedServer (see rate_limited_server.py) stands in for the OpenAI
+API, and the openai package is pointed at it. A burst of completion and
+embedding calls is then made at once, half of them with execution priority
+and half with summarization priority, in each mode:
+
+- unscheduled: the calls go straight to the server, and are retried by the
+  LLM and embedding model themselves when they get a 429
+- backoff: the calls go through an LLMScheduler without rate limits, which
+  retries the ones that get a 429 after a jittered backoff
+- scheduled: the calls go through an LLMScheduler with the same rate limits
+  as the server, so they should rarely get a 429
+
+For each mode, this reports the wall time, the 429s sent by the server, the
+calls that failed after their last retry, and the mean latency of execution
+and summarization calls that succeeded. No API key or network
+access is needed.
+
+Usage:
+    python benchmarks/scheduler_benchmark.py --calls 60
+    python benchmarks/scheduler_benchmark.py --modes scheduled --tokens-per-minute 0
+"""
+import argparse
+import asyncio
+import logging
+import time
+from typing import Dict, List, Tuple
+
+import aiohttp
+import openai
+from fakes import use_offline_tokenizer
+from langchain.llms import BaseLLM, OpenAI
+from llama_index.embeddings.base import BaseEmbedding
+from llama_index.embeddings.openai import OpenAIEmbedding
+from rate_limited_server import RateLimitedServer
+from regression import Results, add_regression_args, check_regressions
+
+from llama_agi.scheduler import (
+    LLMScheduler,
+    Priority,
+    ScheduledEmbedding,
+    ScheduledLLM,
+    llm_priority,
+)
+
+MODES = ["unscheduled", "backoff", "scheduled"]
+
+# the minimum change of each metric that counts as a regression
+METRICS = {
+    "duration_s": 0.5,
+    "execution_latency_s": 0.5,
+    "server_429s": 2.0,
+    "failed_calls": 0.0,
+}
+
+
+async def make_calls(
+    llm: BaseLLM, embed_model: BaseEmbedding, num_calls: int
+) -> Tuple[Dict[Priority, List[float]], int]:
+    """Make num_calls calls at once, returning their latencies and the failures."""
+    latencies: Dict[Priority, List[float]] = {
+        Priority.EXECUTION: [],
+        Priority.SUMMARIZATION: [],
+    }
+    failures = []
+
+    async def call(i: int) -> None:
+        priority = Priority.EXECUTION if i % 2 == 0 else Priority.SUMMARIZATION
+        start_time = time.perf_counter()
+        try:
+            with llm_priority(priority):
+                if i % 5 == 4:
+                    await embed_model._aget_text_embeddings([f"Text number {i}"])
+                else:
+                    await llm.agenerate([f"Write a short note about task {i}."])
+        except Exception as e:
+            # e.g. still rate limited after the last retry
+            failures.append(e)
+            return
+        latencies[priority].append(time.perf_counter() - start_time)
+
+    async with aiohttp.ClientSession() as session:
+        token = openai.aiosession.set(session)
+        try:
+            await asyncio.gather(*(call(i) for i in range(num_calls)))
+        finally:
+            openai.aiosession.reset(token)
+    return latencies, len(failures)
+
+
+def benchmark(mode: str, args: argparse.Namespace) -> Dict[str, float]:
+    tokens_per_minute = args.tokens_per_minute or None
+    with RateLimitedServer(
+        requests_per_minute=args.requests_per_minute,
+        tokens_per_minute=tokens_per_minute,
+        latency=args.latency,
+    ) as server:
+        openai.api_base = server.api_base
+        openai.api_key = "test"
+
+        scheduler = None
+        llm: BaseLLM = OpenAI(
+            openai_api_key="test",
+            openai_api_base=server.api_base,
+            max_tokens=args.max_tokens,
+            max_retries=6 if mode == "unscheduled" else 1,
+        )
+        embed_model: BaseEmbedding = OpenAIEmbedding()
+        if mode != "unscheduled":
+            scheduler = LLMScheduler(
+                requests_per_minute=(
+                    args.requests_per_minute if mode == "scheduled" else None
+                ),
+                tokens_per_minute=tokens_per_minute if mode == "scheduled" else None,
+                initial_backoff=0.5,
+            )
+            llm = ScheduledLLM(llm=llm, scheduler=scheduler)
+            embed_model = ScheduledEmbedding(embed_model, scheduler)
+
+        start_time = time.perf_counter()
+        latencies, num_failed = asyncio.run(make_calls(llm, embed_model, args.calls))
+        duration = time.perf_counter() - start_time
+        server_stats = server.stats()
+
+    execution = latencies[Priority.EXECUTION]
+    summarization = latencies[Priority.SUMMARIZATION]
+    return {
+        "duration_s": duration,
+        "server_429s": server_stats["rate_limited"],
+        "failed_calls": num_failed,
+        "execution_latency_s": sum(execution) / max(len(execution), 1),
+        "summarization_latency_s": sum(summarization) / max(len(summarization), 1),
+        "max_queue_depth": scheduler.metrics()["max_queue_depth"] if scheduler else 0,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark the LLMScheduler against a rate limited stand-in server."
+    )
+    parser.add_argument(
+        "--modes", nargs="+", choices=MODES, default=MODES, help="Modes to run."
+    )
+    parser.add_argument(
+        "--calls",
+        type=int,
+        default=40,
+        help="Calls made at once. Default=40",
+    )
+    parser.add_argument(
+        "--requests-per-minute",
+        type=float,
+        default=600,
+        help="Requests per minute the server accepts. Default=600",
+    )
+    parser.add_argument(
+        "--tokens-per-minute",
+        type=float,
+        default=60000,
+        help="Tokens per minute the server accepts, 0 for no limit. Default=60000",
+    )
+    parser.add_argument(
+        "--max-tokens",
+        type=int,
+        default=256,
+        help="The max_tokens of each completion. Default=256",
+    )
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.05,
+        help="Seconds the server takes to answer each request. Default=0.05",
+    )
+    add_regression_args(parser)
+    args = parser.parse_args()
+
+    use_offline_tokenizer()
+    # langchain logs every retry of the unscheduled calls
+    logging.getLogger("langchain").setLevel(logging.ERROR)
+
+    results: Results = {}
+    print(
+        f"{'mode':>12} {'time (s)':>9} {'429s':>6} {'failed':>7} {'execution (s)':>14} "
+        f"{'summarization (s)':>18} {'max queue':>10}"
+    )
+    for mode in args.modes:
+        result = benchmark(mode, args)
+        results[f"mode={mode}"] = result
+        print(
+            f"{mode:>12} {result['duration_s']:>9.2f} {result['server_429s']:>6.0f} "
+            f"{result['failed_calls']:>7.0f} "
+            f"{result['execution_latency_s']:>14.2f} "
+            f"{result['summarization_latency_s']:>18.2f} "
+            f"{result['max_queue_depth']:>10.0f}"
+        )
+
+    check_regressions(args, results, METRICS)
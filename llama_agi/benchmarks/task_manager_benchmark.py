@@ -0,0 +1,96 @@
+"""Measure the non-LLM overhead of a LlamaTaskManager loop iteration.
+
+Each iteration performs the task bookkeeping done by the runners (pop the next
+task, record it as completed, add new tasks) and then requests the query
+engines, which is when the task indexes are actually built. No LLM calls are
+made, so only the index bookkeeping is measured. Tasks are chunked and counted
+with the offline fakes, so no API key or network access is needed.
+
+Usage:
+    python benchmarks/task_manager_benchmark.py --sizes 10 100 1000 5000
+"""
+import argparse
+import time
+from typing import List
+
+from llama_index import Document, ServiceContext
+
+from fakes import FakeLLM, make_service_context, make_task, use_offline_tokenizer
+
+from llama_agi.task_manager import LlamaTaskManager
+from llama_agi.utils import initialize_task_list_index
+
+
+def make_tasks(n: int, offset: int = 0) -> List[str]:
+    return [make_task(offset + i) for i in range(n)]
+
+
+def time_incremental(
+    num_tasks: int, iterations: int, service_context: ServiceContext
+) -> float:
+    task_manager = LlamaTaskManager(
+        make_tasks(num_tasks), task_service_context=service_context
+    )
+    for task in make_tasks(num_tasks, offset=num_tasks):
+        task_manager.add_completed_task(task, "done")
+    # warm up both indexes so only per-iteration work is measured
+    task_manager.current_tasks_index.index
+    task_manager.completed_tasks_index.index
+
+    start = time.perf_counter()
+    for i in range(iterations):
+        cur_task = task_manager.get_next_task()
+        task_manager.add_completed_task(cur_task, "done")
+        task_manager.add_new_tasks([make_task(2 * num_tasks + i)])
+        task_manager.current_tasks_index.as_query_engine()
+        task_manager.completed_tasks_index.as_query_engine()
+    return (time.perf_counter() - start) / iterations
+
+
+def time_full_rebuild(
+    num_tasks: int, iterations: int, service_context: ServiceContext
+) -> float:
+    current_tasks = [Document(x) for x in make_tasks(num_tasks)]
+    completed_tasks = [
+        Document(f"Task: {x}\nResult: done\n")
+        for x in make_tasks(num_tasks, offset=num_tasks)
+    ]
+
+    start = time.perf_counter()
+    for i in range(iterations):
+        cur_task = current_tasks.pop().get_text()
+        initialize_task_list_index(current_tasks, service_context=service_context)
+        completed_tasks.append(Document(f"Task: {cur_task}\nResult: done\n"))
+        initialize_task_list_index(completed_tasks, service_context=service_context)
+        current_tasks.append(Document(make_task(2 * num_tasks + i)))
+        initialize_task_list_index(current_tasks, service_context=service_context)
+    return (time.perf_counter() - start) / iterations
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark per-iteration task manager overhead."
+    )
+    parser.add_argument(
+        "--sizes",
+        nargs="+",
+        type=int,
+        default=[10, 100, 1000, 5000],
+        help="Number of current and completed tasks to benchmark with.",
+    )
+    parser.add_argument(
+        "--iterations",
+        type=int,
+        default=20,
+        help="Loop iterations to average over. Default=20",
+    )
+    args = parser.parse_args()
+
+    use_offline_tokenizer()
+    service_context = make_service_context(FakeLLM())
+
+    print(f"{'tasks':>8} {'incremental (ms)':>18} {'full rebuild (ms)':>18}")
+    for size in args.sizes:
+        incremental = time_incremental(size, args.iterations, service_context)
+        full_rebuild = time_full_rebuild(size, args.iterations, service_context)
+        print(f"{size:>8} {incremental * 1000:>18.3f} {full_rebuild * 1000:>18.3f}")
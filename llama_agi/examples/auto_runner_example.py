@@ -2,12 +2,17 @@ import argparse
 from langchain.agents import load_tools
 from langchain.llms import OpenAI
 
+from llama_agi.checkpoint import CheckpointStore
+from llama_agi.completion_cache import CachedLLMPredictor, enable_completion_cache
 from llama_agi.execution_agent import ToolExecutionAgent
 from llama_agi.runners import AutoAGIRunner
+from llama_agi.scheduler import LLMScheduler, ScheduledEmbedding, get_scheduled_llm
 from llama_agi.task_manager import LlamaTaskManager
 from llama_agi.tools import search_notes, record_note, search_webpage
+from llama_agi.tracing import Tracer
 
-from llama_index import ServiceContext, LLMPredictor
+from llama_index import ServiceContext
+from llama_index.embeddings.openai import OpenAIEmbedding
 
 
 if __name__ == "__main__":
@@ -34,12 +39,84 @@ if __name__ == "__main__":
         type=int,
     )
 
+    parser.add_argument(
+        "--requests-per-minute",
+        default=None,
+        help="Pace the LLM and embedding calls to stay under this many requests per minute, e.g. with --sleep-time 0.",
+        type=float,
+    )
+
+    parser.add_argument(
+        "--tokens-per-minute",
+        default=None,
+        help="Pace the LLM and embedding calls to stay under this many tokens per minute.",
+        type=float,
+    )
+
+    parser.add_argument(
+        "--concurrent",
+        action="store_true",
+        help="Generate new tasks and summarize completed tasks concurrently, without sleeping between task loops.",
+    )
+
+    parser.add_argument(
+        "--completion-cache",
+        default=None,
+        help="Cache LLM completions in this SQLite database, so re-running an objective reuses them.",
+    )
+
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Print the output of each task as it is generated.",
+    )
+
+    parser.add_argument(
+        "--trace",
+        default=None,
+        help="Write the time and tokens of every stage to this JSONL file, and print a summary when the run ends.",
+    )
+
+    parser.add_argument(
+        "--checkpoint-dir",
+        default=None,
+        help="Save the state of the run to this directory after every task loop, so it can be resumed.",
+    )
+
+    parser.add_argument(
+        "--resume",
+        default=None,
+        help="Resume the run with this id from --checkpoint-dir, instead of starting a new one.",
+    )
+
     args = parser.parse_args()
 
+    if args.completion_cache:
+        enable_completion_cache(args.completion_cache)
+
     # LLM setup
-    llm = OpenAI(temperature=0, model_name="text-davinci-003")
+    scheduler = None
+    if args.requests_per_minute or args.tokens_per_minute:
+        scheduler = LLMScheduler(
+            requests_per_minute=args.requests_per_minute,
+            tokens_per_minute=args.tokens_per_minute,
+        )
+
+    # the scheduler retries failed calls, so the LLM doesn't retry them itself
+    llm = OpenAI(
+        temperature=0,
+        model_name="text-davinci-003",
+        streaming=args.stream,
+        max_retries=6 if scheduler is None else 1,
+    )
+    embed_model = OpenAIEmbedding()
+    if scheduler is not None:
+        llm = get_scheduled_llm(llm, scheduler)
+        embed_model = ScheduledEmbedding(embed_model, scheduler)
     service_context = ServiceContext.from_defaults(
-        llm_predictor=LLMPredictor(llm=llm), chunk_size_limit=512
+        llm_predictor=CachedLLMPredictor(llm=llm),
+        embed_model=embed_model,
+        chunk_size_limit=512,
     )
 
     # llama_agi setup
@@ -52,5 +129,36 @@ if __name__ == "__main__":
     execution_agent = ToolExecutionAgent(llm=llm, tools=tools)
 
     # launch the auto runner
-    runner = AutoAGIRunner(task_manager, execution_agent)
-    runner.run(args.objective, args.initial_task, args.sleep_time)
+    tracer = Tracer(args.trace) if args.trace else None
+    checkpoint_store = (
+        CheckpointStore(args.checkpoint_dir) if args.checkpoint_dir else None
+    )
+    runner = AutoAGIRunner(
+        task_manager,
+        execution_agent,
+        tracer=tracer,
+        checkpoint_store=checkpoint_store,
+    )
+    try:
+        if args.resume:
+            runner.resume(
+                args.resume,
+                args.sleep_time,
+                concurrent=args.concurrent,
+                stream=args.stream,
+            )
+        else:
+            runner.run(
+                args.objective,
+                args.initial_task,
+                args.sleep_time,
+                concurrent=args.concurrent,
+                stream=args.stream,
+            )
+    finally:
+        if runner.run_id is not None:
+            print(f"Run id: {runner.run_id} (resume it with --resume {runner.run_id})")
+        if tracer is not None:
+            print(tracer.format_summary())
+        if scheduler is not None:
+            print(scheduler.metrics())
@@ -0,0 +1,92 @@
+import argparse
+from langchain.agents import load_tools
+from langchain.llms import OpenAI
+
+from llama_agi.completion_cache import enable_completion_cache
+from llama_agi.execution_agent import ToolExecutionAgent
+from llama_agi.llm_pool import LLMPool
+from llama_agi.runners import BatchAGIRunner
+from llama_agi.runners.BatchAGIRunner import load_objectives
+from llama_agi.scheduler import LLMScheduler
+from llama_agi.tools import search_notes, record_note, search_webpage
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog="Llama AGI Batch",
+        description="Work on many objectives at once, sharing one LLM client.",
+    )
+    parser.add_argument(
+        "objectives",
+        help="A JSONL file with one objective per line, either as a string or as an object with an 'objective' key.",
+    )
+    parser.add_argument(
+        "--output",
+        default="results.jsonl",
+        help="The JSONL file the results and metrics of each objective are appended to. Default='results.jsonl'",
+    )
+    parser.add_argument(
+        "--max-concurrency",
+        default=8,
+        help="The maximum number of LLM calls made at once, across all objectives. Default=8",
+        type=int,
+    )
+    parser.add_argument(
+        "--requests-per-minute",
+        default=None,
+        help="Pace the LLM and embedding calls to stay under this many requests per minute.",
+        type=float,
+    )
+    parser.add_argument(
+        "--tokens-per-minute",
+        default=None,
+        help="Pace the LLM and embedding calls to stay under this many tokens per minute.",
+        type=float,
+    )
+    parser.add_argument(
+        "--max-iterations",
+        default=10,
+        help="The maximum number of tasks executed per objective. Default=10",
+        type=int,
+    )
+    parser.add_argument(
+        "--completion-cache",
+        default=None,
+        help="Cache LLM completions in this SQLite database, so re-running an objective reuses them.",
+    )
+
+    args = parser.parse_args()
+
+    if args.completion_cache:
+        enable_completion_cache(args.completion_cache)
+
+    # LLM setup, shared by every objective. The scheduler retries failed calls,
+    # so the LLM doesn't retry them itself.
+    llm = OpenAI(temperature=0, model_name="text-davinci-003", max_retries=1)
+    scheduler = LLMScheduler(
+        requests_per_minute=args.requests_per_minute,
+        tokens_per_minute=args.tokens_per_minute,
+        max_concurrency=args.max_concurrency,
+    )
+    pool = LLMPool(llm, chunk_size_limit=512, scheduler=scheduler)
+
+    tools = load_tools(["google-search-results-json"])
+    tools = tools + [search_notes, record_note, search_webpage]
+
+    # launch the batch runner
+    runner = BatchAGIRunner(
+        pool,
+        lambda: ToolExecutionAgent(llm=pool.llm, tools=tools),
+        max_iterations=args.max_iterations,
+        output_path=args.output,
+    )
+    records = runner.run(load_objectives(args.objectives))
+
+    for record in records:
+        metrics = record["metrics"]
+        print(
+            f"{record['id']}: {record['status']}, "
+            f"{metrics['num_completed_tasks']} tasks in {metrics['duration_s']:.1f}s, "
+            f"{metrics['llm_calls']} LLM calls"
+        )
+    print(pool.metrics())
@@ -0,0 +1,300 @@
+"""Append-only checkpoints of AGI runs, so a run can be resumed after a crash.
+
+The checkpoint of a run is a JSONL file with one record per line. The first
+record holds the objective and the execution agent prompts. Every following
+record holds the iteration counter, the completed tasks summary and what
+changed in the task manager state since the previous record: values that did
+not change are left out, lists only store the items after the prefix they
+share with their previous value (e.g. the new completed tasks, or the end of
+the task queue, which is popped from the end), and dicts only store the keys
+that were set or removed. So a record stays small however long the run gets.
+Replaying the records rebuilds the state of the last iteration, without any
+LLM calls.
+
+Every record is flushed as it is written, so it survives the process
+crashing. Syncing the file to disk, which makes records survive the machine
+crashing, is batched: it happens every fsync_every records, or on the first
+record after fsync_interval seconds. A record cut short by a crash is dropped
+when the checkpoint is loaded.
+"""
+import json
+import os
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import IO, Any, Dict, List, Optional, Tuple
+
+CHECKPOINT_EXTENSION = ".jsonl"
+
+
+@dataclass
+class RunState:
+    """The state of a run, as of its last checkpointed iteration.
+
+    completed_tasks_summary is None until the initial tasks were created.
+    """
+
+    run_id: str
+    objective: str
+    initial_task: str
+    initial_task_list: Optional[List[str]] = None
+    agent_prompts: Dict[str, str] = field(default_factory=dict)
+    iteration: int = 0
+    completed_tasks_summary: Optional[str] = None
+    task_manager_state: Dict[str, Any] = field(default_factory=dict)
+
+
+def new_run_id() -> str:
+    return uuid.uuid4().hex[:12]
+
+
+def _common_prefix_length(previous: List[Any], value: List[Any]) -> int:
+    if len(value) >= len(previous) and value[: len(previous)] == previous:
+        # the list only grew
+        return len(previous)
+    length = 0
+    for x, y in zip(previous, value):
+        if x != y:
+            break
+        length += 1
+    return length
+
+
+def _diff_state(previous: Dict[str, Any], state: Dict[str, Any]) -> Dict[str, Any]:
+    """Get the changes that turn the previous state into the new one.
+
+    Values are replaced, lists are cut to a prefix and extended, and dicts have
+    keys set and removed.
+    """
+    changed: Dict[str, Any] = {}
+    spliced: Dict[str, Tuple[int, List[Any]]] = {}
+    updated: Dict[str, Tuple[Dict[str, Any], List[str]]] = {}
+    for key, value in state.items():
+        if key not in previous:
+            changed[key] = value
+            continue
+        previous_value = previous[key]
+        if value == previous_value:
+            continue
+        if isinstance(value, list) and isinstance(previous_value, list):
+            prefix_length = _common_prefix_length(previous_value, value)
+            spliced[key] = (prefix_length, value[prefix_length:])
+        elif isinstance(value, dict) and isinstance(previous_value, dict):
+            updated[key] = (
+                {
+                    k: v
+                    for k, v in value.items()
+                    if k not in previous_value or previous_value[k] != v
+                },
+                [k for k in previous_value if k not in value],
+            )
+        else:
+            changed[key] = value
+    return {"changed": changed, "spliced": spliced, "updated": updated}
+
+
+def _apply_diff(state: Dict[str, Any], diff: Dict[str, Any]) -> None:
+    state.update(diff["changed"])
+    for key, (prefix_length, items) in diff["spliced"].items():
+        del state[key][prefix_length:]
+        state[key].extend(items)
+    for key, (items, removed_keys) in diff["updated"].items():
+        state[key].update(items)
+        for k in removed_keys:
+            del state[key][k]
+
+
+class CheckpointWriter:
+    """Checkpoint Writer
+
+    Appends the records of one run to its checkpoint file.
+
+    Args:
+        path (str): The checkpoint file.
+        state (Optional[RunState]): The loaded state of a run being resumed,
+        which the next record is diffed against. Must be given if the file
+        already exists.
+        fsync_every (int): The number of records written between syncs.
+        fsync_interval (float): The seconds after which the next record is
+        synced, however few records were written.
+
+    """
+
+    def __init__(
+        self,
+        path: str,
+        state: Optional[RunState] = None,
+        fsync_every: int = 10,
+        fsync_interval: float = 5.0,
+    ) -> None:
+        if state is None and os.path.exists(path):
+            raise ValueError(f"A checkpoint already exists at {path}")
+        self.path = path
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self._task_manager_state = state.task_manager_state if state else {}
+
+        if state is not None:
+            _truncate_partial_record(path)
+        self._file: IO[str] = open(path, "a")
+        self._num_unsynced = 0
+        self._last_sync_time = time.monotonic()
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
+        self._num_unsynced += 1
+        if (
+            self._num_unsynced >= self.fsync_every
+            or time.monotonic() - self._last_sync_time >= self.fsync_interval
+        ):
+            self.sync()
+
+    def write_start(
+        self,
+        objective: str,
+        initial_task: str,
+        initial_task_list: Optional[List[str]],
+        agent_prompts: Dict[str, str],
+    ) -> None:
+        """Record the start of a run."""
+        self._write(
+            {
+                "type": "start",
+                "objective": objective,
+                "initial_task": initial_task,
+                "initial_task_list": initial_task_list,
+                "agent_prompts": agent_prompts,
+            }
+        )
+
+    def write_iteration(
+        self,
+        iteration: int,
+        completed_tasks_summary: str,
+        task_manager_state: Dict[str, Any],
+    ) -> None:
+        """Record the state after an iteration.
+
+        task_manager_state must not be changed afterwards, since the next
+        record is diffed against it (BaseTaskManager.get_state returns a copy).
+        """
+        diff = _diff_state(self._task_manager_state, task_manager_state)
+        self._task_manager_state = task_manager_state
+        self._write(
+            {
+                "type": "iteration",
+                "iteration": iteration,
+                "completed_tasks_summary": completed_tasks_summary,
+                **diff,
+            }
+        )
+
+    def sync(self) -> None:
+        """Sync the records written so far to disk."""
+        if self._num_unsynced:
+            os.fsync(self._file.fileno())
+        self._num_unsynced = 0
+        self._last_sync_time = time.monotonic()
+
+    def close(self) -> None:
+        if self._file.closed:
+            return
+        self.sync()
+        self._file.close()
+
+
+def _truncate_partial_record(path: str) -> None:
+    """Drop a last record cut short by a crash, before appending new records."""
+    with open(path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+
+
+def load_checkpoint(path: str, run_id: str) -> RunState:
+    """Replay the records of a checkpoint file into the state of its run."""
+    with open(path, "r") as f:
+        lines = f.read().split("\n")
+
+    state: Optional[RunState] = None
+    for i, line in enumerate(lines):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            if i == len(lines) - 1:
+                # the last record was cut short by a crash
+                break
+            raise ValueError(f"Corrupt record on line {i + 1} of {path}")
+
+        if record["type"] == "start":
+            state = RunState(
+                run_id=run_id,
+                objective=record["objective"],
+                initial_task=record["initial_task"],
+                initial_task_list=record["initial_task_list"],
+                agent_prompts=record["agent_prompts"],
+            )
+        elif state is None:
+            raise ValueError(f"{path} does not start with a start record")
+        else:
+            state.iteration = record["iteration"]
+            state.completed_tasks_summary = record["completed_tasks_summary"]
+            _apply_diff(state.task_manager_state, record)
+
+    if state is None:
+        raise ValueError(f"{path} does not start with a start record")
+    return state
+
+
+class CheckpointStore:
+    """Checkpoint Store
+
+    Keeps the checkpoint of each run in a directory, as <run_id>.jsonl.
+
+    Args:
+        directory (str): The directory checkpoints are written to.
+        fsync_every (int): The number of records written between syncs.
+        fsync_interval (float): The seconds after which the next record is
+        synced, however few records were written.
+
+    """
+
+    def __init__(
+        self, directory: str, fsync_every: int = 10, fsync_interval: float = 5.0
+    ) -> None:
+        self.directory = directory
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        os.makedirs(directory, exist_ok=True)
+
+    def get_path(self, run_id: str) -> str:
+        return os.path.join(self.directory, run_id + CHECKPOINT_EXTENSION)
+
+    def exists(self, run_id: str) -> bool:
+        return os.path.exists(self.get_path(run_id))
+
+    def list_runs(self) -> List[str]:
+        """Get the ids of the checkpointed runs."""
+        return sorted(
+            x[: -len(CHECKPOINT_EXTENSION)]
+            for x in os.listdir(self.directory)
+            if x.endswith(CHECKPOINT_EXTENSION)
+        )
+
+    def open(self, run_id: str, state: Optional[RunState] = None) -> CheckpointWriter:
+        """Open the checkpoint of a new run, or of a run resumed from state."""
+        return CheckpointWriter(
+            self.get_path(run_id),
+            state=state,
+            fsync_every=self.fsync_every,
+            fsync_interval=self.fsync_interval,
+        )
+
+    def load(self, run_id: str) -> RunState:
+        """Load the state of a run, as of its last checkpointed iteration."""
+        if not self.exists(run_id):
+            raise ValueError(f"No checkpoint for run {run_id} in {self.directory}")
+        return load_checkpoint(self.get_path(run_id), run_id)
@@ -0,0 +1,287 @@
+"""An exact-match cache of LLM completions.
+
+CompletionCache implements langchain's BaseCache, so once it is enabled as
+langchain.llm_cache, every completion LLM (including the ones wrapped by a
+llama_index LLMPredictor) reuses the result of any prompt it has already
+completed with the same model and parameters. Chat models don't consult
+langchain.llm_cache themselves, so they are wrapped in a CachedChatModel
+(see get_cached_llm and CachedLLMPredictor).
+
+Caching is only safe for deterministic (temperature 0) calls, which is how
+the agents here and in auto_llama are set up by default.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, List, Mapping, Optional, Sequence, Union
+
+import langchain
+from langchain.cache import BaseCache
+from langchain.callbacks.manager import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain.chat_models.base import BaseChatModel
+from langchain.llms import BaseLLM
+from langchain.schema import (
+    AIMessage,
+    BaseMessage,
+    ChatGeneration,
+    ChatResult,
+    Generation,
+)
+from llama_index import LLMPredictor
+from llama_index.llm_predictor.base import LLMMetadata, _get_llm_metadata
+
+from llama_agi.tracing import record_cache_lookup
+
+DEFAULT_CACHE_PATH = os.path.join("~", ".cache", "llama_lab", "completions.db")
+
+
+def get_cache_key(prompt: str, llm_string: str) -> str:
+    return hashlib.sha256(f"{llm_string}\0{prompt}".encode()).hexdigest()
+
+
+def _dump_generations(generations: Sequence[Generation]) -> str:
+    return json.dumps(
+        [
+            {
+                "text": generation.text,
+                "generation_info": generation.generation_info,
+                "chat": isinstance(generation, ChatGeneration),
+            }
+            for generation in generations
+        ]
+    )
+
+
+def _load_generations(data: str) -> List[Generation]:
+    generations: List[Generation] = []
+    for generation in json.loads(data):
+        if generation["chat"]:
+            generations.append(
+                ChatGeneration(
+                    message=AIMessage(content=generation["text"]),
+                    generation_info=generation["generation_info"],
+                )
+            )
+        else:
+            generations.append(
+                Generation(
+                    text=generation["text"],
+                    generation_info=generation["generation_info"],
+                )
+            )
+    return generations
+
+
+class CompletionCache(BaseCache):
+    """Completion Cache
+
+    Completions are stored in SQLite, keyed by a hash of the model, its
+    parameters and the prompt, with an in-memory LRU of recent completions in
+    front. The database runs in WAL mode, so several processes can share it.
+
+    Args:
+        path (str): The path of the SQLite database.
+        max_entries (int): The number of completions kept in memory.
+
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_entries: int = 1024) -> None:
+        self.path = os.path.expanduser(path)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, List[Generation]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS completions ("
+                "key TEXT PRIMARY KEY, "
+                "generations TEXT NOT NULL, "
+                "created_at REAL NOT NULL)"
+            )
+
+    def _remember(self, key: str, generations: List[Generation]) -> None:
+        self._entries[key] = generations
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[List[Generation]]:
+        key = get_cache_key(prompt, llm_string)
+        with self._lock:
+            generations = self._entries.get(key)
+            if generations is None:
+                row = self._conn.execute(
+                    "SELECT generations FROM completions WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    generations = _load_generations(row[0])
+            if generations is None:
+                self.misses += 1
+            else:
+                self._remember(key, generations)
+                self.hits += 1
+        record_cache_lookup(generations is not None)
+        return generations
+
+    def update(
+        self, prompt: str, llm_string: str, return_val: List[Generation]
+    ) -> None:
+        key = get_cache_key(prompt, llm_string)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO completions (key, generations, created_at) "
+                "VALUES (?, ?, ?)",
+                (key, _dump_generations(return_val), time.time()),
+            )
+            self._remember(key, list(return_val))
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM completions")
+            self._entries.clear()
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def enable_completion_cache(path: str = DEFAULT_CACHE_PATH) -> CompletionCache:
+    """Cache the completions of all langchain LLMs in the database at path."""
+    cache = langchain.llm_cache
+    path = os.path.expanduser(path)
+    if not isinstance(cache, CompletionCache) or cache.path != path:
+        cache = CompletionCache(path)
+        langchain.llm_cache = cache
+    return cache
+
+
+def get_base_llm(llm: Union[BaseLLM, BaseChatModel]) -> Union[BaseLLM, BaseChatModel]:
+    """Get the model inside any wrappers with an llm field (like a CachedChatModel)."""
+    while isinstance(getattr(llm, "llm", None), (BaseLLM, BaseChatModel)):
+        llm = getattr(llm, "llm")
+    return llm
+
+
+class CachedChatModel(BaseChatModel):
+    """Cached Chat Model
+
+    Wraps a chat model so that its completions go through langchain.llm_cache,
+    like completion LLMs do. Without an enabled cache, calls pass straight
+    through to the wrapped model.
+
+    Args:
+        llm (BaseChatModel): The chat model to wrap.
+
+    """
+
+    llm: BaseChatModel
+
+    @property
+    def _identifying_params(self) -> Mapping[str, Any]:
+        params = dict(getattr(self.llm, "_identifying_params", {}))
+        params["class"] = type(get_base_llm(self.llm)).__name__
+        return params
+
+    def _get_llm_string(self, stop: Optional[List[str]]) -> str:
+        return str(sorted(self._identifying_params.items())) + str(stop)
+
+    def _combine_llm_outputs(self, llm_outputs: List[Optional[dict]]) -> dict:
+        # keep the token usage reported by the wrapped model, ignoring
+        # completions from the cache, which used no tokens
+        llm_outputs = [x for x in llm_outputs if not (x and x.get("cached"))]
+        if not llm_outputs:
+            return {"cached": True}
+        return self.llm._combine_llm_outputs(llm_outputs)
+
+    @staticmethod
+    def _get_prompt(messages: List[BaseMessage]) -> str:
+        return json.dumps(
+            [[type(message).__name__, message.content] for message in messages]
+        )
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+    ) -> ChatResult:
+        cache = langchain.llm_cache
+        if cache is None:
+            return self.llm._generate(messages, stop=stop, run_manager=run_manager)
+
+        prompt = self._get_prompt(messages)
+        llm_string = self._get_llm_string(stop)
+        generations = cache.lookup(prompt, llm_string)
+        if generations is not None:
+            return ChatResult(generations=generations, llm_output={"cached": True})
+        result = self.llm._generate(messages, stop=stop, run_manager=run_manager)
+        cache.update(prompt, llm_string, list(result.generations))
+        return result
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+    ) -> ChatResult:
+        cache = langchain.llm_cache
+        if cache is None:
+            return await self.llm._agenerate(
+                messages, stop=stop, run_manager=run_manager
+            )
+
+        prompt = self._get_prompt(messages)
+        llm_string = self._get_llm_string(stop)
+        generations = cache.lookup(prompt, llm_string)
+        if generations is not None:
+            return ChatResult(generations=generations, llm_output={"cached": True})
+        result = await self.llm._agenerate(messages, stop=stop, run_manager=run_manager)
+        cache.update(prompt, llm_string, list(result.generations))
+        return result
+
+
+def get_cached_llm(llm: Union[BaseLLM, BaseChatModel]) -> Union[BaseLLM, BaseChatModel]:
+    """Get an LLM whose completions go through langchain.llm_cache."""
+    if isinstance(llm, BaseChatModel) and not isinstance(llm, CachedChatModel):
+        return CachedChatModel(llm=llm)
+    return llm
+
+
+class CachedLLMPredictor(LLMPredictor):
+    """Cached LLM Predictor
+
+    An LLMPredictor whose chat models go through langchain.llm_cache too. The
+    LLM metadata (context size and number of outputs) is still read from the
+    wrapped model, and from the model inside any other wrapper with an llm
+    field (like a ScheduledLLM).
+
+    Args:
+        llm (Union[BaseLLM, BaseChatModel]): The langchain LLM class to use.
+
+    """
+
+    def __init__(self, llm: Union[BaseLLM, BaseChatModel], **kwargs: Any) -> None:
+        self._base_llm = get_base_llm(llm)
+        super().__init__(llm=get_cached_llm(llm), **kwargs)
+
+    def get_llm_metadata(self) -> LLMMetadata:
+        return _get_llm_metadata(self._base_llm)
@@ -73,6 +73,28 @@ DEFAULT_REFINE_TASK_CREATE_TMPL = (
 # REFINE_TASK_CREATE_PROMPT = RefinePrompt(DEFAULT_REFINE_TASK_CREATE_TMPL)
 
 
+#############################################
+##### LlamaIndex -- Task Creation with Dependencies #####
+#############################################
+TASK_DEPENDENCIES_FORMAT = (
+    "Return the tasks as a JSON array, where each element is an object with a "
+    '"task" string and a "dependencies" array containing the exact text of any '
+    "tasks that must be completed before it. Use an empty array for tasks that "
+    "can be started right away."
+)
+
+DEPENDENCY_TASK_CREATE_TMPL = (
+    DEFAULT_TASK_CREATE_TMPL.replace("Return the tasks as an array.", "")
+    + TASK_DEPENDENCIES_FORMAT
+)
+
+DEPENDENCY_REFINE_TASK_CREATE_TMPL = (
+    DEFAULT_REFINE_TASK_CREATE_TMPL.replace("Return the tasks as an array. ", "")
+    + " "
+    + TASK_DEPENDENCIES_FORMAT
+)
+
+
 #############################################
 ##### LlamaIndex -- Task Prioritization #####
 #############################################
@@ -2,12 +2,15 @@ from typing import Any, Dict, List, Optional, Union
 from string import Formatter
 
 from langchain.agents.tools import Tool
+from langchain.callbacks.manager import Callbacks
 from langchain.chains import LLMChain
 from langchain.llms import BaseLLM
 from langchain.chat_models.base import BaseChatModel
 from langchain.prompts import PromptTemplate
 
 from llama_agi.execution_agent.base import BaseExecutionAgent, LlamaAgentPrompts
+from llama_agi.scheduler import Priority, prioritized
+from llama_agi.tracing import traced
 
 
 class SimpleExecutionAgent(BaseExecutionAgent):
@@ -47,7 +50,11 @@ class SimpleExecutionAgent(BaseExecutionAgent):
             prompts=prompts,
             tools=tools,
         )
+        self.set_prompts(self.prompts)
 
+    def set_prompts(self, prompts: LlamaAgentPrompts) -> None:
+        """Replace the prompt templates, e.g. with those of a resumed run."""
+        super().set_prompts(prompts)
         self.execution_prompt = self.prompts.execution_prompt
         input_variables = [
             fn
@@ -60,7 +67,15 @@ class SimpleExecutionAgent(BaseExecutionAgent):
         )
         self._execution_chain = LLMChain(llm=self._llm, prompt=self._prompt_template)
 
-    def execute_task(self, **prompt_kwargs: Any) -> Dict[str, str]:
-        """Execute a task."""
-        result = self._execution_chain.predict(**prompt_kwargs)
+    def _execute_task(
+        self, callbacks: Callbacks, **prompt_kwargs: Any
+    ) -> Dict[str, str]:
+        result = self._execution_chain.predict(callbacks=callbacks, **prompt_kwargs)
+        return {"output": result}
+
+    @traced("execute_task")
+    @prioritized(Priority.EXECUTION)
+    async def aexecute_task(self, **prompt_kwargs: Any) -> Dict[str, str]:
+        """Execute a task, with async LLM calls."""
+        result = await self._execution_chain.apredict(**prompt_kwargs)
         return {"output": result}
@@ -1,13 +1,27 @@
-from typing import Any, Dict, List, Optional, Union
+import asyncio
+import functools
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
 from string import Formatter
 
 from langchain.agents import AgentExecutor, ZeroShotAgent
 from langchain.agents.tools import Tool
+from langchain.callbacks.manager import Callbacks
 from langchain.chains import LLMChain
 from langchain.llms import BaseLLM
 from langchain.chat_models.base import BaseChatModel
 
 from llama_agi.execution_agent.base import BaseExecutionAgent, LlamaAgentPrompts
+from llama_agi.scheduler import Priority, prioritized
+from llama_agi.tracing import traced
+
+
+def _run_in_executor(func: Callable[..., str]) -> Callable[..., Awaitable[str]]:
+    async def coroutine(*args: Any, **kwargs: Any) -> str:
+        return await asyncio.get_running_loop().run_in_executor(
+            None, functools.partial(func, *args, **kwargs)
+        )
+
+    return coroutine
 
 
 class ToolExecutionAgent(BaseExecutionAgent):
@@ -26,6 +40,10 @@ class ToolExecutionAgent(BaseExecutionAgent):
     execute_task() also returns the intermediate steps, for additional debugging and is
     used for the streamlit example.
 
+    aexecute_task() runs the agent with async LLM calls. Tools without a
+    coroutine are given one that calls the tool in the default executor, so
+    only the tool call itself takes a thread.
+
     Args:
         llm (Union[BaseLLM, BaseChatModel]): The langchain LLM class to use.
         model_name: (str): The name of the OpenAI model to use, if the LLM is
@@ -52,6 +70,14 @@ class ToolExecutionAgent(BaseExecutionAgent):
             prompts=prompts,
             tools=tools,
         )
+        for tool in self.tools:
+            if tool.coroutine is None:
+                tool.coroutine = _run_in_executor(tool.func)
+        self.set_prompts(self.prompts)
+
+    def set_prompts(self, prompts: LlamaAgentPrompts) -> None:
+        """Replace the prompt templates, e.g. with those of a resumed run."""
+        super().set_prompts(prompts)
         self.agent_prefix = self.prompts.agent_prefix
         self.agent_suffix = self.prompts.agent_suffix
 
@@ -78,7 +104,15 @@ class ToolExecutionAgent(BaseExecutionAgent):
             return_intermediate_steps=True,
         )
 
-    def execute_task(self, **prompt_kwargs: Any) -> Dict[str, str]:
-        """Execute a task, using tools."""
-        result = self._execution_chain(prompt_kwargs)
+    def _execute_task(
+        self, callbacks: Callbacks, **prompt_kwargs: Any
+    ) -> Dict[str, str]:
+        result = self._execution_chain(prompt_kwargs, callbacks=callbacks)
+        return result
+
+    @traced("execute_task")
+    @prioritized(Priority.EXECUTION)
+    async def aexecute_task(self, **prompt_kwargs: Any) -> Dict[str, str]:
+        """Execute a task, using tools, with async LLM calls."""
+        result = await self._execution_chain.acall(prompt_kwargs)
         return result
@@ -1,13 +1,22 @@
 from abc import abstractmethod
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Callable, Dict, Iterator, List, Optional, Union
 
 from langchain.agents.tools import Tool
+from langchain.callbacks.manager import Callbacks
 from langchain.llms import OpenAI, BaseLLM
 from langchain.chat_models.base import BaseChatModel
 from langchain.chat_models import ChatOpenAI
 
+from llama_agi.completion_cache import get_cached_llm
 from llama_agi.default_task_prompts import LC_PREFIX, LC_SUFFIX, LC_EXECUTION_PROMPT
+from llama_agi.execution_agent.streaming import (
+    ExecutionEvent,
+    StreamingCallbackHandler,
+    stream_events,
+)
+from llama_agi.scheduler import Priority, prioritized
+from llama_agi.tracing import Tracer, traced
 
 
 @dataclass
@@ -38,20 +47,68 @@ class BaseExecutionAgent:
         prompts: LlamaAgentPrompts = LlamaAgentPrompts(),
         tools: Optional[List[Tool]] = None,
     ) -> None:
-        if llm:
-            self._llm = llm
-        elif model_name == "text-davinci-003":
-            self._llm = OpenAI(
-                temperature=0, model_name=model_name, max_tokens=max_tokens
-            )
-        else:
-            self._llm = ChatOpenAI(
-                temperature=0, model_name=model_name, max_tokens=max_tokens
-            )
+        if not llm:
+            # streaming makes execute_task_streaming report each token
+            if model_name == "text-davinci-003":
+                llm = OpenAI(
+                    temperature=0,
+                    model_name=model_name,
+                    max_tokens=max_tokens,
+                    streaming=True,
+                )
+            else:
+                llm = ChatOpenAI(
+                    temperature=0,
+                    model_name=model_name,
+                    max_tokens=max_tokens,
+                    streaming=True,
+                )
+        # chat models only use an enabled completion cache when wrapped
+        self._llm = get_cached_llm(llm)
         self.max_tokens = max_tokens
         self.prompts = prompts
         self.tools = tools if tools else []
+        # set by the runner, to trace task execution
+        self.tracer: Optional[Tracer] = None
 
-    @abstractmethod
+    def set_prompts(self, prompts: LlamaAgentPrompts) -> None:
+        """Replace the prompt templates, e.g. with those of a resumed run."""
+        self.prompts = prompts
+
+    @traced("execute_task")
+    @prioritized(Priority.EXECUTION)
     def execute_task(self, **prompt_kwargs: Any) -> Dict[str, str]:
         """Execute a task."""
+        return self._execute_task(None, **prompt_kwargs)
+
+    @abstractmethod
+    async def aexecute_task(self, **prompt_kwargs: Any) -> Dict[str, str]:
+        """Execute a task, with async LLM calls."""
+
+    @abstractmethod
+    def _execute_task(
+        self, callbacks: Callbacks, **prompt_kwargs: Any
+    ) -> Dict[str, str]:
+        """Execute a task, passing the callbacks to the langchain chain."""
+
+    @traced("execute_task")
+    @prioritized(Priority.EXECUTION)
+    def execute_task_streaming(
+        self, on_event: Callable[[ExecutionEvent], None], **prompt_kwargs: Any
+    ) -> Dict[str, Any]:
+        """Execute a task, calling on_event with each event as it happens.
+
+        Tokens and tool calls are reported as they happen, and the last event is
+        the "result" event.
+        """
+        handler = StreamingCallbackHandler(on_event)
+        result = self._execute_task([handler], **prompt_kwargs)
+        if handler.num_tokens == 0 and "output" in result:
+            # completions from langchain.llm_cache don't call any callbacks
+            on_event(ExecutionEvent("token", text=result["output"]))
+        on_event(ExecutionEvent("result", result=result))
+        return result
+
+    def stream_task(self, **prompt_kwargs: Any) -> Iterator[ExecutionEvent]:
+        """Execute a task in a thread, yielding the events of execute_task_streaming."""
+        return stream_events(self.execute_task_streaming, **prompt_kwargs)
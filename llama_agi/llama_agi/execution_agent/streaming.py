@@ -0,0 +1,128 @@
+import queue
+import sys
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set
+from uuid import UUID
+
+from langchain.callbacks.base import BaseCallbackHandler
+from langchain.schema import LLMResult
+
+
+@dataclass
+class ExecutionEvent:
+    """An event of a streamed task execution.
+
+    type is "token" for a chunk of LLM output, "tool_start" (with the tool
+    input as text) and "tool_end" (with the tool output as text) around each
+    tool call, and "result" for the result of the execution, which is always
+    the last event.
+    """
+
+    type: str
+    text: str = ""
+    tool: Optional[str] = None
+    result: Optional[Dict[str, Any]] = None
+
+
+class StreamingCallbackHandler(BaseCallbackHandler):
+    """Turns langchain callbacks into ExecutionEvents.
+
+    LLMs created with streaming=True report each token as it is generated.
+    For other LLMs, the whole completion is reported as one token event once
+    it is done.
+    """
+
+    def __init__(self, on_event: Callable[[ExecutionEvent], None]) -> None:
+        self.on_event = on_event
+        self.num_tokens = 0
+        self._streamed_runs: Set[UUID] = set()
+        self._tool_names: Dict[UUID, str] = {}
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "StreamingCallbackHandler":
+        # langchain copies handlers for every call, but events must reach on_event
+        return self
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any) -> None:
+        self._streamed_runs.add(run_id)
+        self.num_tokens += 1
+        self.on_event(ExecutionEvent("token", text=token))
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        if run_id in self._streamed_runs:
+            self._streamed_runs.discard(run_id)
+            return
+        for generations in response.generations:
+            for generation in generations:
+                self.num_tokens += 1
+                self.on_event(ExecutionEvent("token", text=generation.text))
+
+    def on_llm_error(
+        self, error: BaseException, *, run_id: UUID, **kwargs: Any
+    ) -> None:
+        self._streamed_runs.discard(run_id)
+
+    def on_tool_start(
+        self,
+        serialized: Dict[str, Any],
+        input_str: str,
+        *,
+        run_id: UUID,
+        **kwargs: Any,
+    ) -> None:
+        name = serialized.get("name", "unknown")
+        self._tool_names[run_id] = name
+        self.on_event(ExecutionEvent("tool_start", text=input_str, tool=name))
+
+    def on_tool_end(self, output: str, *, run_id: UUID, **kwargs: Any) -> None:
+        name = self._tool_names.pop(run_id, None)
+        self.on_event(ExecutionEvent("tool_end", text=str(output), tool=name))
+
+    def on_tool_error(
+        self, error: BaseException, *, run_id: UUID, **kwargs: Any
+    ) -> None:
+        name = self._tool_names.pop(run_id, None)
+        self.on_event(ExecutionEvent("tool_end", text=str(error), tool=name))
+
+
+def stream_events(
+    execute: Callable[..., Dict[str, Any]], **prompt_kwargs: Any
+) -> Iterator[ExecutionEvent]:
+    """Run execute(on_event, **prompt_kwargs) in a thread, yielding its events.
+
+    Errors raised by execute are raised again by the generator.
+    """
+    events: "queue.Queue[Optional[ExecutionEvent]]" = queue.Queue()
+    errors: List[BaseException] = []
+
+    def run() -> None:
+        try:
+            execute(events.put, **prompt_kwargs)
+        except BaseException as e:
+            errors.append(e)
+        finally:
+            events.put(None)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    while True:
+        event = events.get()
+        if event is None:
+            break
+        yield event
+    thread.join()
+    if errors:
+        raise errors[0]
+
+
+def print_event(event: ExecutionEvent) -> None:
+    """Print tokens as they arrive, and a line for each tool call."""
+    if event.type == "token":
+        sys.stdout.write(event.text)
+    elif event.type == "tool_start":
+        sys.stdout.write(f"\n> {event.tool}: {event.text}\n")
+    elif event.type == "tool_end":
+        sys.stdout.write(f"\n< {event.tool}: {event.text}\n")
+    elif event.type == "result":
+        sys.stdout.write("\n")
+    sys.stdout.flush()
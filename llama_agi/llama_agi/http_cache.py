@@ -0,0 +1,247 @@
+"""A content-addressed, on-disk cache of HTTP responses.
+
+auto_llama fetches its web pages through this module too, so both share one
+cache directory (LLAMA_LAB_HTTP_CACHE_DIR, by default ~/.cache/llama_lab/http):
+
+    index.db          SQLite table mapping each URL to its latest response
+    bodies/ab/abcd..  response bodies, named by the SHA-256 of their content
+
+Set LLAMA_LAB_HTTP_OFFLINE=1 to replay cached responses without touching the
+network.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+import requests
+
+DEFAULT_CACHE_DIR = os.path.join("~", ".cache", "llama_lab", "http")
+DEFAULT_TTL = 24 * 60 * 60
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+class HTTPCacheMissError(Exception):
+    """Raised in offline mode when a URL is not in the cache."""
+
+
+@dataclass
+class CachedResponse:
+    url: str
+    content: bytes
+    content_type: str
+    content_hash: str
+    from_cache: bool
+
+
+class HTTPCache:
+    """HTTP Cache
+
+    Responses are fresh for ttl seconds. After that, the cache revalidates
+    them with If-None-Match / If-Modified-Since, so an unchanged page costs
+    a 304 instead of a full download. Once the bodies take up more than
+    max_bytes, the least recently used responses are evicted.
+
+    Args:
+        cache_dir (str): The directory holding the cache.
+        ttl (float): How long (in seconds) a response is used without
+        revalidation.
+        max_bytes (int): The size budget for cached bodies.
+        offline (bool): Only serve cached responses, and raise
+        HTTPCacheMissError for anything else.
+
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        ttl: float = DEFAULT_TTL,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        offline: Optional[bool] = None,
+    ) -> None:
+        default_cache_dir = os.environ.get(
+            "LLAMA_LAB_HTTP_CACHE_DIR", DEFAULT_CACHE_DIR
+        )
+        self.cache_dir = os.path.expanduser(cache_dir or default_cache_dir)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        if offline is None:
+            offline = os.environ.get("LLAMA_LAB_HTTP_OFFLINE", "") not in ("", "0")
+        self.offline = offline
+
+        os.makedirs(os.path.join(self.cache_dir, "bodies"), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            os.path.join(self.cache_dir, "index.db"),
+            timeout=30,
+            check_same_thread=False,
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "url TEXT PRIMARY KEY, "
+                "content_hash TEXT NOT NULL, "
+                "content_type TEXT, "
+                "etag TEXT, "
+                "last_modified TEXT, "
+                "size INTEGER NOT NULL, "
+                "fetched_at REAL NOT NULL, "
+                "last_used REAL NOT NULL)"
+            )
+
+    def _body_path(self, content_hash: str) -> str:
+        return os.path.join(self.cache_dir, "bodies", content_hash[:2], content_hash)
+
+    def _read_body(self, content_hash: str) -> Optional[bytes]:
+        try:
+            with open(self._body_path(content_hash), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _write_body(self, content: bytes) -> str:
+        content_hash = hashlib.sha256(content).hexdigest()
+        path = self._body_path(content_hash)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        return content_hash
+
+    def _get_entry(self, url: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content_hash, content_type, etag, last_modified, fetched_at "
+                "FROM responses WHERE url = ?",
+                (url,),
+            ).fetchone()
+        if row is None:
+            return None
+        keys = ("content_hash", "content_type", "etag", "last_modified", "fetched_at")
+        return dict(zip(keys, row))
+
+    def _touch(self, url: str, revalidated: bool) -> None:
+        now = time.time()
+        with self._lock, self._conn:
+            if revalidated:
+                self._conn.execute(
+                    "UPDATE responses SET fetched_at = ?, last_used = ? WHERE url = ?",
+                    (now, now, url),
+                )
+            else:
+                self._conn.execute(
+                    "UPDATE responses SET last_used = ? WHERE url = ?", (now, url)
+                )
+
+    def _store(self, url: str, response: requests.Response) -> Tuple[str, str]:
+        content_hash = self._write_body(response.content)
+        content_type = response.headers.get("Content-Type", "")
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(url, content_hash, content_type, etag, last_modified, size, "
+                "fetched_at, last_used) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    url,
+                    content_hash,
+                    content_type,
+                    response.headers.get("ETag"),
+                    response.headers.get("Last-Modified"),
+                    len(response.content),
+                    now,
+                    now,
+                ),
+            )
+        self._evict()
+        return content_hash, content_type
+
+    def _evict(self) -> None:
+        """Evict least recently used responses until the bodies fit max_bytes."""
+        with self._lock, self._conn:
+            (total,) = self._conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+            if total <= self.max_bytes:
+                return
+            rows = self._conn.execute(
+                "SELECT url, content_hash, size FROM responses ORDER BY last_used"
+            ).fetchall()
+            evicted_hashes = set()
+            for url, content_hash, size in rows[:-1]:
+                if total <= self.max_bytes:
+                    break
+                self._conn.execute("DELETE FROM responses WHERE url = ?", (url,))
+                evicted_hashes.add(content_hash)
+                total -= size
+            for content_hash in evicted_hashes:
+                (num_refs,) = self._conn.execute(
+                    "SELECT COUNT(*) FROM responses WHERE content_hash = ?",
+                    (content_hash,),
+                ).fetchone()
+                if num_refs == 0:
+                    try:
+                        os.remove(self._body_path(content_hash))
+                    except FileNotFoundError:
+                        pass
+
+    def fetch(
+        self,
+        url: str,
+        session: Optional[requests.Session] = None,
+        timeout: float = 20,
+    ) -> CachedResponse:
+        """Get a URL, from the cache when possible."""
+        entry = self._get_entry(url)
+        content = self._read_body(entry["content_hash"]) if entry else None
+
+        if entry is not None and content is not None:
+            is_fresh = time.time() - entry["fetched_at"] < self.ttl
+            if is_fresh or self.offline:
+                self._touch(url, revalidated=False)
+                return CachedResponse(
+                    url, content, entry["content_type"], entry["content_hash"], True
+                )
+        elif self.offline:
+            raise HTTPCacheMissError(f"{url} is not in the HTTP cache")
+
+        headers = {}
+        if entry is not None and content is not None:
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        response = (session or requests).get(url, headers=headers, timeout=timeout)
+        if response.status_code == 304 and entry is not None and content is not None:
+            self._touch(url, revalidated=True)
+            return CachedResponse(
+                url, content, entry["content_type"], entry["content_hash"], True
+            )
+
+        response.raise_for_status()
+        content_hash, content_type = self._store(url, response)
+        return CachedResponse(url, response.content, content_type, content_hash, False)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_http_cache: Optional[HTTPCache] = None
+_http_cache_lock = threading.Lock()
+
+
+def get_http_cache() -> HTTPCache:
+    """Get the process-wide HTTP cache, creating it on first use."""
+    global _http_cache
+    with _http_cache_lock:
+        if _http_cache is None:
+            _http_cache = HTTPCache()
+        return _http_cache
@@ -0,0 +1,82 @@
+"""One LLM and embedding model shared by many concurrent runs.
+
+An LLMPool wraps a langchain LLM and a LlamaIndex embedding model so every
+run using them goes through one LLMScheduler, which caps the number of calls
+in flight at once (and optionally the requests and tokens per minute). Async
+calls wait for their turn on the event loop, so many objectives can share the
+pool without a thread each, and the pool's HTTP session lets async OpenAI
+requests reuse connections instead of opening new ones.
+"""
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional, Union
+
+import aiohttp
+import openai
+from langchain.chat_models.base import BaseChatModel
+from langchain.llms import BaseLLM
+from llama_index import ServiceContext
+from llama_index.embeddings.base import BaseEmbedding
+from llama_index.embeddings.openai import OpenAIEmbedding
+
+from llama_agi.completion_cache import CachedLLMPredictor
+from llama_agi.scheduler import LLMScheduler, ScheduledEmbedding, get_scheduled_llm
+
+
+class LLMPool:
+    """LLM Pool
+
+    Shares one LLM and embedding model between runs, making all of their
+    calls (sync and async) through one LLMScheduler. Completions served by the
+    completion cache never go through the scheduler.
+
+    Args:
+        llm (Union[BaseLLM, BaseChatModel]): The langchain LLM class to share.
+        embed_model (Optional[BaseEmbedding]): The embedding model to share.
+        Defaults to the LlamaIndex default (OpenAI) embeddings.
+        max_concurrency (int): The maximum number of calls made at once,
+        across every run using the pool. Ignored if a scheduler is given.
+        chunk_size_limit (Optional[int]): The chunk size of the shared
+        service context.
+        scheduler (Optional[LLMScheduler]): The scheduler the calls go through,
+        e.g. to also limit the requests and tokens per minute.
+
+    """
+
+    def __init__(
+        self,
+        llm: Union[BaseLLM, BaseChatModel],
+        embed_model: Optional[BaseEmbedding] = None,
+        max_concurrency: int = 8,
+        chunk_size_limit: Optional[int] = None,
+        scheduler: Optional[LLMScheduler] = None,
+    ) -> None:
+        self.scheduler = scheduler or LLMScheduler(max_concurrency=max_concurrency)
+        self.llm = get_scheduled_llm(llm, self.scheduler)
+        self.embed_model = ScheduledEmbedding(
+            embed_model or OpenAIEmbedding(), self.scheduler
+        )
+        self.service_context = ServiceContext.from_defaults(
+            llm_predictor=CachedLLMPredictor(llm=self.llm),
+            embed_model=self.embed_model,
+            chunk_size_limit=chunk_size_limit,
+        )
+
+    @asynccontextmanager
+    async def client_session(self) -> AsyncIterator[None]:
+        """Send the async OpenAI requests made in the body through one session.
+
+        The session keeps at most as many connections open as the scheduler
+        allows calls in flight, which are reused between requests.
+        """
+        # a limit of 0 means no limit
+        connector = aiohttp.TCPConnector(limit=self.scheduler.max_concurrency or 0)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            token = openai.aiosession.set(session)
+            try:
+                yield
+            finally:
+                openai.aiosession.reset(token)
+
+    def metrics(self) -> Dict[str, float]:
+        """Get the number of calls made, how long they waited and the queue depth."""
+        return self.scheduler.metrics()
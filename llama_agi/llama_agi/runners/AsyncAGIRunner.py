@@ -0,0 +1,213 @@
+import asyncio
+from typing import Any, Dict, List, Optional
+
+from llama_agi.checkpoint import CheckpointStore
+from llama_agi.execution_agent.base import BaseExecutionAgent
+from llama_agi.runners.base import BaseAGIRunner
+from llama_agi.task_manager.base import BaseTaskManager
+from llama_agi.tracing import Tracer
+from llama_agi.utils import log_current_status
+
+
+class AsyncAGIRunner(BaseAGIRunner):
+    """Async AGI Runner
+
+    This runner drives the loop with the async methods of the task manager and
+    execution agent, so every LLM call is awaited instead of blocking a thread.
+    Many runners (e.g. one per objective) can run on one event loop, by
+    gathering their arun() coroutines.
+
+    Like the ParallelAGIRunner, up to max_concurrent_tasks tasks whose
+    dependencies have been completed are executed at once, and results are
+    merged back into the task manager one at a time, as each task finishes.
+    Generating new tasks and summarizing completed tasks are awaited together.
+
+    With a checkpoint_store, the state of the run is saved each time a task
+    is merged back, and aresume() continues a run from its last checkpoint.
+    Tasks that were still running when the run stopped are executed again.
+
+    Args:
+        task_manager (BaseTaskManager): The task manager to create, prioritize
+        and track tasks with.
+        execution_agent (BaseExecutionAgent): The agent used to execute tasks.
+        max_concurrent_tasks (int): The maximum number of tasks executed at once.
+        tracer (Optional[Tracer]): Records the time and tokens of each stage.
+        verbose (bool): Whether to log the state of the loop after each task.
+        checkpoint_store (Optional[CheckpointStore]): Where the state of each
+        run is saved.
+    """
+
+    def __init__(
+        self,
+        task_manager: BaseTaskManager,
+        execution_agent: BaseExecutionAgent,
+        max_concurrent_tasks: int = 1,
+        tracer: Optional[Tracer] = None,
+        verbose: bool = True,
+        checkpoint_store: Optional[CheckpointStore] = None,
+    ) -> None:
+        super().__init__(
+            task_manager,
+            execution_agent,
+            tracer=tracer,
+            checkpoint_store=checkpoint_store,
+        )
+        self.max_concurrent_tasks = max_concurrent_tasks
+        self.verbose = verbose
+
+    def _get_next_task(self, num_running: int) -> Optional[str]:
+        """Get the next task to dispatch, or None if nothing can be dispatched."""
+        next_task = self.task_manager.get_next_ready_task()
+        if next_task is None and num_running == 0 and self.task_manager.current_tasks:
+            # nothing is running that could unblock the remaining tasks (e.g.
+            # circular dependencies), so fall back to the next task in order
+            next_task = self.task_manager.get_next_task()
+        return next_task
+
+    def run(
+        self,
+        objective: str,
+        initial_task: str,
+        sleep_time: int,
+        initial_task_list: Optional[List[str]] = None,
+        max_iterations: Optional[int] = None,
+        run_id: Optional[str] = None,
+    ) -> None:
+        asyncio.run(
+            self.arun(
+                objective,
+                initial_task,
+                sleep_time,
+                initial_task_list=initial_task_list,
+                max_iterations=max_iterations,
+                run_id=run_id,
+            )
+        )
+
+    def resume(
+        self, run_id: str, sleep_time: int, max_iterations: Optional[int] = None
+    ) -> None:
+        asyncio.run(self.aresume(run_id, sleep_time, max_iterations=max_iterations))
+
+    async def arun(
+        self,
+        objective: str,
+        initial_task: str,
+        sleep_time: int,
+        initial_task_list: Optional[List[str]] = None,
+        max_iterations: Optional[int] = None,
+        run_id: Optional[str] = None,
+    ) -> str:
+        """Run the task manager and execution agent in a loop, asynchronously.
+
+        Returns the final completed tasks summary.
+        """
+        try:
+            self.start_checkpoint(
+                objective, initial_task, initial_task_list, run_id=run_id
+            )
+            completed_tasks_summary = await self.acreate_initial_tasks(
+                objective, initial_task, initial_task_list=initial_task_list
+            )
+            self.save_checkpoint(0, completed_tasks_summary)
+
+            return await self._arun_loop(
+                objective, completed_tasks_summary, 0, sleep_time, max_iterations
+            )
+        finally:
+            self.close_checkpoint()
+
+    async def aresume(
+        self, run_id: str, sleep_time: int, max_iterations: Optional[int] = None
+    ) -> str:
+        """Resume a checkpointed run after its last saved task, asynchronously.
+
+        The run is restored without any LLM calls (see restore()).
+        max_iterations counts the tasks of the whole run, including those
+        completed before it was resumed. Returns the final completed tasks
+        summary.
+        """
+        try:
+            state = self.restore(run_id)
+            completed_tasks_summary = state.completed_tasks_summary
+            if completed_tasks_summary is None:
+                # the run stopped before its initial tasks were saved
+                completed_tasks_summary = await self.acreate_initial_tasks(
+                    state.objective,
+                    state.initial_task,
+                    initial_task_list=state.initial_task_list,
+                )
+                self.save_checkpoint(0, completed_tasks_summary)
+
+            return await self._arun_loop(
+                state.objective,
+                completed_tasks_summary,
+                state.iteration,
+                sleep_time,
+                max_iterations,
+            )
+        finally:
+            self.close_checkpoint()
+
+    async def _arun_loop(
+        self,
+        objective: str,
+        completed_tasks_summary: str,
+        num_completed: int,
+        sleep_time: int,
+        max_iterations: Optional[int],
+    ) -> str:
+        running: Dict["asyncio.Task[Dict[str, Any]]", str] = {}
+        try:
+            while True:
+                # dispatch ready tasks until the limit is reached
+                while len(running) < self.max_concurrent_tasks and (
+                    max_iterations is None
+                    or num_completed + len(running) < max_iterations
+                ):
+                    next_task = self._get_next_task(len(running))
+                    if next_task is None:
+                        break
+                    execution = asyncio.ensure_future(
+                        self.execution_agent.aexecute_task(
+                            objective=objective,
+                            cur_task=next_task,
+                            completed_tasks_summary=completed_tasks_summary,
+                        )
+                    )
+                    running[execution] = next_task
+
+                if len(running) == 0:
+                    if len(self.task_manager.current_tasks) == 0:
+                        print("Out of tasks! Objective Accomplished?")
+                    break
+
+                # merge finished tasks back into the task manager
+                done, _ = await asyncio.wait(
+                    running, return_when=asyncio.FIRST_COMPLETED
+                )
+                for execution in done:
+                    cur_task = running.pop(execution)
+                    result = execution.result()["output"]
+
+                    completed_tasks_summary = await self.aprocess_completed_task(
+                        objective, cur_task, result
+                    )
+                    num_completed += 1
+                    self.save_checkpoint(num_completed, completed_tasks_summary)
+
+                    if self.verbose:
+                        log_current_status(
+                            cur_task,
+                            result,
+                            completed_tasks_summary,
+                            self.task_manager.current_tasks,
+                        )
+
+                # wait a bit between iterations, without blocking the event loop
+                await asyncio.sleep(sleep_time)
+        finally:
+            for execution in running:
+                execution.cancel()
+
+        return completed_tasks_summary
@@ -1,8 +1,8 @@
 import time
 from typing import List, Optional
 
+from llama_agi.execution_agent.streaming import print_event
 from llama_agi.runners.base import BaseAGIRunner
-from llama_agi.execution_agent.SimpleExecutionAgent import SimpleExecutionAgent
 from llama_agi.utils import log_current_status
 
 
@@ -13,58 +13,113 @@ class AutoAGIRunner(BaseAGIRunner):
         initial_task: str,
         sleep_time: int,
         initial_task_list: Optional[List[str]] = None,
+        concurrent: bool = False,
+        max_iterations: Optional[int] = None,
+        stream: bool = False,
+        run_id: Optional[str] = None,
     ) -> None:
-        # get initial list of tasks
-        if initial_task_list:
-            self.task_manager.add_new_tasks(initial_task_list)
-        else:
-            initial_completed_tasks_summary = (
-                self.task_manager.get_completed_tasks_summary()
+        try:
+            self.start_checkpoint(
+                objective, initial_task, initial_task_list, run_id=run_id
             )
-            initial_task_prompt = initial_task + "\nReturn the list as an array."
 
-            # create simple execution agent using current agent
-            simple_execution_agent = SimpleExecutionAgent(
-                llm=self.execution_agent._llm,
-                max_tokens=self.execution_agent.max_tokens,
-                prompts=self.execution_agent.prompts,
-            )
-            initial_task_list_result = simple_execution_agent.execute_task(
-                objective=objective,
-                task=initial_task_prompt,
-                completed_tasks_summary=initial_completed_tasks_summary,
+            # get and prioritize the initial list of tasks
+            initial_completed_tasks_summary = self.create_initial_tasks(
+                objective, initial_task, initial_task_list=initial_task_list
             )
+            self.save_checkpoint(0, initial_completed_tasks_summary)
 
-            initial_task_list = self.task_manager.parse_task_list(
-                initial_task_list_result["output"]
+            self._run_loop(
+                objective,
+                initial_completed_tasks_summary,
+                0,
+                sleep_time,
+                concurrent=concurrent,
+                max_iterations=max_iterations,
+                stream=stream,
             )
+        finally:
+            self.close_checkpoint()
 
-            # add tasks to the task manager
-            self.task_manager.add_new_tasks(initial_task_list)
+    def resume(
+        self,
+        run_id: str,
+        sleep_time: int,
+        concurrent: bool = False,
+        max_iterations: Optional[int] = None,
+        stream: bool = False,
+    ) -> None:
+        """Resume a checkpointed run after its last saved iteration.
 
-        # prioritize initial tasks
-        self.task_manager.prioritize_tasks(objective)
+        The run is restored without any LLM calls (see restore()), so no work
+        saved before the run stopped is done again. max_iterations counts the
+        iterations of the whole run, including those before it was resumed.
+        """
+        try:
+            state = self.restore(run_id)
+            completed_tasks_summary = state.completed_tasks_summary
+            if completed_tasks_summary is None:
+                # the run stopped before its initial tasks were saved
+                completed_tasks_summary = self.create_initial_tasks(
+                    state.objective,
+                    state.initial_task,
+                    initial_task_list=state.initial_task_list,
+                )
+                self.save_checkpoint(0, completed_tasks_summary)
+            elif len(self.task_manager.current_tasks) == 0:
+                print("Out of tasks! Objective Accomplished?")
+                return
 
-        completed_tasks_summary = initial_completed_tasks_summary
-        while True:
-            # Get the next task
-            cur_task = self.task_manager.get_next_task()
+            self._run_loop(
+                state.objective,
+                completed_tasks_summary,
+                state.iteration,
+                sleep_time,
+                concurrent=concurrent,
+                max_iterations=max_iterations,
+                stream=stream,
+            )
+        finally:
+            self.close_checkpoint()
 
-            # Execute current task
-            result = self.execution_agent.execute_task(
-                objective=objective,
-                cur_task=cur_task,
-                completed_tasks_summary=completed_tasks_summary,
-            )["output"]
+    def _run_loop(
+        self,
+        objective: str,
+        completed_tasks_summary: str,
+        num_iterations: int,
+        sleep_time: int,
+        concurrent: bool = False,
+        max_iterations: Optional[int] = None,
+        stream: bool = False,
+    ) -> None:
+        while max_iterations is None or num_iterations < max_iterations:
+            num_iterations += 1
 
-            # store the task and result as completed
-            self.task_manager.add_completed_task(cur_task, result)
+            # Get the next task
+            cur_task = self.task_manager.get_next_task()
 
-            # generate new task(s), if needed
-            self.task_manager.generate_new_tasks(objective, cur_task, result)
+            # Execute current task, printing the output as it arrives
+            if stream:
+                print(f"Executing: {cur_task}")
+                result = self.execution_agent.execute_task_streaming(
+                    print_event,
+                    objective=objective,
+                    cur_task=cur_task,
+                    completed_tasks_summary=completed_tasks_summary,
+                )["output"]
+            else:
+                result = self.execution_agent.execute_task(
+                    objective=objective,
+                    cur_task=cur_task,
+                    completed_tasks_summary=completed_tasks_summary,
+                )["output"]
 
-            # Summarize completed tasks
-            completed_tasks_summary = self.task_manager.get_completed_tasks_summary()
+            # store the task and result as completed, generate new task(s)
+            # and summarize completed tasks
+            completed_tasks_summary = self.process_completed_task(
+                objective, cur_task, result, concurrent=concurrent
+            )
+            self.save_checkpoint(num_iterations, completed_tasks_summary)
 
             # log state of AGI to terminal
             log_current_status(
@@ -80,4 +135,5 @@ class AutoAGIRunner(BaseAGIRunner):
                 break
 
             # wait a bit to let you read what's happening
-            time.sleep(sleep_time)
+            if not concurrent:
+                time.sleep(sleep_time)
@@ -1,8 +1,9 @@
 import json
 import streamlit as st
 import time
-from typing import List, Optional
+from typing import Any, List, Optional
 
+from llama_agi.execution_agent.streaming import ExecutionEvent
 from llama_agi.runners.base import BaseAGIRunner
 from llama_agi.execution_agent.SimpleExecutionAgent import SimpleExecutionAgent
 from llama_agi.utils import log_current_status
@@ -20,6 +21,38 @@ def make_intermediate_steps_pretty(json_str: str) -> List[str]:
     return output
 
 
+class _StreamRenderer:
+    """Renders the events of a streamed execution into a streamlit element.
+
+    Tokens are rendered at most every min_interval seconds, since streamlit
+    re-sends the whole text on every update.
+    """
+
+    def __init__(
+        self, element: Any, text: str = "", min_interval: float = 0.05
+    ) -> None:
+        self.element = element
+        self.min_interval = min_interval
+        self.text = text
+        self._last_render = 0.0
+
+    def render(self) -> None:
+        self.element.markdown(self.text)
+        self._last_render = time.time()
+
+    def __call__(self, event: ExecutionEvent) -> None:
+        if event.type == "token":
+            self.text += event.text
+        elif event.type == "tool_start":
+            self.text += f"\n\n*Using {event.tool}: {event.text}*\n\n"
+        elif event.type == "tool_end":
+            self.text += f"\n\n*{event.tool} returned: {event.text}*\n\n"
+
+        now = time.time()
+        if event.type != "token" or now - self._last_render >= self.min_interval:
+            self.render()
+
+
 class AutoStreamlitAGIRunner(BaseAGIRunner):
     def run(
         self,
@@ -28,8 +61,8 @@ class AutoStreamlitAGIRunner(BaseAGIRunner):
         sleep_time: int,
         initial_task_list: Optional[List[str]] = None,
         max_iterations: Optional[int] = None,
+        concurrent: bool = False,
     ) -> None:
-
         run_initial_task = False
         if "logs" not in st.session_state:
             st.session_state["logs"] = []
@@ -41,6 +74,7 @@ class AutoStreamlitAGIRunner(BaseAGIRunner):
 
         with logs_col:
             st.subheader("Execution Log")
+            st_output = st.empty()
             st_logs = st.empty()
         st_logs.write(st.session_state["logs"])
 
@@ -49,6 +83,11 @@ class AutoStreamlitAGIRunner(BaseAGIRunner):
             st_state = st.empty()
         st_state.write(st.session_state["state_str"])
 
+        if self.tracer is not None:
+            st.subheader("Stage Timings")
+            st_trace = st.empty()
+            st_trace.table(self.tracer.summary())
+
         if run_initial_task:
             # get initial list of tasks
             if initial_task_list:
@@ -65,6 +104,7 @@ class AutoStreamlitAGIRunner(BaseAGIRunner):
                     max_tokens=self.execution_agent.max_tokens,
                     prompts=self.execution_agent.prompts,
                 )
+                simple_execution_agent.tracer = self.tracer
                 initial_task_list_result = simple_execution_agent.execute_task(
                     objective=objective,
                     task=initial_task_prompt,
@@ -99,13 +139,17 @@ class AutoStreamlitAGIRunner(BaseAGIRunner):
             # Get the next task
             cur_task = self.task_manager.get_next_task()
 
-            # Execute current task
-            result_dict = self.execution_agent.execute_task(
+            # Execute current task, rendering the output as it arrives
+            renderer = _StreamRenderer(st_output, text=f"**Executing:** {cur_task}\n\n")
+            renderer.render()
+            result_dict = self.execution_agent.execute_task_streaming(
+                renderer,
                 objective=objective,
                 cur_task=cur_task,
                 completed_tasks_summary=st.session_state["tasks_summary"],
             )
             result = result_dict["output"]
+            st_output.empty()
 
             # update logs
             log = make_intermediate_steps_pretty(
@@ -114,14 +158,11 @@ class AutoStreamlitAGIRunner(BaseAGIRunner):
             st.session_state["logs"].append(log)
             st_logs.write(st.session_state["logs"])
 
-            # store the task and result as completed
-            self.task_manager.add_completed_task(cur_task, result)
-
-            # generate new task(s), if needed
-            self.task_manager.generate_new_tasks(objective, cur_task, result)
-
-            # Summarize completed tasks
-            completed_tasks_summary = self.task_manager.get_completed_tasks_summary()
+            # store the task and result as completed, generate new task(s)
+            # and summarize completed tasks
+            completed_tasks_summary = self.process_completed_task(
+                objective, cur_task, result, concurrent=concurrent
+            )
             st.session_state["tasks_summary"] = completed_tasks_summary
 
             # log state of AGI to streamlit
@@ -134,6 +175,8 @@ class AutoStreamlitAGIRunner(BaseAGIRunner):
             )
             if st.session_state["state_str"] is not None:
                 st_state.markdown(st.session_state["state_str"].replace("\n", "\n\n"))
+            if self.tracer is not None:
+                st_trace.table(self.tracer.summary())
 
             # Quit the loop?
             if len(self.task_manager.current_tasks) == 0:
@@ -141,4 +184,5 @@ class AutoStreamlitAGIRunner(BaseAGIRunner):
                 break
 
             # wait a bit to let you read what's happening
-            time.sleep(sleep_time)
+            if not concurrent:
+                time.sleep(sleep_time)
@@ -0,0 +1,181 @@
+import asyncio
+import json
+import time
+from dataclasses import dataclass, replace
+from typing import IO, Any, Callable, Dict, List, Optional, Sequence, Union
+
+from llama_agi.execution_agent.base import BaseExecutionAgent
+from llama_agi.llm_pool import LLMPool
+from llama_agi.runners.AsyncAGIRunner import AsyncAGIRunner
+from llama_agi.task_manager.base import BaseTaskManager
+from llama_agi.task_manager.LlamaTaskManager import LlamaTaskManager
+from llama_agi.tracing import Tracer
+
+DEFAULT_INITIAL_TASK = "Create a list of tasks"
+
+
+@dataclass
+class BatchObjective:
+    objective: str
+    initial_task: str = DEFAULT_INITIAL_TASK
+    initial_task_list: Optional[List[str]] = None
+    id: Optional[str] = None
+
+
+def load_objectives(path: str) -> List[BatchObjective]:
+    """Load objectives from a JSONL file.
+
+    Each line is either a JSON string with the objective, or an object with an
+    "objective" key and optional "initial_task", "initial_task_list" and "id"
+    keys.
+    """
+    objectives = []
+    with open(path, "r") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            data = json.loads(line)
+            if isinstance(data, str):
+                objectives.append(BatchObjective(objective=data))
+            else:
+                objectives.append(BatchObjective(**data))
+    return objectives
+
+
+class BatchAGIRunner:
+    """Batch AGI Runner
+
+    This runner works on many objectives at once, on one event loop. Each
+    objective gets its own task manager, execution agent and AsyncAGIRunner,
+    while all of them share the LLM and embedding model of an LLMPool, so the
+    pool's scheduler paces the LLM and embedding calls of the whole batch.
+
+    The result of each objective (its completed and remaining tasks, and the
+    final completed tasks summary) is appended to a JSONL file as soon as it
+    finishes, along with its metrics: wall time, LLM calls, tokens and the
+    time spent in each stage. An objective that fails is recorded with its
+    error, without stopping the others.
+
+    Args:
+        pool (LLMPool): The LLM and embedding model shared by every objective.
+        execution_agent_factory (Callable[[], BaseExecutionAgent]): Creates the
+        execution agent of an objective. Agents should use pool.llm.
+        task_manager_factory (Optional[Callable[[], BaseTaskManager]]): Creates
+        the task manager of an objective. Defaults to a LlamaTaskManager using
+        pool.service_context.
+        max_iterations (int): The maximum number of tasks executed per objective.
+        max_concurrent_objectives (Optional[int]): The maximum number of
+        objectives worked on at once. Defaults to all of them.
+        max_concurrent_tasks (int): The maximum number of tasks of one
+        objective executed at once.
+        output_path (Optional[str]): The JSONL file results are appended to.
+
+    """
+
+    def __init__(
+        self,
+        pool: LLMPool,
+        execution_agent_factory: Callable[[], BaseExecutionAgent],
+        task_manager_factory: Optional[Callable[[], BaseTaskManager]] = None,
+        max_iterations: int = 10,
+        max_concurrent_objectives: Optional[int] = None,
+        max_concurrent_tasks: int = 1,
+        output_path: Optional[str] = None,
+    ) -> None:
+        self.pool = pool
+        self.execution_agent_factory = execution_agent_factory
+        self.task_manager_factory = task_manager_factory
+        self.max_iterations = max_iterations
+        self.max_concurrent_objectives = max_concurrent_objectives
+        self.max_concurrent_tasks = max_concurrent_tasks
+        self.output_path = output_path
+
+    def _create_task_manager(self) -> BaseTaskManager:
+        if self.task_manager_factory is not None:
+            return self.task_manager_factory()
+        return LlamaTaskManager([], task_service_context=self.pool.service_context)
+
+    async def _arun_objective(
+        self, objective: BatchObjective, output_file: Optional[IO[str]]
+    ) -> Dict[str, Any]:
+        task_manager = self._create_task_manager()
+        tracer = Tracer()
+        runner = AsyncAGIRunner(
+            task_manager,
+            self.execution_agent_factory(),
+            max_concurrent_tasks=self.max_concurrent_tasks,
+            tracer=tracer,
+            verbose=False,
+        )
+
+        record: Dict[str, Any] = {"id": objective.id, "objective": objective.objective}
+        start_time = time.perf_counter()
+        try:
+            record["completed_tasks_summary"] = await runner.arun(
+                objective.objective,
+                objective.initial_task,
+                0,
+                initial_task_list=objective.initial_task_list,
+                max_iterations=self.max_iterations,
+            )
+            record["status"] = "completed"
+        except Exception as e:
+            record["status"] = "failed"
+            record["error"] = f"{type(e).__name__}: {e}"
+        finally:
+            # the pooled LLM outlives the runner
+            runner.remove_tracer()
+
+        stages = tracer.summary()
+        record["completed_tasks"] = [x.get_text() for x in task_manager.completed_tasks]
+        record["remaining_tasks"] = [x.get_text() for x in task_manager.current_tasks]
+        record["metrics"] = {
+            "duration_s": time.perf_counter() - start_time,
+            "num_completed_tasks": len(task_manager.completed_tasks),
+            "llm_calls": sum(x["llm_calls"] for x in stages),
+            "prompt_tokens": sum(x["prompt_tokens"] for x in stages),
+            "completion_tokens": sum(x["completion_tokens"] for x in stages),
+            "cache_hits": sum(x["cache_hits"] for x in stages),
+            "stages": stages,
+        }
+
+        if output_file is not None:
+            output_file.write(json.dumps(record) + "\n")
+            output_file.flush()
+        return record
+
+    async def arun(
+        self, objectives: Sequence[Union[str, BatchObjective]]
+    ) -> List[Dict[str, Any]]:
+        """Work on every objective, returning their records in the same order."""
+        batch_objectives = []
+        for i, objective in enumerate(objectives):
+            if not isinstance(objective, BatchObjective):
+                objective = BatchObjective(objective=objective)
+            if objective.id is None:
+                objective = replace(objective, id=str(i))
+            batch_objectives.append(objective)
+
+        semaphore = asyncio.Semaphore(
+            self.max_concurrent_objectives or max(len(batch_objectives), 1)
+        )
+        output_file = open(self.output_path, "a") if self.output_path else None
+
+        async def run_objective(objective: BatchObjective) -> Dict[str, Any]:
+            async with semaphore:
+                return await self._arun_objective(objective, output_file)
+
+        try:
+            async with self.pool.client_session():
+                return await asyncio.gather(
+                    *(run_objective(x) for x in batch_objectives)
+                )
+        finally:
+            if output_file is not None:
+                output_file.close()
+
+    def run(
+        self, objectives: Sequence[Union[str, BatchObjective]]
+    ) -> List[Dict[str, Any]]:
+        """Work on every objective, returning their records in the same order."""
+        return asyncio.run(self.arun(objectives))
@@ -0,0 +1,190 @@
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional
+
+from llama_agi.checkpoint import CheckpointStore
+from llama_agi.execution_agent.base import BaseExecutionAgent
+from llama_agi.runners.base import BaseAGIRunner
+from llama_agi.task_manager.base import BaseTaskManager
+from llama_agi.tracing import Tracer
+from llama_agi.utils import log_current_status
+
+
+class ParallelAGIRunner(BaseAGIRunner):
+    """Parallel AGI Runner
+
+    This runner executes up to max_workers tasks at once. Only tasks whose
+    dependencies have been completed are dispatched (see
+    BaseTaskManager.get_next_ready_task), so independent tasks run in parallel
+    while dependent tasks wait for their prerequisites.
+
+    Finished tasks are merged back into the task manager one at a time by a
+    dedicated merge worker (see process_completed_task). The thread that
+    called run() only dispatches tasks, so the pool is refilled while results
+    are being merged. The task manager must support being used from both
+    threads (see LlamaTaskManager).
+
+    With a checkpoint_store, the state of the run is saved each time a task
+    is merged back, and resume() continues a run from its last checkpoint.
+    Tasks that were still running when the run stopped are executed again.
+
+    Args:
+        task_manager (BaseTaskManager): The task manager to create, prioritize
+        and track tasks with.
+        execution_agent (BaseExecutionAgent): The agent used to execute tasks.
+        The agent is shared between workers.
+        max_workers (int): The maximum number of tasks executed at once.
+        tracer (Optional[Tracer]): Records the time and tokens of each stage.
+        checkpoint_store (Optional[CheckpointStore]): Where the state of each
+        run is saved.
+    """
+
+    def __init__(
+        self,
+        task_manager: BaseTaskManager,
+        execution_agent: BaseExecutionAgent,
+        max_workers: int = 4,
+        tracer: Optional[Tracer] = None,
+        checkpoint_store: Optional[CheckpointStore] = None,
+    ) -> None:
+        super().__init__(
+            task_manager,
+            execution_agent,
+            tracer=tracer,
+            checkpoint_store=checkpoint_store,
+        )
+        self.max_workers = max_workers
+
+    def _get_next_task(self, num_running: int) -> Optional[str]:
+        """Get the next task to dispatch, or None if nothing can be dispatched."""
+        next_task = self.task_manager.get_next_ready_task()
+        if next_task is None and num_running == 0 and self.task_manager.current_tasks:
+            # nothing is running that could unblock the remaining tasks (e.g.
+            # circular dependencies), so fall back to the next task in order
+            next_task = self.task_manager.get_next_task()
+        return next_task
+
+    def run(
+        self,
+        objective: str,
+        initial_task: str,
+        sleep_time: int,
+        initial_task_list: Optional[List[str]] = None,
+        max_iterations: Optional[int] = None,
+        run_id: Optional[str] = None,
+    ) -> None:
+        # sleep_time is unused, there is no pause between tasks
+        try:
+            self.start_checkpoint(
+                objective, initial_task, initial_task_list, run_id=run_id
+            )
+            completed_tasks_summary = self.create_initial_tasks(
+                objective, initial_task, initial_task_list=initial_task_list
+            )
+            self.save_checkpoint(0, completed_tasks_summary)
+
+            self._run_loop(objective, completed_tasks_summary, 0, max_iterations)
+        finally:
+            self.close_checkpoint()
+
+    def resume(
+        self, run_id: str, sleep_time: int, max_iterations: Optional[int] = None
+    ) -> None:
+        """Resume a checkpointed run after its last saved task.
+
+        The run is restored without any LLM calls (see restore()).
+        max_iterations counts the tasks of the whole run, including those
+        completed before it was resumed.
+        """
+        try:
+            state = self.restore(run_id)
+            completed_tasks_summary = state.completed_tasks_summary
+            if completed_tasks_summary is None:
+                # the run stopped before its initial tasks were saved
+                completed_tasks_summary = self.create_initial_tasks(
+                    state.objective,
+                    state.initial_task,
+                    initial_task_list=state.initial_task_list,
+                )
+                self.save_checkpoint(0, completed_tasks_summary)
+
+            self._run_loop(
+                state.objective,
+                completed_tasks_summary,
+                state.iteration,
+                max_iterations,
+            )
+        finally:
+            self.close_checkpoint()
+
+    def _merge_task(
+        self, objective: str, cur_task: str, result: str, iteration: int
+    ) -> str:
+        """Merge a finished task back into the task manager, on the merge worker."""
+        # not concurrent: the LlamaIndex callback manager of the task manager
+        # can only trace one query at a time
+        completed_tasks_summary = self.process_completed_task(
+            objective, cur_task, result
+        )
+        self.save_checkpoint(iteration, completed_tasks_summary)
+
+        # log state of AGI to terminal
+        log_current_status(
+            cur_task,
+            result,
+            completed_tasks_summary,
+            self.task_manager.current_tasks,
+        )
+        return completed_tasks_summary
+
+    def _run_loop(
+        self,
+        objective: str,
+        completed_tasks_summary: str,
+        num_dispatched: int,
+        max_iterations: Optional[int],
+    ) -> None:
+        num_merged = num_dispatched
+        with ThreadPoolExecutor(
+            max_workers=self.max_workers
+        ) as executor, ThreadPoolExecutor(max_workers=1) as merge_executor:
+            running: Dict["Future[Dict[str, Any]]", str] = {}
+            merging: Dict["Future[str]", str] = {}
+            while True:
+                # dispatch ready tasks until the pool is full
+                while len(running) < self.max_workers and (
+                    max_iterations is None or num_dispatched < max_iterations
+                ):
+                    next_task = self._get_next_task(len(running) + len(merging))
+                    if next_task is None:
+                        break
+                    execution = executor.submit(
+                        self.execution_agent.execute_task,
+                        objective=objective,
+                        cur_task=next_task,
+                        completed_tasks_summary=completed_tasks_summary,
+                    )
+                    running[execution] = next_task
+                    num_dispatched += 1
+
+                if len(running) == 0 and len(merging) == 0:
+                    if len(self.task_manager.current_tasks) == 0:
+                        print("Out of tasks! Objective Accomplished?")
+                    break
+
+                # hand finished tasks to the merge worker, and pick up the
+                # summaries of merged tasks for the next dispatched tasks
+                futures: List["Future[Any]"] = [*running, *merging]
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future in merging:
+                        merging.pop(future)
+                        completed_tasks_summary = future.result()
+                        continue
+
+                    cur_task = running.pop(future)
+                    result = future.result()["output"]
+                    num_merged += 1
+                    merge = merge_executor.submit(
+                        self._merge_task, objective, cur_task, result, num_merged
+                    )
+                    merging[merge] = cur_task
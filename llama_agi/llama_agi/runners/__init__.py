@@ -1,4 +1,13 @@
+from .AsyncAGIRunner import AsyncAGIRunner
 from .AutoAGIRunner import AutoAGIRunner
 from .AutoStreamlitAGIRunner import AutoStreamlitAGIRunner
+from .BatchAGIRunner import BatchAGIRunner
+from .ParallelAGIRunner import ParallelAGIRunner
 
-__all__ = [AutoAGIRunner, AutoStreamlitAGIRunner]
+__all__ = [
+    AsyncAGIRunner,
+    AutoAGIRunner,
+    AutoStreamlitAGIRunner,
+    BatchAGIRunner,
+    ParallelAGIRunner,
+]
@@ -1,16 +1,72 @@
+import asyncio
 from abc import abstractmethod
-from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from typing import Any, List, Optional
 
-from llama_agi.execution_agent.base import BaseExecutionAgent
+from llama_index import LLMPredictor
+
+from llama_agi.checkpoint import (
+    CheckpointStore,
+    CheckpointWriter,
+    RunState,
+    new_run_id,
+)
+from llama_agi.execution_agent.base import BaseExecutionAgent, LlamaAgentPrompts
+from llama_agi.execution_agent.SimpleExecutionAgent import SimpleExecutionAgent
 from llama_agi.task_manager.base import BaseTaskManager
+from llama_agi.tracing import Tracer
 
 
 class BaseAGIRunner:
     def __init__(
-        self, task_manager: BaseTaskManager, execution_agent: BaseExecutionAgent
+        self,
+        task_manager: BaseTaskManager,
+        execution_agent: BaseExecutionAgent,
+        tracer: Optional[Tracer] = None,
+        checkpoint_store: Optional[CheckpointStore] = None,
     ) -> None:
         self.task_manager = task_manager
         self.execution_agent = execution_agent
+        self.tracer = tracer
+        if tracer is not None:
+            self._instrument(tracer)
+        # with a checkpoint store, the state of the run is saved after every
+        # iteration, so it can be resumed by its run_id
+        self.checkpoint_store = checkpoint_store
+        self.run_id: Optional[str] = None
+        self._checkpoint: Optional[CheckpointWriter] = None
+
+    def _instrument(self, tracer: Tracer) -> None:
+        """Trace the stages of the task manager and execution agent.
+
+        LLM calls are only counted for the execution agent LLM and the LLM of
+        the task manager's service context, and tool calls for the execution
+        agent tools.
+        """
+        self.task_manager.tracer = tracer
+        self.execution_agent.tracer = tracer
+        for obj in self._get_instrumented_objects():
+            tracer.instrument(obj)
+
+    def _get_instrumented_objects(self) -> List[Any]:
+        objs: List[Any] = [self.execution_agent._llm, *self.execution_agent.tools]
+        service_context = self.task_manager.task_service_context
+        if service_context is not None and isinstance(
+            service_context.llm_predictor, LLMPredictor
+        ):
+            objs.append(service_context.llm_predictor.llm)
+        return objs
+
+    def remove_tracer(self) -> None:
+        """Stop tracing, e.g. before the LLMs and tools are used by other runners."""
+        if self.tracer is None:
+            return
+        for obj in self._get_instrumented_objects():
+            self.tracer.uninstrument(obj)
+        self.task_manager.tracer = None
+        self.execution_agent.tracer = None
+        self.tracer = None
 
     @abstractmethod
     def run(
@@ -21,3 +77,177 @@ class BaseAGIRunner:
         initial_task_list: Optional[List[str]] = None,
     ) -> None:
         """Run the task manager and execution agent in a loop."""
+
+    def start_checkpoint(
+        self,
+        objective: str,
+        initial_task: str,
+        initial_task_list: Optional[List[str]] = None,
+        run_id: Optional[str] = None,
+    ) -> None:
+        """Start checkpointing a new run, if the runner has a checkpoint store."""
+        if self.checkpoint_store is None:
+            return
+        self.close_checkpoint()
+        self.run_id = run_id or new_run_id()
+        self._checkpoint = self.checkpoint_store.open(self.run_id)
+        self._checkpoint.write_start(
+            objective,
+            initial_task,
+            initial_task_list,
+            asdict(self.execution_agent.prompts),
+        )
+
+    def save_checkpoint(self, iteration: int, completed_tasks_summary: str) -> None:
+        """Save the state of the run after an iteration."""
+        if self._checkpoint is not None:
+            self._checkpoint.write_iteration(
+                iteration, completed_tasks_summary, self.task_manager.get_state()
+            )
+
+    def close_checkpoint(self) -> None:
+        if self._checkpoint is not None:
+            self._checkpoint.close()
+            self._checkpoint = None
+
+    def restore(self, run_id: str) -> RunState:
+        """Rebuild the state of a checkpointed run, without any LLM calls.
+
+        The task manager state and the execution agent prompts are restored,
+        and the next checkpoints are appended to the run's checkpoint.
+        """
+        if self.checkpoint_store is None:
+            raise ValueError("A checkpoint_store is needed to restore a run")
+        state = self.checkpoint_store.load(run_id)
+        if state.task_manager_state:
+            self.task_manager.load_state(state.task_manager_state)
+        agent_prompts = LlamaAgentPrompts(**state.agent_prompts)
+        if agent_prompts != self.execution_agent.prompts:
+            self.execution_agent.set_prompts(agent_prompts)
+
+        self.close_checkpoint()
+        self.run_id = run_id
+        self._checkpoint = self.checkpoint_store.open(run_id, state)
+        return state
+
+    def _get_simple_execution_agent(self) -> SimpleExecutionAgent:
+        """Create a simple execution agent using the current agent."""
+        simple_execution_agent = SimpleExecutionAgent(
+            llm=self.execution_agent._llm,
+            max_tokens=self.execution_agent.max_tokens,
+            prompts=self.execution_agent.prompts,
+        )
+        simple_execution_agent.tracer = self.tracer
+        return simple_execution_agent
+
+    def create_initial_tasks(
+        self,
+        objective: str,
+        initial_task: str,
+        initial_task_list: Optional[List[str]] = None,
+    ) -> str:
+        """Create and prioritize the initial list of tasks.
+
+        Returns the initial completed tasks summary.
+        """
+        initial_completed_tasks_summary = (
+            self.task_manager.get_completed_tasks_summary()
+        )
+
+        # get initial list of tasks
+        if initial_task_list:
+            self.task_manager.add_new_tasks(initial_task_list)
+        else:
+            initial_task_prompt = initial_task + "\nReturn the list as an array."
+
+            simple_execution_agent = self._get_simple_execution_agent()
+            initial_task_list_result = simple_execution_agent.execute_task(
+                objective=objective,
+                task=initial_task_prompt,
+                completed_tasks_summary=initial_completed_tasks_summary,
+            )
+
+            initial_task_list = self.task_manager.parse_task_list(
+                initial_task_list_result["output"]
+            )
+
+            # add tasks to the task manager
+            self.task_manager.add_new_tasks(initial_task_list)
+
+        # prioritize initial tasks
+        self.task_manager.prioritize_tasks(objective)
+
+        return initial_completed_tasks_summary
+
+    def process_completed_task(
+        self, objective: str, cur_task: str, result: str, concurrent: bool = False
+    ) -> str:
+        """Store a completed task, generate new tasks and summarize completed tasks.
+
+        Generating new tasks and summarizing completed tasks do not depend on
+        each other's output, so with concurrent=True both LLM calls are made at
+        the same time. Returns the completed tasks summary.
+        """
+        self.task_manager.add_completed_task(cur_task, result)
+
+        if not concurrent:
+            self.task_manager.generate_new_tasks(objective, cur_task, result)
+            return self.task_manager.get_completed_tasks_summary()
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            new_tasks_future = executor.submit(
+                self.task_manager.generate_new_tasks, objective, cur_task, result
+            )
+            summary_future = executor.submit(
+                self.task_manager.get_completed_tasks_summary
+            )
+            new_tasks_future.result()
+            return summary_future.result()
+
+    async def acreate_initial_tasks(
+        self,
+        objective: str,
+        initial_task: str,
+        initial_task_list: Optional[List[str]] = None,
+    ) -> str:
+        """Create and prioritize the initial list of tasks, with async LLM calls.
+
+        Returns the initial completed tasks summary.
+        """
+        initial_completed_tasks_summary = (
+            await self.task_manager.aget_completed_tasks_summary()
+        )
+
+        if not initial_task_list:
+            initial_task_list_result = (
+                await self._get_simple_execution_agent().aexecute_task(
+                    objective=objective,
+                    task=initial_task + "\nReturn the list as an array.",
+                    completed_tasks_summary=initial_completed_tasks_summary,
+                )
+            )
+            initial_task_list = self.task_manager.parse_task_list(
+                initial_task_list_result["output"]
+            )
+        self.task_manager.add_new_tasks(initial_task_list)
+
+        await self.task_manager.aprioritize_tasks(objective)
+
+        return initial_completed_tasks_summary
+
+    async def aprocess_completed_task(
+        self, objective: str, cur_task: str, result: str
+    ) -> str:
+        """Store a completed task, generate new tasks and summarize completed tasks.
+
+        Generating new tasks and summarizing completed tasks do not depend on
+        each other's output, so both are awaited at the same time. Returns the
+        completed tasks summary.
+        """
+        self.task_manager.add_completed_task(cur_task, result)
+
+        _, completed_tasks_summary = await asyncio.gather(
+            self.task_manager.agenerate_new_tasks(objective, cur_task, result),
+            self.task_manager.aget_completed_tasks_summary(),
+        )
+        return completed_tasks_summary
@@ -0,0 +1,798 @@
+"""A central scheduler for LLM and embedding calls.
+
+An LLMScheduler admits calls within token bucket limits on requests per
+minute and tokens per minute, so a run goes as fast as its quota allows
+instead of sleeping between loops. Calls waiting to be admitted are served by
+priority class (executing a task goes before creating, prioritizing and
+summarizing tasks, and in auto_llama, the agent deciding its next command
+goes before summarizing web pages), and in arrival order within a class.
+
+Calls that are rate limited anyway (an HTTP 429, e.g. an openai
+RateLimitError) are retried after a jittered exponential backoff, or after
+the server's Retry-After. While backing off, every call waits and the rates
+are halved, then they recover as calls succeed again. Calls failing with a
+timeout, connection or server error are retried after a backoff too.
+
+Wrap a langchain LLM with get_scheduled_llm, and a LlamaIndex embedding model
+with ScheduledEmbedding, so their calls go through a scheduler. A call gets
+the priority of the stage making it (see prioritized), or the one set with
+llm_priority.
+"""
+import asyncio
+import functools
+import heapq
+import itertools
+import math
+import random
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    TypeVar,
+    Union,
+    cast,
+)
+
+from langchain.callbacks.manager import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain.chat_models.base import BaseChatModel
+from langchain.llms import BaseLLM
+from langchain.schema import BaseMessage, ChatResult, LLMResult
+from llama_index.embeddings.base import BaseEmbedding
+from llama_index.utils import globals_helper
+
+F = TypeVar("F", bound=Callable[..., Any])
+T = TypeVar("T")
+
+# the completion tokens reserved for a call to an LLM without max_tokens
+DEFAULT_COMPLETION_TOKENS = 256
+
+# the errors (besides rate limits and 5xx responses) worth retrying, by name
+# so that they don't depend on the version of the openai package
+TRANSIENT_ERRORS = {
+    "APIConnectionError",
+    "ServiceUnavailableError",
+    "Timeout",
+    "TimeoutError",
+    "TryAgain",
+}
+
+# rate limits halve on every 429, down to this fraction of the configured rates
+MIN_RATE_MULTIPLIER = 0.1
+# and recover by this fraction of the configured rates on every successful call
+RATE_RECOVERY_STEP = 0.05
+
+
+class Priority(IntEnum):
+    """The priority classes of LLM calls, most urgent first."""
+
+    EXECUTION = 0
+    TASK_CREATION = 1
+    PRIORITIZATION = 2
+    SUMMARIZATION = 3
+
+
+_current_priority: ContextVar[Priority] = ContextVar(
+    "llm_priority", default=Priority.EXECUTION
+)
+
+
+@contextmanager
+def llm_priority(priority: Priority) -> Iterator[None]:
+    """Schedule the calls made in the body of the with statement with priority."""
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+def prioritized(priority: Priority) -> Callable[[F], F]:
+    """Schedule the calls made by a method or coroutine with priority."""
+
+    def decorator(func: F) -> F:
+        if asyncio.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                with llm_priority(priority):
+                    return await func(*args, **kwargs)
+
+            return cast(F, async_wrapper)
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with llm_priority(priority):
+                return func(*args, **kwargs)
+
+        return cast(F, wrapper)
+
+    return decorator
+
+
+def _in_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def _unwrap_error(error: BaseException) -> BaseException:
+    # tenacity (which the OpenAI embeddings retry with) raises a RetryError
+    # around the error of the last attempt
+    last_attempt = getattr(error, "last_attempt", None)
+    if last_attempt is not None and last_attempt.failed:
+        return last_attempt.exception()
+    return error
+
+
+def _get_http_status(error: BaseException) -> Optional[int]:
+    for attribute in ("http_status", "status_code", "status"):
+        status = getattr(error, attribute, None)
+        if isinstance(status, int):
+            return status
+    return None
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """Check whether an error is an HTTP 429 Too Many Requests."""
+    error = _unwrap_error(error)
+    return _get_http_status(error) == 429 or type(error).__name__ == "RateLimitError"
+
+
+def is_transient_error(error: BaseException) -> bool:
+    """Check whether an error is a timeout, connection or server error."""
+    error = _unwrap_error(error)
+    status = _get_http_status(error)
+    if status is not None and status >= 500:
+        return True
+    return type(error).__name__ in TRANSIENT_ERRORS
+
+
+def get_retry_after(error: BaseException) -> Optional[float]:
+    """Get the seconds a rate limited error asks to wait before retrying."""
+    headers = getattr(_unwrap_error(error), "headers", None) or {}
+    for key in ("retry-after", "Retry-After"):
+        try:
+            return float(headers[key])
+        except (KeyError, TypeError, ValueError):
+            continue
+    return None
+
+
+class TokenBucket:
+    """Token Bucket
+
+    Refills at per_minute / 60 units a second, up to capacity units. Units
+    taken beyond the level of the bucket are a debt paid back by refills, so
+    an amount larger than the capacity can still be taken once it is full.
+
+    Args:
+        per_minute (float): The units added to the bucket per minute.
+        capacity (float): The most units the bucket holds.
+
+    """
+
+    def __init__(self, per_minute: float, capacity: float) -> None:
+        self.rate = per_minute / 60
+        self.capacity = capacity
+        self.level = capacity
+        self._last_time = time.monotonic()
+
+    def delay(self, amount: float, now: float, rate_multiplier: float = 1.0) -> float:
+        """Get the seconds until amount units can be taken."""
+        rate = self.rate * rate_multiplier
+        self.level = min(self.capacity, self.level + (now - self._last_time) * rate)
+        self._last_time = now
+        return max(min(amount, self.capacity) - self.level, 0.0) / rate
+
+    def take(self, amount: float) -> None:
+        self.level -= amount
+
+
+@dataclass(order=True)
+class _Waiter:
+    priority: int
+    seq: int
+    tokens: int = field(compare=False)
+    wake: Callable[[], None] = field(compare=False)
+
+
+@dataclass
+class _PriorityStats:
+    calls: int = 0
+    wait_time: float = 0.0
+    max_wait_time: float = 0.0
+
+
+class LLMScheduler:
+    """LLM Scheduler
+
+    Admits LLM and embedding calls within rate limits, serving waiting calls
+    by priority, and retries the calls that fail with retryable errors. Calls can
+    be made from any thread, and from coroutines on any event loop. Sync calls
+    made from a thread running an event loop are admitted without waiting for
+    their turn, since waiting would block the calls ahead of them.
+
+    Each call reserves the tokens of its prompt plus its max_tokens, which,
+    like the OpenAI API, are counted even if the completion is shorter. Any
+    tokens used beyond those are counted once the call returns. The LLMs
+    wrapped should not retry failed calls themselves (e.g. create langchain
+    OpenAI LLMs with max_retries=1), so their 429s reach the scheduler.
+
+    Args:
+        requests_per_minute (Optional[float]): The calls admitted per minute.
+        tokens_per_minute (Optional[float]): The tokens admitted per minute.
+        max_concurrency (Optional[int]): The most calls in flight at once.
+        burst_seconds (float): The seconds of quota that can be used at once,
+        after the scheduler has been idle.
+        max_retries (int): The number of times a failed call is retried.
+        initial_backoff (float): The seconds waited before the first retry,
+        doubled for each retry after it.
+        max_backoff (float): The most seconds waited before a retry.
+        jitter (float): The largest fraction of the backoff randomly added to
+        it, so clients rate limited together don't retry together.
+
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        max_concurrency: Optional[int] = None,
+        burst_seconds: float = 1.0,
+        max_retries: int = 6,
+        initial_backoff: float = 1.0,
+        max_backoff: float = 60.0,
+        jitter: float = 0.5,
+    ) -> None:
+        self.request_bucket = (
+            TokenBucket(requests_per_minute, requests_per_minute * burst_seconds / 60)
+            if requests_per_minute
+            else None
+        )
+        self.token_bucket = (
+            TokenBucket(tokens_per_minute, tokens_per_minute * burst_seconds / 60)
+            if tokens_per_minute
+            else None
+        )
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+
+        self.rate_multiplier = 1.0
+        self.num_in_flight = 0
+        self._paused_until = 0.0
+        self._queue: List[_Waiter] = []
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+        self.max_in_flight = 0
+        self.max_queue_depth = 0
+        self.num_rate_limited = 0
+        self.num_retries = 0
+        self._queue_depth_total = 0
+        self._num_enqueued = 0
+        self._calls: Dict[str, int] = defaultdict(int)
+        self._priority_stats: Dict[Priority, _PriorityStats] = defaultdict(
+            _PriorityStats
+        )
+
+    def _enqueue(self, waiter: _Waiter) -> None:
+        with self._lock:
+            self._queue_depth_total += len(self._queue)
+            self._num_enqueued += 1
+            heapq.heappush(self._queue, waiter)
+            self.max_queue_depth = max(self.max_queue_depth, len(self._queue))
+
+    def _remove(self, waiter: _Waiter) -> None:
+        with self._lock:
+            if waiter in self._queue:
+                self._queue.remove(waiter)
+                heapq.heapify(self._queue)
+                self._wake_next()
+
+    def _wake_next(self) -> None:
+        if self._queue:
+            self._queue[0].wake()
+
+    def _try_admit(self, waiter: _Waiter) -> float:
+        """Admit the waiter if it can go now.
+
+        Otherwise, get the seconds to wait before trying again, which is inf if
+        it should wait to be woken (it isn't next, or too many calls are in
+        flight).
+        """
+        with self._lock:
+            if self._queue[0] is not waiter:
+                return math.inf
+            if (
+                self.max_concurrency is not None
+                and self.num_in_flight >= self.max_concurrency
+            ):
+                return math.inf
+
+            now = time.monotonic()
+            delay = self._paused_until - now
+            if self.request_bucket is not None:
+                delay = max(
+                    delay, self.request_bucket.delay(1, now, self.rate_multiplier)
+                )
+            if self.token_bucket is not None:
+                delay = max(
+                    delay,
+                    self.token_bucket.delay(waiter.tokens, now, self.rate_multiplier),
+                )
+            if delay > 0:
+                return delay
+
+            heapq.heappop(self._queue)
+            self._take(waiter.tokens)
+            self._wake_next()
+            return 0.0
+
+    def _take(self, tokens: int) -> None:
+        if self.request_bucket is not None:
+            self.request_bucket.take(1)
+        if self.token_bucket is not None:
+            self.token_bucket.take(tokens)
+        self.num_in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.num_in_flight)
+
+    def _admit_now(self, tokens: int) -> None:
+        """Admit a call without waiting for its turn, only for any backoff."""
+        with self._lock:
+            pause = self._paused_until - time.monotonic()
+        if pause > 0:
+            time.sleep(pause)
+        with self._lock:
+            self._take(tokens)
+
+    def _acquire(self, priority: Priority, seq: int, tokens: int) -> None:
+        if _in_event_loop():
+            # a sync call blocks the event loop, so its turn may never come if
+            # the calls ahead of it are coroutines on that loop. It still uses
+            # quota, which the calls after it wait for.
+            self._admit_now(tokens)
+            return
+
+        event = threading.Event()
+        waiter = _Waiter(priority, seq, tokens, event.set)
+        self._enqueue(waiter)
+        try:
+            while True:
+                # cleared before trying, so a wake up in between isn't missed
+                event.clear()
+                delay = self._try_admit(waiter)
+                if delay == 0:
+                    return
+                event.wait(None if math.isinf(delay) else delay)
+        except BaseException:
+            self._remove(waiter)
+            raise
+
+    async def _aacquire(self, priority: Priority, seq: int, tokens: int) -> None:
+        loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+
+        def wake() -> None:
+            # waiters are woken from whichever thread frees their turn
+            loop.call_soon_threadsafe(event.set)
+
+        waiter = _Waiter(priority, seq, tokens, wake)
+        self._enqueue(waiter)
+        try:
+            while True:
+                event.clear()
+                delay = self._try_admit(waiter)
+                if delay == 0:
+                    return
+                try:
+                    await asyncio.wait_for(
+                        event.wait(), None if math.isinf(delay) else delay
+                    )
+                except asyncio.TimeoutError:
+                    pass
+        except BaseException:
+            self._remove(waiter)
+            raise
+
+    def _record_admission(
+        self, priority: Priority, kind: str, wait_time: float
+    ) -> None:
+        with self._lock:
+            self._calls[kind] += 1
+            stats = self._priority_stats[priority]
+            stats.calls += 1
+            stats.wait_time += wait_time
+            stats.max_wait_time = max(stats.max_wait_time, wait_time)
+
+    def _release(self, reserved_tokens: int, used_tokens: Optional[int]) -> None:
+        """Free the slot of a call that succeeded, counting any extra tokens."""
+        with self._lock:
+            self.num_in_flight -= 1
+            if (
+                self.token_bucket is not None
+                and used_tokens is not None
+                and used_tokens > reserved_tokens
+            ):
+                self.token_bucket.take(used_tokens - reserved_tokens)
+            self.rate_multiplier = min(1.0, self.rate_multiplier + RATE_RECOVERY_STEP)
+            self._wake_next()
+
+    def _get_backoff(self, error: Exception, attempt: int) -> float:
+        backoff = get_retry_after(error)
+        if backoff is None:
+            backoff = min(self.max_backoff, self.initial_backoff * 2**attempt)
+        return backoff * (1 + random.uniform(0, self.jitter))
+
+    def _release_failed(self, error: Exception, attempt: int) -> Optional[float]:
+        """Free the slot of a call that failed.
+
+        Returns the seconds to wait before retrying it, or None if it should
+        not be retried.
+        """
+        rate_limited = is_rate_limit_error(error)
+        retry = attempt < self.max_retries and (
+            rate_limited or is_transient_error(error)
+        )
+        backoff = self._get_backoff(error, attempt)
+        with self._lock:
+            self.num_in_flight -= 1
+            if rate_limited:
+                self.num_rate_limited += 1
+                now = time.monotonic()
+                if now >= self._paused_until:
+                    # slow down once per backoff, not once per call in flight
+                    self.rate_multiplier = max(
+                        MIN_RATE_MULTIPLIER, self.rate_multiplier / 2
+                    )
+                self._paused_until = max(self._paused_until, now + backoff)
+                # every call waits out the pause, including this one's retry
+                backoff = 0.0
+            if retry:
+                self.num_retries += 1
+            self._wake_next()
+        return backoff if retry else None
+
+    def run(
+        self,
+        func: Callable[[], T],
+        tokens: int = 0,
+        priority: Optional[Priority] = None,
+        kind: str = "llm",
+        count_tokens: Optional[Callable[[T], Optional[int]]] = None,
+    ) -> T:
+        """Call func once admitted, retrying it if it fails with a retryable error.
+
+        Args:
+            func (Callable[[], T]): Makes the call.
+            tokens (int): The tokens the call is expected to use.
+            priority (Optional[Priority]): Defaults to the current priority.
+            kind (str): The kind of call ("llm" or "embedding"), for metrics.
+            count_tokens (Optional[Callable[[T], Optional[int]]]): Gets the
+            tokens the call actually used from its result.
+
+        """
+        if priority is None:
+            priority = _current_priority.get()
+        # retries keep their place among the calls of the same priority
+        seq = next(self._seq)
+        attempt = 0
+        while True:
+            start_time = time.perf_counter()
+            self._acquire(priority, seq, tokens)
+            self._record_admission(priority, kind, time.perf_counter() - start_time)
+            try:
+                result = func()
+            except Exception as e:
+                backoff = self._release_failed(e, attempt)
+                if backoff is None:
+                    raise
+                time.sleep(backoff)
+                attempt += 1
+                continue
+            except BaseException:
+                self._release(tokens, None)
+                raise
+            self._release(tokens, count_tokens(result) if count_tokens else None)
+            return result
+
+    async def arun(
+        self,
+        func: Callable[[], Awaitable[T]],
+        tokens: int = 0,
+        priority: Optional[Priority] = None,
+        kind: str = "llm",
+        count_tokens: Optional[Callable[[T], Optional[int]]] = None,
+    ) -> T:
+        """Await func() once admitted, retrying it if it fails with a retryable error.
+
+        Takes the same arguments as run, except func returns an awaitable.
+        """
+        if priority is None:
+            priority = _current_priority.get()
+        seq = next(self._seq)
+        attempt = 0
+        while True:
+            start_time = time.perf_counter()
+            await self._aacquire(priority, seq, tokens)
+            self._record_admission(priority, kind, time.perf_counter() - start_time)
+            try:
+                result = await func()
+            except Exception as e:
+                backoff = self._release_failed(e, attempt)
+                if backoff is None:
+                    raise
+                await asyncio.sleep(backoff)
+                attempt += 1
+                continue
+            except BaseException:
+                # e.g. cancelled while the call was in flight
+                self._release(tokens, None)
+                raise
+            self._release(tokens, count_tokens(result) if count_tokens else None)
+            return result
+
+    def metrics(self) -> Dict[str, float]:
+        """Get the number of calls made, how long they waited and the queue depth."""
+        with self._lock:
+            num_calls = sum(self._calls.values())
+            wait_time = sum(x.wait_time for x in self._priority_stats.values())
+            metrics: Dict[str, float] = {
+                "llm_calls": self._calls["llm"],
+                "embedding_calls": self._calls["embedding"],
+                "rate_limited": self.num_rate_limited,
+                "retries": self.num_retries,
+                "in_flight": self.num_in_flight,
+                "max_in_flight": self.max_in_flight,
+                "queue_depth": len(self._queue),
+                "max_queue_depth": self.max_queue_depth,
+                "mean_queue_depth": self._queue_depth_total
+                / max(self._num_enqueued, 1),
+                "rate_multiplier": self.rate_multiplier,
+                "wait_time_s": wait_time,
+                "mean_wait_ms": wait_time / max(num_calls, 1) * 1000,
+            }
+            for priority in Priority:
+                stats = self._priority_stats[priority]
+                name = priority.name.lower()
+                metrics[f"{name}_calls"] = stats.calls
+                metrics[f"{name}_mean_wait_ms"] = (
+                    stats.wait_time / max(stats.calls, 1) * 1000
+                )
+                metrics[f"{name}_max_wait_ms"] = stats.max_wait_time * 1000
+        return metrics
+
+
+def _count_tokens(text: str) -> int:
+    return len(globals_helper.tokenizer(text))
+
+
+def _get_max_tokens(llm: Union[BaseLLM, BaseChatModel]) -> int:
+    max_tokens = getattr(llm, "max_tokens", None)
+    if isinstance(max_tokens, int) and max_tokens > 0:
+        return max_tokens
+    return DEFAULT_COMPLETION_TOKENS
+
+
+def _get_token_usage(llm_output: Optional[dict]) -> Optional[int]:
+    total_tokens = ((llm_output or {}).get("token_usage") or {}).get("total_tokens")
+    return total_tokens if isinstance(total_tokens, int) else None
+
+
+class ScheduledLLM(BaseLLM):
+    """Scheduled LLM
+
+    Makes the calls of a completion LLM through an LLMScheduler. Its
+    parameters (and so its completion cache entries) are those of the wrapped
+    LLM.
+
+    Args:
+        llm (BaseLLM): The LLM to wrap.
+        scheduler (LLMScheduler): The scheduler admitting the calls.
+
+    """
+
+    llm: BaseLLM
+    scheduler: LLMScheduler
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    @property
+    def _llm_type(self) -> str:
+        return self.llm._llm_type
+
+    @property
+    def _identifying_params(self) -> Mapping[str, Any]:
+        return self.llm._identifying_params
+
+    def dict(self, **kwargs: Any) -> Dict:
+        return self.llm.dict(**kwargs)
+
+    def _reserved_tokens(self, prompts: List[str]) -> int:
+        return sum(_count_tokens(x) for x in prompts) + _get_max_tokens(self.llm) * len(
+            prompts
+        )
+
+    def _count_tokens(self, prompts: List[str], result: LLMResult) -> int:
+        used_tokens = _get_token_usage(result.llm_output)
+        if used_tokens is None:
+            used_tokens = sum(_count_tokens(x) for x in prompts) + sum(
+                _count_tokens(x.text)
+                for generations in result.generations
+                for x in generations
+            )
+        return used_tokens
+
+    def _generate(
+        self,
+        prompts: List[str],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+    ) -> LLMResult:
+        return self.scheduler.run(
+            lambda: self.llm._generate(prompts, stop=stop, run_manager=run_manager),
+            tokens=self._reserved_tokens(prompts),
+            count_tokens=lambda result: self._count_tokens(prompts, result),
+        )
+
+    async def _agenerate(
+        self,
+        prompts: List[str],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+    ) -> LLMResult:
+        return await self.scheduler.arun(
+            lambda: self.llm._agenerate(prompts, stop=stop, run_manager=run_manager),
+            tokens=self._reserved_tokens(prompts),
+            count_tokens=lambda result: self._count_tokens(prompts, result),
+        )
+
+
+class ScheduledChatModel(BaseChatModel):
+    """Scheduled Chat Model
+
+    Makes the calls of a chat model through an LLMScheduler.
+
+    Args:
+        llm (BaseChatModel): The chat model to wrap.
+        scheduler (LLMScheduler): The scheduler admitting the calls.
+
+    """
+
+    llm: BaseChatModel
+    scheduler: LLMScheduler
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    @property
+    def _identifying_params(self) -> Mapping[str, Any]:
+        return getattr(self.llm, "_identifying_params", {})
+
+    def _combine_llm_outputs(self, llm_outputs: List[Optional[dict]]) -> dict:
+        return self.llm._combine_llm_outputs(llm_outputs)
+
+    def _prompt_tokens(self, messages: List[BaseMessage]) -> int:
+        # each message also takes a few tokens for its role and separators
+        return sum(_count_tokens(x.content) + 4 for x in messages)
+
+    def _count_tokens(self, messages: List[BaseMessage], result: ChatResult) -> int:
+        used_tokens = _get_token_usage(result.llm_output)
+        if used_tokens is None:
+            used_tokens = self._prompt_tokens(messages) + sum(
+                _count_tokens(x.text) for x in result.generations
+            )
+        return used_tokens
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+    ) -> ChatResult:
+        return self.scheduler.run(
+            lambda: self.llm._generate(messages, stop=stop, run_manager=run_manager),
+            tokens=self._prompt_tokens(messages) + _get_max_tokens(self.llm),
+            count_tokens=lambda result: self._count_tokens(messages, result),
+        )
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+    ) -> ChatResult:
+        return await self.scheduler.arun(
+            lambda: self.llm._agenerate(messages, stop=stop, run_manager=run_manager),
+            tokens=self._prompt_tokens(messages) + _get_max_tokens(self.llm),
+            count_tokens=lambda result: self._count_tokens(messages, result),
+        )
+
+
+def get_scheduled_llm(
+    llm: Union[BaseLLM, BaseChatModel], scheduler: LLMScheduler
+) -> Union[BaseLLM, BaseChatModel]:
+    """Wrap an LLM or chat model so its calls go through the scheduler."""
+    if isinstance(llm, BaseChatModel):
+        return ScheduledChatModel(llm=llm, scheduler=scheduler)
+    return ScheduledLLM(llm=llm, scheduler=scheduler)
+
+
+class ScheduledEmbedding(BaseEmbedding):
+    """Scheduled Embedding
+
+    Makes the calls of a LlamaIndex embedding model through an LLMScheduler.
+    A batch of texts embedded together is one call.
+
+    Args:
+        embed_model (BaseEmbedding): The embedding model to wrap.
+        scheduler (LLMScheduler): The scheduler admitting the calls.
+
+    """
+
+    def __init__(self, embed_model: BaseEmbedding, scheduler: LLMScheduler) -> None:
+        super().__init__(
+            embed_batch_size=embed_model._embed_batch_size,
+            tokenizer=embed_model._tokenizer,
+            callback_manager=embed_model.callback_manager,
+        )
+        self.embed_model = embed_model
+        self.scheduler = scheduler
+
+    def _tokens(self, texts: List[str]) -> int:
+        return sum(len(self._tokenizer(x)) for x in texts)
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return self.scheduler.run(
+            lambda: self.embed_model._get_query_embedding(query),
+            tokens=self._tokens([query]),
+            kind="embedding",
+        )
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self.scheduler.run(
+            lambda: self.embed_model._get_text_embedding(text),
+            tokens=self._tokens([text]),
+            kind="embedding",
+        )
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        return self.scheduler.run(
+            lambda: self.embed_model._get_text_embeddings(texts),
+            tokens=self._tokens(texts),
+            kind="embedding",
+        )
+
+    async def _aget_text_embedding(self, text: str) -> List[float]:
+        return await self.scheduler.arun(
+            lambda: self.embed_model._aget_text_embedding(text),
+            tokens=self._tokens([text]),
+            kind="embedding",
+        )
+
+    async def _aget_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        return await self.scheduler.arun(
+            lambda: self.embed_model._aget_text_embeddings(texts),
+            tokens=self._tokens(texts),
+            kind="embedding",
+        )
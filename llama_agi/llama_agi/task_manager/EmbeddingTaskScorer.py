@@ -0,0 +1,70 @@
+from typing import List, Optional
+
+from llama_index.embeddings.base import BaseEmbedding
+from llama_index.embeddings.openai import OpenAIEmbedding
+
+
+class EmbeddingTaskScorer:
+    """Embedding Task Scorer
+
+    Scores tasks without calling an LLM, so new tasks can be placed in the
+    task queue right away. The score is the embedding similarity between the
+    task and the objective, plus a bonus for older tasks so that no task
+    waits forever.
+
+    Higher scores are completed first.
+
+    Args:
+        embed_model (BaseEmbedding): The LlamaIndex embedding model to use.
+        Defaults to OpenAIEmbedding.
+        age_weight (float): How much each iteration a task has waited adds to
+        its score.
+
+    """
+
+    def __init__(
+        self,
+        embed_model: Optional[BaseEmbedding] = None,
+        age_weight: float = 0.01,
+    ) -> None:
+        self._embed_model = embed_model or OpenAIEmbedding()
+        self.age_weight = age_weight
+        self._objective: Optional[str] = None
+        self._objective_embedding: List[float] = []
+
+    def _get_objective_embedding(self, objective: str) -> List[float]:
+        if objective != self._objective:
+            self._objective_embedding = self._embed_model.get_query_embedding(objective)
+            self._objective = objective
+        return self._objective_embedding
+
+    def _get_score(
+        self,
+        objective_embedding: List[float],
+        task_embedding: List[float],
+        created_at: int,
+    ) -> float:
+        similarity = self._embed_model.similarity(objective_embedding, task_embedding)
+        # scores are fixed when a task is created, so rather than adding the
+        # age of each task, tasks created earlier get a smaller penalty
+        return float(similarity) - self.age_weight * created_at
+
+    def score(self, objective: str, task: str, created_at: int) -> float:
+        """Score a task created at the given iteration."""
+        objective_embedding = self._get_objective_embedding(objective)
+        task_embedding = self._embed_model.get_text_embedding(task)
+        return self._get_score(objective_embedding, task_embedding, created_at)
+
+    def score_batch(
+        self, objective: str, tasks: List[str], created_at: int
+    ) -> List[float]:
+        """Score tasks created at the given iteration, embedding them in batches."""
+        if not tasks:
+            return []
+        objective_embedding = self._get_objective_embedding(objective)
+        for i, task in enumerate(tasks):
+            self._embed_model.queue_text_for_embedding(str(i), task)
+        _, task_embeddings = self._embed_model.get_queued_text_embeddings()
+        return [
+            self._get_score(objective_embedding, x, created_at) for x in task_embeddings
+        ]
@@ -1,14 +1,27 @@
 import re
 import json
-from typing import List, Tuple, Optional
+import threading
+from typing import Any, Dict, List, Optional, Set, Tuple
 
 from llama_index import Document, ServiceContext
+from llama_index.indices.query.schema import QueryBundle
 from llama_index.prompts.prompts import QuestionAnswerPrompt, RefinePrompt
 
-from llama_agi.task_manager.base import BaseTaskManager, LlamaTaskPrompts
-from llama_agi.utils import initialize_task_list_index
+from llama_agi.task_manager.base import BaseTaskManager, LlamaTaskPrompts, TaskRecord
+from llama_agi.task_manager.EmbeddingTaskScorer import EmbeddingTaskScorer
+from llama_agi.task_manager.TaskDeduplicator import TaskDeduplicator
+from llama_agi.scheduler import Priority, prioritized
+from llama_agi.tracing import traced
+from llama_agi.utils import (
+    TaskListIndex,
+    aquery_documents,
+    asummarize_documents,
+    initialize_task_list_index,
+)
 from llama_agi.default_task_prompts import NO_COMPLETED_TASKS_SUMMARY
 
+SUMMARY_QUERY = "Summarize the current completed tasks"
+
 
 class LlamaTaskManager(BaseTaskManager):
     """Llama Task Manager
@@ -22,12 +35,42 @@ class LlamaTaskManager(BaseTaskManager):
 
     Tasks are then prioritized using the overall objective and current list of tasks.
 
+    Every LLM stage also has an async version (aprioritize_tasks,
+    agenerate_new_tasks and aget_completed_tasks_summary), which makes the same
+    queries with the async LLM calls of the service context.
+
+    Tasks may declare dependencies on other tasks (see TaskRecord and the
+    DEPENDENCY_TASK_CREATE_TMPL prompts). get_next_ready_task() only hands out
+    tasks whose known dependencies have been completed.
+
+    If a task_scorer is given, new tasks are inserted into the task queue by a
+    cheap local score, and the full LLM prioritization only runs every
+    rerank_every iterations, or sooner once more than rerank_drift of the
+    queue was placed by local scores alone.
+
+    The task queue is guarded by a lock, so tasks can be taken from one thread
+    while another merges completed tasks (see ParallelAGIRunner). The lock is
+    never held during LLM calls.
+
     Args:
         tasks (List[str]): The initial list of tasks to complete.
         prompts: (LlamaTaskPrompts): The prompts to control the task creation
         and prioritization.
         tasK_service_context (ServiceContext): The LlamaIndex service context to use
         for task creation and prioritization.
+        summary_block_size (int): The number of completed tasks folded into the
+        running summary before it is closed off as a summary block.
+        max_summary_blocks (int): The number of summary blocks kept before they
+        are re-summarized into a single block.
+        task_scorer (EmbeddingTaskScorer): Scores new tasks locally. If not
+        provided, new tasks are appended and only prioritized by the LLM.
+        rerank_every (int): The number of iterations between LLM prioritizations,
+        when using a task_scorer.
+        rerank_drift (float): The fraction of locally scored tasks in the queue
+        that triggers an early LLM prioritization, when using a task_scorer.
+        task_deduplicator (TaskDeduplicator): Detects new tasks that duplicate
+        current or completed tasks. Pass one with a threshold to also drop
+        near duplicates.
 
     """
 
@@ -36,18 +79,63 @@ class LlamaTaskManager(BaseTaskManager):
         tasks: List[str],
         prompts: LlamaTaskPrompts = LlamaTaskPrompts(),
         task_service_context: Optional[ServiceContext] = None,
+        summary_block_size: int = 10,
+        max_summary_blocks: int = 5,
+        task_scorer: Optional[EmbeddingTaskScorer] = None,
+        rerank_every: int = 5,
+        rerank_drift: float = 0.5,
+        task_deduplicator: Optional[TaskDeduplicator] = None,
     ) -> None:
+        if summary_block_size < 1:
+            raise ValueError("summary_block_size must be at least 1")
+        if max_summary_blocks < 1:
+            raise ValueError("max_summary_blocks must be at least 1")
         super().__init__(
             tasks=tasks, prompts=prompts, task_service_context=task_service_context
         )
+        self.summary_block_size = summary_block_size
+        self.max_summary_blocks = max_summary_blocks
+        self.task_dependencies: Dict[str, List[str]] = {}
+        # insertion ordered, so checkpoints only store newly completed names
+        self._completed_task_names: Dict[str, None] = {}
+        self._in_progress_tasks: Set[str] = set()
+        self._lock = threading.Lock()
 
-        self.current_tasks_index = initialize_task_list_index(
+        # every task ever added, so repeated tasks are never executed again
+        self.task_deduplicator = task_deduplicator or TaskDeduplicator()
+        for document in self.current_tasks:
+            self.task_deduplicator.add(document.get_text())
+
+        # local ranking state: the current task queue is kept sorted by
+        # ascending score, so the next task is always at the end
+        self.task_scorer = task_scorer
+        self.rerank_every = rerank_every
+        self.rerank_drift = rerank_drift
+        self._objective: Optional[str] = None
+        self._task_scores: Dict[str, float] = {}
+        self._iteration = 0
+        self._iterations_since_rerank = 0
+        self._num_locally_ranked = 0
+
+        # indexes share their document lists with the task manager, and are
+        # only (re)built when a query engine is needed
+        self.current_tasks_index = TaskListIndex(
             self.current_tasks, service_context=self.task_service_context
         )
-        self.completed_tasks_index = initialize_task_list_index(
+        self.completed_tasks_index = TaskListIndex(
             self.completed_tasks, service_context=self.task_service_context
         )
 
+        # rolling summary state: closed summary blocks, the summary of the
+        # currently open block, and how many completed tasks have been folded in
+        self._summary_blocks: List[str] = []
+        self._running_summary = ""
+        self._num_tasks_in_block = 0
+        self._num_summarized_tasks = 0
+
+        self._set_prompt_templates()
+
+    def _set_prompt_templates(self) -> None:
         self.task_create_qa_template = self.prompts.task_create_qa_template
         self.task_create_refine_template = self.prompts.task_create_refine_template
 
@@ -56,6 +144,68 @@ class LlamaTaskManager(BaseTaskManager):
             self.prompts.task_prioritize_refine_template
         )
 
+    def get_state(self) -> Dict[str, Any]:
+        """Get a JSON-serializable copy of the task manager state.
+
+        Besides the task lists, this includes the dependencies, the tasks seen
+        by the deduplicator, the local task scores and the rolling summary, so
+        nothing has to be recomputed when the state is loaded.
+        """
+        with self._lock:
+            state = super().get_state()
+            state.update(
+                {
+                    "in_progress_tasks": sorted(self._in_progress_tasks),
+                    "completed_task_names": list(self._completed_task_names),
+                    "task_dependencies": {
+                        task: list(dependencies)
+                        for task, dependencies in self.task_dependencies.items()
+                    },
+                    "seen_tasks": self.task_deduplicator.get_state(),
+                    "objective": self._objective,
+                    "task_scores": dict(self._task_scores),
+                    "iteration": self._iteration,
+                    "iterations_since_rerank": self._iterations_since_rerank,
+                    "num_locally_ranked": self._num_locally_ranked,
+                    "summary_blocks": list(self._summary_blocks),
+                    "running_summary": self._running_summary,
+                    "num_tasks_in_block": self._num_tasks_in_block,
+                    "num_summarized_tasks": self._num_summarized_tasks,
+                }
+            )
+        return state
+
+    def load_state(self, state: Dict[str, Any]) -> None:
+        """Restore the state returned by get_state(), without any LLM calls.
+
+        Tasks that were in progress are put back at the front of the task
+        queue, so they are executed again first.
+        """
+        super().load_state(state)
+        self._set_prompt_templates()
+        self.current_tasks.extend(Document(x) for x in state["in_progress_tasks"])
+        self.current_tasks_index.reset(self.current_tasks)
+        self.completed_tasks_index.reset(self.completed_tasks)
+
+        self._in_progress_tasks = set()
+        self._completed_task_names = dict.fromkeys(state["completed_task_names"])
+        self.task_dependencies = {
+            task: list(dependencies)
+            for task, dependencies in state["task_dependencies"].items()
+        }
+        self.task_deduplicator.load_state(state["seen_tasks"])
+
+        self._objective = state["objective"]
+        self._task_scores = dict(state["task_scores"])
+        self._iteration = state["iteration"]
+        self._iterations_since_rerank = state["iterations_since_rerank"]
+        self._num_locally_ranked = state["num_locally_ranked"]
+
+        self._summary_blocks = list(state["summary_blocks"])
+        self._running_summary = state["running_summary"]
+        self._num_tasks_in_block = state["num_tasks_in_block"]
+        self._num_summarized_tasks = state["num_summarized_tasks"]
+
     def _get_task_create_templates(
         self, prev_task: str, prev_result: str
     ) -> Tuple[QuestionAnswerPrompt, RefinePrompt]:
@@ -90,47 +240,252 @@ class LlamaTaskManager(BaseTaskManager):
 
     def parse_task_list(self, task_list_str: str) -> List[str]:
         """Parse new tasks generated by the agent."""
-        new_tasks: List[str] = []
+        return [x.task for x in self.parse_task_records(task_list_str)]
+
+    def parse_task_records(self, task_list_str: str) -> List[TaskRecord]:
+        """Parse new tasks generated by the agent, along with their dependencies.
+
+        Tasks can be given as a JSON array of strings, a JSON array of objects
+        with "task" and "dependencies" keys, or a numbered list.
+        """
+        task_records: List[TaskRecord] = []
         try:
-            new_tasks = json.loads(task_list_str)
-            new_tasks = [x.strip() for x in new_tasks if len(x.strip()) > 10]
+            for x in json.loads(task_list_str):
+                if isinstance(x, dict):
+                    task_records.append(
+                        TaskRecord(
+                            task=str(x.get("task", "")).strip(),
+                            dependencies=[
+                                str(dep).strip() for dep in x.get("dependencies", [])
+                            ],
+                        )
+                    )
+                else:
+                    task_records.append(TaskRecord(task=str(x).strip()))
         except Exception:
-            new_tasks = str(task_list_str).split("\n")
-            new_tasks = [
-                re.sub(r"^[0-9]+\.", "", x).strip()
-                for x in str(new_tasks)
-                if len(x.strip()) > 10 and x[0].isnumeric()
+            task_records = [
+                TaskRecord(task=re.sub(r"^[0-9]+\.", "", x).strip())
+                for x in str(task_list_str).split("\n")
+                if len(x.strip()) > 10 and x.strip()[0].isnumeric()
             ]
-        return new_tasks
+        return [x for x in task_records if len(x.task) > 10]
+
+    def _query_tasks(
+        self,
+        task_list_index: TaskListIndex,
+        query_str: str,
+        text_qa_template: QuestionAnswerPrompt,
+        refine_template: RefinePrompt,
+    ) -> str:
+        """Query a task list, only holding the lock while the tasks are read."""
+        query_bundle = QueryBundle(query_str)
+        with self._lock:
+            query_engine = task_list_index.as_query_engine(
+                text_qa_template=text_qa_template, refine_template=refine_template
+            )
+            nodes = query_engine.retrieve(query_bundle)
+        return str(query_engine.synthesize(query_bundle, nodes))
+
+    def _summarize(self, documents: List[Document]) -> str:
+        """Summarize a small, bounded list of documents."""
+        index = initialize_task_list_index(
+            documents, service_context=self.task_service_context
+        )
+        summary = index.as_query_engine(response_mode="tree_summarize").query(
+            SUMMARY_QUERY,
+        )
+        return str(summary)
+
+    async def _asummarize(self, documents: List[Document]) -> str:
+        return await asummarize_documents(
+            documents, SUMMARY_QUERY, service_context=self.task_service_context
+        )
+
+    def _start_fold(
+        self, documents: List[Document]
+    ) -> Tuple[List[Document], List[Document]]:
+        """Take the documents that fit in the open summary block.
+
+        Returns the documents to summarize (starting with the running summary
+        of the block) and the documents left for the next blocks.
+        """
+        num_to_fold = self.summary_block_size - self._num_tasks_in_block
+        to_fold, documents = documents[:num_to_fold], documents[num_to_fold:]
+        self._num_tasks_in_block += len(to_fold)
+        if self._running_summary:
+            to_fold = [Document(self._running_summary)] + to_fold
+        return to_fold, documents
+
+    def _end_fold(self, summary: str) -> bool:
+        """Store the new running summary, closing the block once it is full.
 
+        Returns whether there are too many closed blocks, so they should be
+        re-summarized into one.
+        """
+        self._running_summary = summary
+        if self._num_tasks_in_block >= self.summary_block_size:
+            self._summary_blocks.append(self._running_summary)
+            self._running_summary = ""
+            self._num_tasks_in_block = 0
+        return len(self._summary_blocks) > self.max_summary_blocks
+
+    def _fold_into_summary(self, documents: List[Document]) -> None:
+        """Fold newly completed tasks into the running summary.
+
+        Only the running summary of the open block and the new tasks are sent
+        to the LLM. Once a block is full it is closed, and once there are too
+        many closed blocks they are re-summarized into one.
+        """
+        while documents:
+            to_fold, documents = self._start_fold(documents)
+            if self._end_fold(self._summarize(to_fold)):
+                self._summary_blocks = [
+                    self._summarize([Document(x) for x in self._summary_blocks])
+                ]
+
+    async def _afold_into_summary(self, documents: List[Document]) -> None:
+        while documents:
+            to_fold, documents = self._start_fold(documents)
+            if self._end_fold(await self._asummarize(to_fold)):
+                self._summary_blocks = [
+                    await self._asummarize([Document(x) for x in self._summary_blocks])
+                ]
+
+    def _get_summary(self) -> str:
+        summaries = self._summary_blocks + [self._running_summary]
+        return "\n".join(x.strip() for x in summaries if x.strip())
+
+    @traced("get_completed_tasks_summary")
+    @prioritized(Priority.SUMMARIZATION)
     def get_completed_tasks_summary(self) -> str:
         """Generate a summary of completed tasks."""
         if len(self.completed_tasks) == 0:
             return NO_COMPLETED_TASKS_SUMMARY
-        summary = self.completed_tasks_index.as_query_engine(
-            response_mode="tree_summarize"
-        ).query(
-            "Summarize the current completed tasks",
-        )
-        return str(summary)
 
+        new_completed_tasks = self.completed_tasks[self._num_summarized_tasks :]
+        if new_completed_tasks:
+            self._fold_into_summary(new_completed_tasks)
+            self._num_summarized_tasks = len(self.completed_tasks)
+
+        return self._get_summary()
+
+    @traced("get_completed_tasks_summary")
+    @prioritized(Priority.SUMMARIZATION)
+    async def aget_completed_tasks_summary(self) -> str:
+        """Generate a summary of completed tasks, with async LLM calls."""
+        if len(self.completed_tasks) == 0:
+            return NO_COMPLETED_TASKS_SUMMARY
+
+        new_completed_tasks = self.completed_tasks[self._num_summarized_tasks :]
+        if new_completed_tasks:
+            await self._afold_into_summary(new_completed_tasks)
+            self._num_summarized_tasks = len(self.completed_tasks)
+
+        return self._get_summary()
+
+    @traced("prioritize_tasks")
+    @prioritized(Priority.PRIORITIZATION)
     def prioritize_tasks(self, objective: str) -> None:
         """Prioritize the current list of incomplete tasks."""
         (text_qa_template, refine_template) = self._get_task_prioritize_templates()
-        prioritized_tasks = self.current_tasks_index.as_query_engine(
-            text_qa_template=text_qa_template, refine_template=refine_template
-        ).query(objective)
+        prioritized_tasks = self._query_tasks(
+            self.current_tasks_index, objective, text_qa_template, refine_template
+        )
+        self._set_prioritized_tasks(objective, prioritized_tasks)
+
+    @traced("prioritize_tasks")
+    @prioritized(Priority.PRIORITIZATION)
+    async def aprioritize_tasks(self, objective: str) -> None:
+        """Prioritize the current list of incomplete tasks, with async LLM calls."""
+        (text_qa_template, refine_template) = self._get_task_prioritize_templates()
+        prioritized_tasks = await aquery_documents(
+            self.current_tasks,
+            objective,
+            text_qa_template,
+            refine_template,
+            service_context=self.task_service_context,
+        )
+        self._set_prioritized_tasks(objective, prioritized_tasks)
 
+    def _set_prioritized_tasks(self, objective: str, prioritized_tasks: str) -> None:
+        """Replace the current tasks with the list of tasks returned by the LLM."""
         new_tasks = []
-        for task in str(prioritized_tasks).split("\n"):
+        for task in prioritized_tasks.split("\n"):
             task = re.sub(r"^[0-9]+\.", "", task).strip()
             if len(task) > 10:
                 new_tasks.append(task)
-        self.current_tasks = [Document(x) for x in new_tasks]
-        self.current_tasks_index = initialize_task_list_index(
-            self.current_tasks, service_context=self.task_service_context
+        # the LLM lists the highest priority task first, while tasks are
+        # popped from the end of the list
+        new_tasks.reverse()
+        with self._lock:
+            # tasks taken (or completed) while the LLM was prioritizing
+            new_tasks = [
+                x
+                for x in new_tasks
+                if x not in self._in_progress_tasks
+                and x not in self._completed_task_names
+            ]
+            for task in new_tasks:
+                self.task_deduplicator.add(task)
+            self.current_tasks = [Document(x) for x in new_tasks]
+            self.current_tasks_index.reset(self.current_tasks)
+
+        if self.task_scorer is not None:
+            self._objective = objective
+            self._rescore_tasks(objective, new_tasks)
+
+    def _rescore_tasks(self, objective: str, tasks: List[str]) -> None:
+        """Keep the LLM order of tasks, while keeping scores comparable.
+
+        The existing scores are handed out again in the order chosen by the
+        LLM, so tasks scored locally later are placed relative to that order.
+        Only tasks without a score yet are embedded, in batches.
+        """
+        self._score_tasks(objective, tasks)
+        scores = sorted(self._task_scores.get(x, 0.0) for x in tasks)
+        self._task_scores = dict(zip(tasks, scores))
+        self._iterations_since_rerank = 0
+        self._num_locally_ranked = 0
+
+    def _score_tasks(self, objective: str, tasks: List[str]) -> None:
+        """Score the tasks that don't have a score yet, in one batch."""
+        if self.task_scorer is None:
+            return
+        new_tasks = list(dict.fromkeys(x for x in tasks if x not in self._task_scores))
+        scores = self.task_scorer.score_batch(objective, new_tasks, self._iteration)
+        self._task_scores.update(zip(new_tasks, scores))
+
+    def _get_task_score(self, objective: str, task: str) -> float:
+        if task not in self._task_scores and self.task_scorer is not None:
+            self._task_scores[task] = self.task_scorer.score(
+                objective, task, self._iteration
+            )
+        return self._task_scores.get(task, 0.0)
+
+    def _insert_scored_task(self, objective: str, task: str) -> None:
+        """Binary search the (ascending) task queue for the task's position."""
+        score = self._get_task_score(objective, task)
+        with self._lock:
+            low, high = 0, len(self.current_tasks)
+            while low < high:
+                mid = (low + high) // 2
+                mid_task = self.current_tasks[mid].get_text()
+                if self._task_scores.get(mid_task, 0.0) <= score:
+                    low = mid + 1
+                else:
+                    high = mid
+            self.current_tasks_index.insert(low, Document(task))
+        self._num_locally_ranked += 1
+
+    def _should_rerank(self) -> bool:
+        if self._iterations_since_rerank >= self.rerank_every:
+            return True
+        return self._num_locally_ranked > self.rerank_drift * max(
+            len(self.current_tasks), 1
         )
 
+    @traced("generate_new_tasks")
+    @prioritized(Priority.TASK_CREATION)
     def generate_new_tasks(
         self, objective: str, prev_task: str, prev_result: str
     ) -> None:
@@ -138,33 +493,108 @@ class LlamaTaskManager(BaseTaskManager):
         (text_qa_template, refine_template) = self._get_task_create_templates(
             prev_task, prev_result
         )
-        task_list_response = self.completed_tasks_index.as_query_engine(
-            text_qa_template=text_qa_template, refine_template=refine_template
-        ).query(objective)
-        new_tasks = self.parse_task_list(str(task_list_response))
-        self.add_new_tasks(new_tasks)
+        task_list_response = self._query_tasks(
+            self.completed_tasks_index, objective, text_qa_template, refine_template
+        )
+        if self._add_generated_tasks(objective, task_list_response):
+            self.prioritize_tasks(objective)
+
+    @traced("generate_new_tasks")
+    @prioritized(Priority.TASK_CREATION)
+    async def agenerate_new_tasks(
+        self, objective: str, prev_task: str, prev_result: str
+    ) -> None:
+        """Generate new tasks from the last task and result, with async LLM calls."""
+        (text_qa_template, refine_template) = self._get_task_create_templates(
+            prev_task, prev_result
+        )
+        task_list_response = await aquery_documents(
+            self.completed_tasks,
+            objective,
+            text_qa_template,
+            refine_template,
+            service_context=self.task_service_context,
+        )
+        if self._add_generated_tasks(objective, task_list_response):
+            await self.aprioritize_tasks(objective)
+
+    def _add_generated_tasks(self, objective: str, task_list_response: str) -> bool:
+        """Add the tasks generated by the LLM.
+
+        Returns whether the tasks should be prioritized by the LLM again.
+        """
+        task_records = self.parse_task_records(task_list_response)
+        self._objective = objective
+        self.add_task_records(task_records)
+
+        if self.task_scorer is None:
+            return False
+        self._iteration += 1
+        self._iterations_since_rerank += 1
+        return self._should_rerank()
 
     def get_next_task(self) -> str:
         """Get the next task to complete."""
-        next_task = self.current_tasks.pop().get_text()
-        self.current_tasks_index = initialize_task_list_index(
-            self.current_tasks, service_context=self.task_service_context
-        )
-        return next_task
+        with self._lock:
+            return self.current_tasks_index.pop().get_text()
+
+    def _is_task_ready(self, task: str, pending_tasks: Set[str]) -> bool:
+        """A task is ready once none of its dependencies are pending or running.
+
+        Dependencies that don't match any known task are ignored, so a
+        hallucinated dependency can never block a task forever.
+        """
+        for dependency in self.task_dependencies.get(task, []):
+            if dependency in self._completed_task_names:
+                continue
+            if dependency in pending_tasks or dependency in self._in_progress_tasks:
+                return False
+        return True
+
+    def get_next_ready_task(self) -> Optional[str]:
+        """Get the next task whose dependencies are all completed, if any."""
+        with self._lock:
+            pending_tasks = {x.get_text() for x in self.current_tasks}
+            # tasks are popped from the end of the list, so search from the end
+            for position in range(len(self.current_tasks) - 1, -1, -1):
+                task = self.current_tasks[position].get_text()
+                if self._is_task_ready(task, pending_tasks):
+                    self.current_tasks_index.pop(position)
+                    self._in_progress_tasks.add(task)
+                    return task
+        return None
 
     def add_new_tasks(self, tasks: List[str]) -> None:
         """Add new tasks to the task manager."""
+        if self.task_scorer is not None and self._objective is not None:
+            self._score_tasks(
+                self._objective,
+                [x for x in tasks if not self.task_deduplicator.is_duplicate(x)],
+            )
         for task in tasks:
-            if task not in self.current_tasks and task not in self.completed_tasks:
-                self.current_tasks.append(Document(task))
-        self.current_tasks_index = initialize_task_list_index(
-            self.current_tasks, service_context=self.task_service_context
-        )
+            if self.task_deduplicator.is_duplicate(task):
+                continue
+            self.task_deduplicator.add(task)
+            if self.task_scorer is not None and self._objective is not None:
+                self._insert_scored_task(self._objective, task)
+            else:
+                with self._lock:
+                    self.current_tasks_index.append(Document(task))
+
+    def add_task_records(self, task_records: List[TaskRecord]) -> None:
+        """Add new tasks, along with their dependencies, to the task manager."""
+        with self._lock:
+            for task_record in task_records:
+                if task_record.dependencies:
+                    self.task_dependencies[task_record.task] = task_record.dependencies
+        self.add_new_tasks([x.task for x in task_records])
 
     def add_completed_task(self, task: str, result: str) -> None:
         """Add a task as completed."""
+        self.task_deduplicator.add(task)
         document = Document(f"Task: {task}\nResult: {result}\n")
-        self.completed_tasks.append(document)
-        self.completed_tasks_index = initialize_task_list_index(
-            self.completed_tasks, service_context=self.task_service_context
-        )
+        with self._lock:
+            self._completed_task_names[task] = None
+            self._in_progress_tasks.discard(task)
+            self._task_scores.pop(task, None)
+            self.completed_tasks_index.append(document)
@@ -0,0 +1,169 @@
+import base64
+import hashlib
+import random
+import re
+import struct
+from collections import defaultdict
+from typing import DefaultDict, List, Optional, Set, Tuple
+
+# a Mersenne prime larger than any 32-bit shingle hash
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+def normalize_task(task: str) -> str:
+    """Lowercase a task, drop punctuation and collapse whitespace."""
+    task = re.sub(r"[^\w\s]", " ", task.lower())
+    return " ".join(task.split())
+
+
+class TaskDeduplicator:
+    """Task Deduplicator
+
+    Detects tasks that were already seen, without comparing against every
+    previous task.
+
+    Exact duplicates (after normalizing case, punctuation and whitespace) are
+    found with a set of hashes. If a threshold is given, near duplicates are
+    also found with MinHash signatures over character shingles, bucketed with
+    locality sensitive hashing (LSH): only tasks that share a bucket are
+    compared.
+
+    Near duplicate detection is off by default, since tasks that differ by a
+    few characters are often distinct ("Summarize chapter 1" and "Summarize
+    chapter 11").
+
+    Args:
+        threshold (Optional[float]): The estimated Jaccard similarity above
+        which two tasks are considered near duplicates. If None, only exact
+        duplicates are detected.
+        num_perm (int): The number of hash permutations in each signature.
+        num_bands (int): The number of LSH bands. Must divide num_perm.
+        shingle_size (int): The number of characters in each shingle.
+        seed (int): The seed used to generate the hash permutations.
+
+    """
+
+    def __init__(
+        self,
+        threshold: Optional[float] = None,
+        num_perm: int = 64,
+        num_bands: int = 16,
+        shingle_size: int = 4,
+        seed: int = 1,
+    ) -> None:
+        if num_perm % num_bands != 0:
+            raise ValueError("num_perm must be divisible by num_bands")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.num_bands = num_bands
+        self.shingle_size = shingle_size
+
+        rng = random.Random(seed)
+        self._permutations = [
+            (rng.randint(1, _MERSENNE_PRIME - 1), rng.randint(0, _MERSENNE_PRIME - 1))
+            for _ in range(num_perm)
+        ]
+        # "<text hash>[:<signature>]" of every task, in the order they were added
+        self._entries: List[str] = []
+        self._hashes: Set[str] = set()
+        self._signatures: List[Tuple[int, ...]] = []
+        self._buckets: DefaultDict[
+            Tuple[int, Tuple[int, ...]], List[int]
+        ] = defaultdict(list)
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def __contains__(self, task: str) -> bool:
+        return self.is_duplicate(task)
+
+    def _get_shingles(self, text: str) -> Set[int]:
+        if len(text) <= self.shingle_size:
+            shingles = {text}
+        else:
+            shingles = {
+                text[i : i + self.shingle_size]
+                for i in range(len(text) - self.shingle_size + 1)
+            }
+        return {
+            int.from_bytes(hashlib.md5(x.encode()).digest()[:4], "little")
+            for x in shingles
+        }
+
+    def _get_signature(self, text: str) -> Tuple[int, ...]:
+        shingles = self._get_shingles(text)
+        return tuple(
+            min(((a * x + b) % _MERSENNE_PRIME) & _MAX_HASH for x in shingles)
+            for a, b in self._permutations
+        )
+
+    def _get_bands(self, signature: Tuple[int, ...]) -> List[Tuple[int, ...]]:
+        rows = self.num_perm // self.num_bands
+        return [signature[i : i + rows] for i in range(0, self.num_perm, rows)]
+
+    def _similarity(self, sig1: Tuple[int, ...], sig2: Tuple[int, ...]) -> float:
+        """Estimate the Jaccard similarity of two signatures."""
+        return sum(x == y for x, y in zip(sig1, sig2)) / self.num_perm
+
+    def is_duplicate(self, task: str) -> bool:
+        """Check if a task, or a near duplicate of it, was already added."""
+        text = normalize_task(task)
+        if hashlib.sha1(text.encode()).hexdigest() in self._hashes:
+            return True
+        if self.threshold is None:
+            return False
+
+        signature = self._get_signature(text)
+        candidates: Set[int] = set()
+        for band_idx, band in enumerate(self._get_bands(signature)):
+            candidates.update(self._buckets.get((band_idx, band), []))
+        return any(
+            self._similarity(signature, self._signatures[x]) >= self.threshold
+            for x in candidates
+        )
+
+    def add(self, task: str) -> None:
+        """Add a task to the index."""
+        text = normalize_task(task)
+        text_hash = hashlib.sha1(text.encode()).hexdigest()
+        if text_hash in self._hashes:
+            return
+        if self.threshold is None:
+            self._hashes.add(text_hash)
+            self._entries.append(text_hash)
+        else:
+            self._add_signature(text_hash, self._get_signature(text))
+
+    def _add_signature(self, text_hash: str, signature: Tuple[int, ...]) -> None:
+        self._hashes.add(text_hash)
+        self._signatures.append(signature)
+        for band_idx, band in enumerate(self._get_bands(signature)):
+            self._buckets[(band_idx, band)].append(len(self._signatures) - 1)
+        packed = struct.pack(f"<{self.num_perm}I", *signature)
+        self._entries.append(f"{text_hash}:{base64.b64encode(packed).decode()}")
+
+    def get_state(self) -> List[str]:
+        """Get the hash and signature of each task added, in the order added.
+
+        Signatures are stored rather than the tasks themselves, since computing
+        them is what makes adding a task slow. Tasks added without a threshold
+        only have a hash.
+        """
+        return list(self._entries)
+
+    def load_state(self, entries: List[str]) -> None:
+        """Replace the index with the tasks returned by get_state()."""
+        self._entries = []
+        self._hashes = set()
+        self._signatures = []
+        self._buckets = defaultdict(list)
+        for entry in entries:
+            text_hash, _, packed = entry.partition(":")
+            if self.threshold is None or not packed:
+                # tasks without a signature can only be matched exactly
+                self._hashes.add(text_hash)
+                self._entries.append(text_hash)
+                continue
+            signature = struct.unpack(f"<{self.num_perm}I", base64.b64decode(packed))
+            self._add_signature(text_hash, signature)
@@ -1,5 +1,11 @@
+from .base import TaskRecord
+from .EmbeddingTaskScorer import EmbeddingTaskScorer
 from .LlamaTaskManager import LlamaTaskManager
+from .TaskDeduplicator import TaskDeduplicator
 
 __all__ = [
+    EmbeddingTaskScorer,
     LlamaTaskManager,
+    TaskDeduplicator,
+    TaskRecord,
 ]
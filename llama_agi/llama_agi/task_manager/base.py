@@ -1,9 +1,10 @@
 from abc import abstractmethod
-from dataclasses import dataclass
-from typing import List, Optional
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional
 
 from llama_index import Document, ServiceContext
 
+from llama_agi.tracing import Tracer
 from llama_agi.default_task_prompts import (
     DEFAULT_TASK_PRIORITIZE_TMPL,
     DEFAULT_REFINE_TASK_PRIORITIZE_TMPL,
@@ -20,6 +21,12 @@ class LlamaTaskPrompts:
     task_prioritize_refine_template: str = DEFAULT_REFINE_TASK_PRIORITIZE_TMPL
 
 
+@dataclass
+class TaskRecord:
+    task: str
+    dependencies: List[str] = field(default_factory=list)
+
+
 class BaseTaskManager:
     """Base Task Manager
 
@@ -42,11 +49,31 @@ class BaseTaskManager:
         self.completed_tasks: List[Document] = []
         self.prompts = prompts
         self.task_service_context = task_service_context
+        # set by the runner, to trace the task manager stages
+        self.tracer: Optional[Tracer] = None
+
+    def get_state(self) -> Dict[str, Any]:
+        """Get a JSON-serializable copy of the task manager state."""
+        return {
+            "current_tasks": [x.get_text() for x in self.current_tasks],
+            "completed_tasks": [x.get_text() for x in self.completed_tasks],
+            "prompts": asdict(self.prompts),
+        }
+
+    def load_state(self, state: Dict[str, Any]) -> None:
+        """Restore the state returned by get_state(), without any LLM calls."""
+        self.current_tasks = [Document(x) for x in state["current_tasks"]]
+        self.completed_tasks = [Document(x) for x in state["completed_tasks"]]
+        self.prompts = LlamaTaskPrompts(**state["prompts"])
 
     @abstractmethod
     def parse_task_list(self, task_list_str: str) -> List[str]:
         """Parse new tasks generated by the agent."""
 
+    @abstractmethod
+    def parse_task_records(self, task_list_str: str) -> List[TaskRecord]:
+        """Parse new tasks generated by the agent, along with their dependencies."""
+
     @abstractmethod
     def get_completed_tasks_summary(self) -> str:
         """Generate a summary of completed tasks."""
@@ -61,14 +88,36 @@ class BaseTaskManager:
     ) -> None:
         """Generate new tasks given the previous task and result."""
 
+    @abstractmethod
+    async def aget_completed_tasks_summary(self) -> str:
+        """Generate a summary of completed tasks, with async LLM calls."""
+
+    @abstractmethod
+    async def aprioritize_tasks(self, objective: str) -> None:
+        """Prioritize the current list of incomplete tasks, with async LLM calls."""
+
+    @abstractmethod
+    async def agenerate_new_tasks(
+        self, objective: str, prev_task: str, prev_result: str
+    ) -> None:
+        """Generate new tasks from the last task and result, with async LLM calls."""
+
     @abstractmethod
     def get_next_task(self) -> str:
         """Get the next task to complete."""
 
+    @abstractmethod
+    def get_next_ready_task(self) -> Optional[str]:
+        """Get the next task whose dependencies are all completed, if any."""
+
     @abstractmethod
     def add_new_tasks(self, tasks: List[str]) -> None:
         """Add new tasks to the task manager."""
 
+    @abstractmethod
+    def add_task_records(self, task_records: List[TaskRecord]) -> None:
+        """Add new tasks, along with their dependencies, to the task manager."""
+
     @abstractmethod
     def add_completed_task(self, task: str, result: str) -> None:
         """Add a task as completed."""
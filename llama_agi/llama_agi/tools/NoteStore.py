@@ -0,0 +1,177 @@
+import json
+import os
+import struct
+import threading
+from typing import List, Optional, Tuple
+
+import numpy as np
+from llama_index.embeddings.base import BaseEmbedding
+from llama_index.embeddings.openai import OpenAIEmbedding
+
+NOTES_FILE = "notes.jsonl"
+EMBEDDINGS_FILE = "embeddings.f32"
+
+# the embedding size, written once at the start of the embeddings file
+_HEADER = struct.Struct("<I")
+
+
+def _check_embedding_size(size: int, expected: int) -> None:
+    """Check an embedding has the size of the stored ones, if there are any."""
+    if expected and size != expected:
+        raise ValueError(
+            f"The embedding model returned embeddings of size {size}, but the "
+            f"notes were embedded with size {expected}. Use the same embedding "
+            "model, or a new persist_dir."
+        )
+
+
+class NoteStore:
+    """Note Store
+
+    Stores notes with their embeddings as normalized float32 rows of one
+    contiguous matrix, so searching is a single matrix-vector product.
+
+    New notes are embedded in batches: they are queued by add, and embedded
+    together once batch_size notes are queued or before the next search.
+
+    If persist_dir is set, notes are appended to notes.jsonl as soon as they
+    are added, and their embeddings are appended to embeddings.f32 as raw
+    float32 rows (after a header with the embedding size) when they are
+    embedded. Notes whose embeddings were not saved are embedded again when
+    the store is reloaded.
+
+    Args:
+        persist_dir (Optional[str]): The directory notes are saved to.
+        embed_model (Optional[BaseEmbedding]): The LlamaIndex embedding model
+        to use. Defaults to OpenAIEmbedding.
+        top_k (int): The number of notes returned by search.
+        batch_size (int): The number of queued notes that triggers embedding.
+
+    """
+
+    def __init__(
+        self,
+        persist_dir: Optional[str] = None,
+        embed_model: Optional[BaseEmbedding] = None,
+        top_k: int = 3,
+        batch_size: int = 32,
+    ) -> None:
+        self.persist_dir = persist_dir
+        self._embed_model = embed_model or OpenAIEmbedding()
+        self.top_k = top_k
+        self.batch_size = batch_size
+        self.notes: List[str] = []
+        self._embeddings = np.zeros((0, 0), dtype=np.float32)
+        self._num_embedded = 0
+        self._lock = threading.Lock()
+        if persist_dir is not None:
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self.notes)
+
+    def _get_path(self, filename: str) -> str:
+        assert self.persist_dir is not None
+        return os.path.join(self.persist_dir, filename)
+
+    def _load(self) -> None:
+        notes_path = self._get_path(NOTES_FILE)
+        if not os.path.exists(notes_path):
+            return
+        with open(notes_path, "r") as f:
+            self.notes = [json.loads(line) for line in f if line.strip()]
+
+        embeddings_path = self._get_path(EMBEDDINGS_FILE)
+        if not self.notes or not os.path.exists(embeddings_path):
+            return
+        with open(embeddings_path, "rb") as f:
+            header = f.read(_HEADER.size)
+            data = f.read()
+        dim = _HEADER.unpack(header)[0] if len(header) == _HEADER.size else 0
+        if dim == 0:
+            os.truncate(embeddings_path, 0)
+            return
+        # later embeddings must have the size of the saved ones
+        self._embeddings = np.zeros((0, dim), dtype=np.float32)
+        # drop a partially written last row, and rows without a note, so
+        # later appends line up again
+        num_rows = min(len(data) // (4 * dim), len(self.notes))
+        if len(data) != num_rows * dim * 4:
+            os.truncate(embeddings_path, _HEADER.size + num_rows * dim * 4)
+        if num_rows == 0:
+            return
+        embeddings = np.frombuffer(data, dtype=np.float32, count=num_rows * dim)
+        self._embeddings = embeddings.reshape(num_rows, dim).copy()
+        self._num_embedded = num_rows
+
+    def _append_rows(self, rows: np.ndarray) -> None:
+        """Append rows to the matrix, growing its capacity geometrically."""
+        num_rows = self._num_embedded + len(rows)
+        if self._embeddings.shape[1] == 0:
+            self._embeddings = np.zeros((0, rows.shape[1]), dtype=np.float32)
+        if num_rows > len(self._embeddings):
+            capacity = max(num_rows, 2 * len(self._embeddings), 64)
+            embeddings = np.zeros((capacity, rows.shape[1]), dtype=np.float32)
+            embeddings[: self._num_embedded] = self._embeddings[: self._num_embedded]
+            self._embeddings = embeddings
+        self._embeddings[self._num_embedded : num_rows] = rows
+        self._num_embedded = num_rows
+
+    def _flush(self) -> None:
+        if self._num_embedded >= len(self.notes):
+            return
+        pending = self.notes[self._num_embedded :]
+        for i, note in enumerate(pending):
+            self._embed_model.queue_text_for_embedding(str(i), note)
+        _, embeddings = self._embed_model.get_queued_text_embeddings()
+
+        rows = np.asarray(embeddings, dtype=np.float32)
+        _check_embedding_size(rows.shape[1], self._embeddings.shape[1])
+        rows /= np.maximum(np.linalg.norm(rows, axis=1, keepdims=True), 1e-12)
+        if self.persist_dir is not None:
+            with open(self._get_path(EMBEDDINGS_FILE), "ab") as f:
+                if f.tell() == 0:
+                    f.write(_HEADER.pack(rows.shape[1]))
+                f.write(rows.tobytes())
+        self._append_rows(rows)
+
+    def flush(self) -> None:
+        """Embed all queued notes."""
+        with self._lock:
+            self._flush()
+
+    def add(self, note: str) -> None:
+        """Add a note, embedding it with the next batch."""
+        with self._lock:
+            if self.persist_dir is not None:
+                os.makedirs(self.persist_dir, exist_ok=True)
+                with open(self._get_path(NOTES_FILE), "a") as f:
+                    f.write(json.dumps(note) + "\n")
+            self.notes.append(note)
+            if len(self.notes) - self._num_embedded >= self.batch_size:
+                self._flush()
+
+    def search_with_scores(self, query: str) -> List[Tuple[str, float]]:
+        """Get the top_k notes most similar to the query, with their similarity."""
+        with self._lock:
+            self._flush()
+            num_rows = self._num_embedded
+            if num_rows == 0:
+                return []
+            embeddings = self._embeddings[:num_rows]
+
+        query_embedding = np.asarray(
+            self._embed_model.get_query_embedding(query), dtype=np.float32
+        )
+        _check_embedding_size(len(query_embedding), embeddings.shape[1])
+        query_embedding /= max(float(np.linalg.norm(query_embedding)), 1e-12)
+        scores = embeddings @ query_embedding
+
+        k = min(self.top_k, num_rows)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.notes[i], float(scores[i])) for i in top]
+
+    def search(self, query: str) -> List[str]:
+        """Get the top_k notes most similar to the query, most similar first."""
+        return [note for note, _ in self.search_with_scores(query)]
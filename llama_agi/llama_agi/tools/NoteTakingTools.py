@@ -1,23 +1,33 @@
+import os
+from typing import Optional
+
 from langchain.agents import tool
-from llama_index import Document
-from llama_agi.utils import initialize_search_index
+from llama_index import Document, GPTListIndex, ServiceContext
+
+from llama_agi.tools.NoteStore import NoteStore
 
-note_index = initialize_search_index([])
+# notes are kept in memory, unless LLAMA_AGI_NOTES_DIR names a directory to
+# keep them in across runs
+note_store = NoteStore(persist_dir=os.environ.get("LLAMA_AGI_NOTES_DIR"))
+# the service context answering searches, LlamaIndex's defaults if not set
+notes_service_context: Optional[ServiceContext] = None
 
 
 @tool("Record Note")
 def record_note(note: str) -> str:
     """Useful for when you need to record a note or reminder for yourself to reference in the future."""
-    global note_index
-    note_index.insert(Document(note))
+    note_store.add(note)
     return "Note successfully recorded."
 
 
 @tool("Search Notes")
 def search_notes(query_str: str) -> str:
     """Useful for searching through notes that you previously recorded."""
-    global note_index
-    response = note_index.as_query_engine(
-        similarity_top_k=3,
-    ).query(query_str)
-    return str(response)
+    notes = note_store.search(query_str)
+    if not notes:
+        return "No notes have been recorded yet."
+    # answer the query from the most similar notes
+    index = GPTListIndex.from_documents(
+        [Document(x) for x in notes], service_context=notes_service_context
+    )
+    return str(index.as_query_engine().query(query_str))
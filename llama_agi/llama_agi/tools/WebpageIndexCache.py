@@ -0,0 +1,115 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, List, Optional, Tuple
+
+from llama_index import (
+    Document,
+    ServiceContext,
+    StorageContext,
+    load_index_from_storage,
+)
+from llama_index.indices.base import BaseGPTIndex
+
+from llama_agi.tracing import record_cache_lookup
+from llama_agi.utils import initialize_search_index
+
+
+class WebpageIndexCache:
+    """Webpage Index Cache
+
+    Keeps the chunked and embedded vector index of recently searched
+    webpages, so a follow-up query on a known page only costs the query
+    embedding and the answer call.
+
+    Entries are keyed by URL and validated by the hash of the page content,
+    so a page that changed is indexed again. Only the max_indexes most
+    recently used pages are kept in memory. If persist_dir is set, indexes
+    are also saved there and reloaded by later runs.
+
+    Args:
+        max_indexes (int): The number of webpage indexes kept in memory.
+        persist_dir (Optional[str]): A directory to persist indexes to.
+        service_context (Optional[ServiceContext]): The service context used to
+        build indexes. Defaults to one with 512 token chunks, created on first use.
+
+    """
+
+    def __init__(
+        self,
+        max_indexes: int = 16,
+        persist_dir: Optional[str] = None,
+        service_context: Optional[ServiceContext] = None,
+    ) -> None:
+        self.max_indexes = max_indexes
+        self.persist_dir = persist_dir
+        self._service_context = service_context
+        self._indexes: "OrderedDict[str, Tuple[str, BaseGPTIndex[Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._indexes)
+
+    @property
+    def service_context(self) -> ServiceContext:
+        if self._service_context is None:
+            self._service_context = ServiceContext.from_defaults(chunk_size_limit=512)
+        return self._service_context
+
+    def _get_persist_path(self, url: str, content_hash: str) -> Optional[str]:
+        if self.persist_dir is None:
+            return None
+        key = hashlib.sha256(f"{url}\n{content_hash}".encode()).hexdigest()
+        return os.path.join(self.persist_dir, key)
+
+    def _build_index(
+        self,
+        url: str,
+        content_hash: str,
+        load_documents: Callable[[], List[Document]],
+    ) -> BaseGPTIndex[Any]:
+        persist_path = self._get_persist_path(url, content_hash)
+        if persist_path is not None and os.path.exists(persist_path):
+            storage_context = StorageContext.from_defaults(persist_dir=persist_path)
+            return load_index_from_storage(
+                storage_context, service_context=self.service_context
+            )
+
+        index = initialize_search_index(
+            load_documents(), service_context=self.service_context
+        )
+        if persist_path is not None:
+            index.storage_context.persist(persist_dir=persist_path)
+        return index
+
+    def get_index(
+        self,
+        url: str,
+        content_hash: str,
+        load_documents: Callable[[], List[Document]],
+    ) -> BaseGPTIndex[Any]:
+        """Get the index of a webpage, loading its documents only if needed."""
+        with self._lock:
+            cached = self._indexes.get(url)
+            if cached is not None and cached[0] == content_hash:
+                self._indexes.move_to_end(url)
+                self.hits += 1
+                record_cache_lookup(True)
+                return cached[1]
+
+        record_cache_lookup(False)
+        index = self._build_index(url, content_hash, load_documents)
+        with self._lock:
+            self.misses += 1
+            self._indexes[url] = (content_hash, index)
+            self._indexes.move_to_end(url)
+            while len(self._indexes) > self.max_indexes:
+                self._indexes.popitem(last=False)
+        return index
+
+    def clear(self) -> None:
+        with self._lock:
+            self._indexes.clear()
@@ -1,15 +1,27 @@
+import os
+from typing import List
+
+from bs4 import BeautifulSoup
 from langchain.agents import tool
-from llama_index import download_loader, ServiceContext
+from llama_index import Document
+
+from llama_agi.http_cache import HTTPCacheMissError, get_http_cache
+from llama_agi.tools.WebpageIndexCache import WebpageIndexCache
+
+webpage_index_cache = WebpageIndexCache(
+    persist_dir=os.environ.get("LLAMA_AGI_WEBPAGE_INDEX_DIR")
+)
 
-from llama_agi.utils import initialize_search_index
 
-BeautifulSoupWebReader = download_loader("BeautifulSoupWebReader")
+def parse_webpage(url: str, content: bytes) -> List[Document]:
+    """Extract the text of a webpage, like BeautifulSoupWebReader."""
+    soup = BeautifulSoup(content, "html.parser")
+    return [Document(soup.getText(), extra_info={"URL": url})]
 
 
 @tool("Search Webpage")
 def search_webpage(prompt: str) -> str:
     """Useful for searching a specific webpage. The input to the tool should be URL and query, separated by a newline."""
-    loader = BeautifulSoupWebReader()
     if len(prompt.split("\n")) < 2:
         return "The input to search_webpage should be a URL and a query, separated by a newline."
 
@@ -17,12 +29,15 @@ def search_webpage(prompt: str) -> str:
     query_str = " ".join(prompt.split("\n")[1:])
 
     try:
-        documents = loader.load_data(urls=[url])
-        service_context = ServiceContext.from_defaults(chunk_size_limit=512)
-        index = initialize_search_index(documents, service_context=service_context)
+        response = get_http_cache().fetch(url)
+        index = webpage_index_cache.get_index(
+            url,
+            response.content_hash,
+            lambda: parse_webpage(url, response.content),
+        )
         query_result = index.as_query_engine(similarity_top_k=3).query(query_str)
         return str(query_result)
-    except ValueError as e:
+    except (ValueError, HTTPCacheMissError) as e:
         return str(e)
     except Exception:
         return "Encountered an error while searching the webpage."
@@ -0,0 +1,442 @@
+"""Spans recording where the time and tokens of an AGI run go.
+
+A Tracer records a span for every stage of the loop (execute_task,
+generate_new_tasks, prioritize_tasks, get_completed_tasks_summary) and every
+tool call. Each span records its wall time, the LLM calls made while it was
+the innermost open span (with their prompt and completion tokens), and the
+completion cache lookups it made.
+
+Pass a tracer to a runner to trace a run, then export the spans with
+Tracer.export_jsonl or print Tracer.format_summary.
+
+Open spans are tracked per thread and per asyncio task, so concurrent
+coroutines traced on one event loop each get their own spans.
+"""
+import asyncio
+import functools
+import itertools
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+    cast,
+)
+from uuid import UUID
+
+from langchain.callbacks.base import AsyncCallbackHandler, BaseCallbackHandler
+from langchain.schema import LLMResult
+from llama_index.utils import globals_helper
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# the open spans of each thread or asyncio task, innermost last
+_open_spans: ContextVar[Tuple["Span", ...]] = ContextVar("open_spans", default=())
+# whether the innermost traced method is a coroutine, if any is running
+_in_traced_coroutine: ContextVar[Optional[bool]] = ContextVar(
+    "in_traced_coroutine", default=None
+)
+
+
+@dataclass
+class Span:
+    name: str
+    span_id: int
+    parent_id: Optional[int]
+    start_time: float
+    duration: float = 0.0
+    llm_calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cache_hits: int = 0
+    cache_misses: int = 0
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class _StageStats:
+    count: int = 0
+    total_time: float = 0.0
+    max_time: float = 0.0
+    llm_calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cache_hits: int = 0
+    cache_misses: int = 0
+
+
+def get_current_span() -> Optional[Span]:
+    """Get the innermost open span of the current thread or task, if any."""
+    spans = _open_spans.get()
+    return spans[-1] if spans else None
+
+
+def _in_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def _dispatched_async() -> Optional[bool]:
+    """Whether callbacks are being dispatched by an AsyncCallbackManager.
+
+    The async manager only runs in the event loop, for calls awaited by a
+    coroutine. A sync call made in the event loop (e.g. by a sync traced method
+    called from a coroutine) goes through the sync manager, which calls async
+    handlers without awaiting them. So in the event loop, this is whether the
+    innermost traced method is a coroutine, or None outside of traced methods.
+    """
+    if not _in_event_loop():
+        return False
+    return _in_traced_coroutine.get()
+
+
+def record_cache_lookup(hit: bool) -> None:
+    """Count a cache lookup in the current span."""
+    span = get_current_span()
+    if span is None:
+        return
+    if hit:
+        span.cache_hits += 1
+    else:
+        span.cache_misses += 1
+
+
+class Tracer:
+    """Tracer
+
+    Records spans, along with a summary of every stage. Spans are nested per
+    thread and asyncio task: LLM calls and cache lookups are counted in the
+    innermost open span, while a span's wall time includes the spans nested in
+    it. Several tracers can instrument the same LLM, and each one only counts
+    the calls made in its own spans.
+
+    Args:
+        path (Optional[str]): A JSONL file each span is appended to as soon as
+        it ends.
+        max_spans (int): The number of recent spans kept in memory for
+        export_jsonl. The summary always covers every span.
+
+    """
+
+    def __init__(self, path: Optional[str] = None, max_spans: int = 10000) -> None:
+        self.path = path
+        self.spans: Deque[Span] = deque(maxlen=max_spans)
+        self._stats: Dict[str, _StageStats] = {}
+        self._span_ids = itertools.count()
+        # the start time of every open span, by the id() of the span
+        self._start_counters: Dict[int, float] = {}
+        self._lock = threading.Lock()
+        self.callback_handler = TracingCallbackHandler(self)
+        self.async_callback_handler = AsyncTracingCallbackHandler(self.callback_handler)
+
+    def current_span(self) -> Optional[Span]:
+        """Get the innermost span of this tracer open in the current thread or task."""
+        for span in reversed(_open_spans.get()):
+            if id(span) in self._start_counters:
+                return span
+        return None
+
+    def start_span(self, name: str, **attributes: Any) -> Span:
+        """Open a span in the current thread or task. Close it with end_span."""
+        parent = self.current_span()
+        span = Span(
+            name=name,
+            span_id=next(self._span_ids),
+            parent_id=parent.span_id if parent is not None else None,
+            start_time=time.time(),
+            attributes=attributes,
+        )
+        with self._lock:
+            self._start_counters[id(span)] = time.perf_counter()
+        _open_spans.set(_open_spans.get() + (span,))
+        return span
+
+    def end_span(self, span: Span) -> None:
+        end_counter = time.perf_counter()
+        open_spans = _open_spans.get()
+        if span in open_spans:
+            _open_spans.set(tuple(x for x in open_spans if x is not span))
+
+        with self._lock:
+            span.duration = end_counter - self._start_counters.pop(id(span))
+            self.spans.append(span)
+            stats = self._stats.setdefault(span.name, _StageStats())
+            stats.count += 1
+            stats.total_time += span.duration
+            stats.max_time = max(stats.max_time, span.duration)
+            stats.llm_calls += span.llm_calls
+            stats.prompt_tokens += span.prompt_tokens
+            stats.completion_tokens += span.completion_tokens
+            stats.cache_hits += span.cache_hits
+            stats.cache_misses += span.cache_misses
+            if self.path is not None:
+                with open(self.path, "a") as f:
+                    f.write(json.dumps(asdict(span), default=str) + "\n")
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Span]:
+        """Record a span around the body of the with statement."""
+        span = self.start_span(name, **attributes)
+        try:
+            yield span
+        finally:
+            self.end_span(span)
+
+    def instrument(self, obj: Any) -> None:
+        """Count the LLM calls of a langchain LLM, or the calls to a tool."""
+        handlers = [self.callback_handler, self.async_callback_handler]
+        callbacks = getattr(obj, "callbacks", None)
+        if callbacks is None:
+            obj.callbacks = handlers
+        elif isinstance(callbacks, list):
+            for handler in handlers:
+                if handler not in callbacks:
+                    callbacks.append(handler)
+        else:
+            for handler in handlers:
+                callbacks.add_handler(handler)
+
+    def uninstrument(self, obj: Any) -> None:
+        """Stop counting the calls of an instrumented LLM or tool."""
+        handlers = [self.callback_handler, self.async_callback_handler]
+        callbacks = getattr(obj, "callbacks", None)
+        if isinstance(callbacks, list):
+            obj.callbacks = [x for x in callbacks if x not in handlers]
+        elif callbacks is not None:
+            for handler in handlers:
+                if handler in callbacks.handlers:
+                    callbacks.remove_handler(handler)
+
+    def export_jsonl(self, path: str) -> None:
+        """Write the spans kept in memory to a JSONL file."""
+        with self._lock:
+            spans = list(self.spans)
+        with open(path, "w") as f:
+            for span in spans:
+                f.write(json.dumps(asdict(span), default=str) + "\n")
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """Get the totals of every stage, the most time consuming first."""
+        with self._lock:
+            rows = [
+                {
+                    "stage": name,
+                    "count": stage.count,
+                    "total_s": stage.total_time,
+                    "mean_ms": stage.total_time / stage.count * 1000,
+                    "max_ms": stage.max_time * 1000,
+                    "llm_calls": stage.llm_calls,
+                    "prompt_tokens": stage.prompt_tokens,
+                    "completion_tokens": stage.completion_tokens,
+                    "cache_hits": stage.cache_hits,
+                    "cache_misses": stage.cache_misses,
+                }
+                for name, stage in self._stats.items()
+            ]
+        return sorted(rows, key=lambda x: -x["total_s"])
+
+    def format_summary(self) -> str:
+        """Format the summary as a text table."""
+        lines = [
+            f"{'stage':<28} {'count':>6} {'total (s)':>10} {'mean (ms)':>10} "
+            f"{'max (ms)':>10} {'LLM calls':>10} {'prompt tok':>11} "
+            f"{'compl. tok':>11} {'cache hits':>11}"
+        ]
+        for row in self.summary():
+            lines.append(
+                f"{row['stage']:<28} {row['count']:>6} {row['total_s']:>10.2f} "
+                f"{row['mean_ms']:>10.1f} {row['max_ms']:>10.1f} "
+                f"{row['llm_calls']:>10} {row['prompt_tokens']:>11} "
+                f"{row['completion_tokens']:>11} "
+                f"{row['cache_hits']:>5}/{row['cache_hits'] + row['cache_misses']:<5}"
+            )
+        return "\n".join(lines)
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """Counts LLM calls and tokens in the current span, and traces tool calls.
+
+    Only calls made while one of the tracer's spans is open are counted.
+
+    Token usage reported by the LLM (like OpenAI's) is used when available,
+    otherwise (e.g. when streaming) tokens are counted with the LlamaIndex
+    tokenizer.
+    """
+
+    def __init__(self, tracer: Tracer) -> None:
+        self.tracer = tracer
+        self._prompts: Dict[UUID, List[str]] = {}
+        self._tool_spans: Dict[UUID, Span] = {}
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "TracingCallbackHandler":
+        # langchain copies handlers for every call, but the counts must be shared
+        return self
+
+    @property
+    def ignore_llm(self) -> bool:
+        # async calls run sync handlers in a thread, outside of the open spans,
+        # so they are traced by the AsyncTracingCallbackHandler instead
+        return _dispatched_async() is not False
+
+    @property
+    def ignore_agent(self) -> bool:
+        return _dispatched_async() is not False
+
+    def on_llm_start(
+        self,
+        serialized: Dict[str, Any],
+        prompts: List[str],
+        *,
+        run_id: UUID,
+        **kwargs: Any,
+    ) -> None:
+        self._prompts[run_id] = prompts
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        prompts = self._prompts.pop(run_id, [])
+        span = self.tracer.current_span()
+        llm_output = response.llm_output or {}
+        if span is None or llm_output.get("cached"):
+            return
+
+        span.llm_calls += 1
+        token_usage = llm_output.get("token_usage")
+        if token_usage:
+            span.prompt_tokens += token_usage.get("prompt_tokens", 0)
+            span.completion_tokens += token_usage.get("completion_tokens", 0)
+            return
+        tokenizer = globals_helper.tokenizer
+        span.prompt_tokens += sum(len(tokenizer(x)) for x in prompts)
+        span.completion_tokens += sum(
+            len(tokenizer(generation.text))
+            for generations in response.generations
+            for generation in generations
+        )
+
+    def on_llm_error(
+        self, error: BaseException, *, run_id: UUID, **kwargs: Any
+    ) -> None:
+        self._prompts.pop(run_id, None)
+
+    def on_tool_start(
+        self,
+        serialized: Dict[str, Any],
+        input_str: str,
+        *,
+        run_id: UUID,
+        **kwargs: Any,
+    ) -> None:
+        if self.tracer.current_span() is None:
+            # called by a run traced by another tracer, or not traced at all
+            return
+        name = serialized.get("name", "unknown")
+        self._tool_spans[run_id] = self.tracer.start_span(f"tool:{name}")
+
+    def _end_tool_span(self, run_id: UUID) -> None:
+        span = self._tool_spans.pop(run_id, None)
+        if span is not None:
+            self.tracer.end_span(span)
+
+    def on_tool_end(self, output: str, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end_tool_span(run_id)
+
+    def on_tool_error(
+        self, error: BaseException, *, run_id: UUID, **kwargs: Any
+    ) -> None:
+        self._end_tool_span(run_id)
+
+
+class AsyncTracingCallbackHandler(AsyncCallbackHandler):
+    """Traces the async calls of LLMs and tools with a TracingCallbackHandler.
+
+    Async handlers run in the event loop, in a copy of the context of the
+    traced coroutine, so they see its open spans.
+    """
+
+    def __init__(self, handler: TracingCallbackHandler) -> None:
+        self.handler = handler
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "AsyncTracingCallbackHandler":
+        return self
+
+    @property
+    def ignore_llm(self) -> bool:
+        return _dispatched_async() is not True
+
+    @property
+    def ignore_agent(self) -> bool:
+        return _dispatched_async() is not True
+
+    async def on_llm_start(
+        self, serialized: Dict[str, Any], prompts: List[str], **kwargs: Any
+    ) -> None:
+        self.handler.on_llm_start(serialized, prompts, **kwargs)
+
+    async def on_llm_end(self, response: LLMResult, **kwargs: Any) -> None:
+        self.handler.on_llm_end(response, **kwargs)
+
+    async def on_llm_error(self, error: BaseException, **kwargs: Any) -> None:
+        self.handler.on_llm_error(error, **kwargs)
+
+    async def on_tool_start(
+        self, serialized: Dict[str, Any], input_str: str, **kwargs: Any
+    ) -> None:
+        self.handler.on_tool_start(serialized, input_str, **kwargs)
+
+    async def on_tool_end(self, output: str, **kwargs: Any) -> None:
+        self.handler.on_tool_end(output, **kwargs)
+
+    async def on_tool_error(self, error: BaseException, **kwargs: Any) -> None:
+        self.handler.on_tool_error(error, **kwargs)
+
+
+def traced(name: str) -> Callable[[F], F]:
+    """Record a span around a method or coroutine, if its object has a tracer."""
+
+    def decorator(func: F) -> F:
+        if asyncio.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(self: Any, *args: Any, **kwargs: Any) -> Any:
+                tracer: Optional[Tracer] = getattr(self, "tracer", None)
+                if tracer is None:
+                    return await func(self, *args, **kwargs)
+                token = _in_traced_coroutine.set(True)
+                try:
+                    with tracer.span(name):
+                        return await func(self, *args, **kwargs)
+                finally:
+                    _in_traced_coroutine.reset(token)
+
+            return cast(F, async_wrapper)
+
+        @functools.wraps(func)
+        def wrapper(self: Any, *args: Any, **kwargs: Any) -> Any:
+            tracer: Optional[Tracer] = getattr(self, "tracer", None)
+            if tracer is None:
+                return func(self, *args, **kwargs)
+            token = _in_traced_coroutine.set(False)
+            try:
+                with tracer.span(name):
+                    return func(self, *args, **kwargs)
+            finally:
+                _in_traced_coroutine.reset(token)
+
+        return cast(F, wrapper)
+
+    return decorator
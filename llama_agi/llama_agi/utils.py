@@ -1,7 +1,13 @@
-from typing import Any, List, Optional
+import asyncio
+from typing import Any, List, Optional, Sequence
 
 from llama_index import GPTVectorStoreIndex, GPTListIndex, ServiceContext, Document
+from llama_index.data_structs.node import Node
 from llama_index.indices.base import BaseGPTIndex
+from llama_index.indices.query.base import BaseQueryEngine
+from llama_index.prompts.default_prompts import DEFAULT_TEXT_QA_PROMPT
+from llama_index.prompts.prompts import QuestionAnswerPrompt, RefinePrompt
+from llama_index.utils import temp_set_attrs
 
 
 def initialize_task_list_index(
@@ -10,6 +16,194 @@ def initialize_task_list_index(
     return GPTListIndex.from_documents(documents, service_context=service_context)
 
 
+class TaskListIndex:
+    """Task List Index
+
+    A list of task documents, paired with a list index that is only built
+    when a query engine is requested.
+
+    Once built, the index is updated in place: appended documents are inserted
+    the next time it is used, and inserting or popping a task inserts or
+    deletes its nodes, keeping them in task order. Only reset() (e.g. after
+    re-prioritization) makes the index be built again.
+
+    Args:
+        documents (List[Document]): The initial list of task documents.
+        service_context (ServiceContext): The LlamaIndex service context used
+        when building the index.
+
+    """
+
+    def __init__(
+        self,
+        documents: Optional[List[Document]] = None,
+        service_context: Optional[ServiceContext] = None,
+    ) -> None:
+        self.documents: List[Document] = documents if documents is not None else []
+        self._service_context = service_context
+        self._index: Optional[GPTListIndex] = None
+        # node ids of each indexed document, in the order of self.documents
+        self._node_ids: List[List[str]] = []
+
+    @property
+    def _num_indexed(self) -> int:
+        return len(self._node_ids)
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def append(self, document: Document) -> None:
+        """Add a task to the end of the list."""
+        self.documents.append(document)
+
+    def insert(self, position: int, document: Document) -> None:
+        """Insert a task at the given position."""
+        if position < 0:
+            position = max(len(self.documents) + position, 0)
+        if position >= len(self.documents):
+            self.append(document)
+            return
+        self.documents.insert(position, document)
+        if self._index is not None and position <= self._num_indexed:
+            self._insert_nodes(position, document)
+
+    def pop(self, position: int = -1) -> Document:
+        """Remove and return the task at the given position (default last)."""
+        if position < 0:
+            position += len(self.documents)
+        document = self.documents.pop(position)
+        if self._index is not None and position < self._num_indexed:
+            self._delete_nodes(position)
+        return document
+
+    def reset(self, documents: List[Document]) -> None:
+        """Replace the whole task list, e.g. after re-prioritization."""
+        self.documents = documents
+        self._index = None
+        self._node_ids = []
+
+    def _get_nodes(self, document: Document) -> List[Node]:
+        assert self._index is not None
+        node_parser = self._index.service_context.node_parser
+        return node_parser.get_nodes_from_documents([document])
+
+    def _get_offset(self, position: int) -> int:
+        """Get the position of the first node of a document in the index."""
+        return sum(len(x) for x in self._node_ids[:position])
+
+    def _insert_nodes(self, position: int, document: Document) -> None:
+        assert self._index is not None
+        nodes = self._get_nodes(document)
+        node_ids = [x.get_doc_id() for x in nodes]
+        self._index.docstore.add_documents(nodes, allow_update=True)
+        offset = self._get_offset(position)
+        self._index.index_struct.nodes[offset:offset] = node_ids
+        self._node_ids.insert(position, node_ids)
+
+    def _delete_nodes(self, position: int) -> None:
+        assert self._index is not None
+        offset = self._get_offset(position)
+        node_ids = self._node_ids.pop(position)
+        del self._index.index_struct.nodes[offset : offset + len(node_ids)]
+        for node_id in node_ids:
+            self._index.docstore.delete_document(node_id, raise_error=False)
+
+    @property
+    def index(self) -> BaseGPTIndex[Any]:
+        """Return the list index, building or extending it if needed."""
+        if self._index is None:
+            self._index = GPTListIndex(nodes=[], service_context=self._service_context)
+        for position in range(self._num_indexed, len(self.documents)):
+            self._insert_nodes(position, self.documents[position])
+        return self._index
+
+    def as_query_engine(self, **kwargs: Any) -> BaseQueryEngine:
+        return self.index.as_query_engine(**kwargs)
+
+
+async def aquery_documents(
+    documents: Sequence[Document],
+    query_str: str,
+    text_qa_template: QuestionAnswerPrompt,
+    refine_template: RefinePrompt,
+    service_context: Optional[ServiceContext] = None,
+) -> str:
+    """Query a list of documents like a list index, with async LLM calls.
+
+    The documents are packed into as few prompts as possible, the first chunk
+    is answered with text_qa_template and the answer is refined with each
+    following chunk. This is the default query of a list index, whose aquery
+    still makes its LLM calls synchronously.
+    """
+    service_context = service_context or ServiceContext.from_defaults()
+    prompt_helper = service_context.prompt_helper
+    llm_predictor = service_context.llm_predictor
+
+    text_qa_template = text_qa_template.partial_format(query_str=query_str)
+    max_prompt = prompt_helper.get_biggest_prompt(
+        [text_qa_template, refine_template.partial_format(query_str=query_str)]
+    )
+    with temp_set_attrs(prompt_helper, use_chunk_size_limit=False):
+        text_chunks = prompt_helper.compact_text_chunks(
+            max_prompt, [x.get_text() for x in documents]
+        )
+
+    response: Optional[str] = None
+    for text_chunk in text_chunks:
+        if response is None:
+            response, _ = await llm_predictor.apredict(
+                text_qa_template, context_str=text_chunk
+            )
+        else:
+            response, _ = await llm_predictor.apredict(
+                refine_template.partial_format(
+                    query_str=query_str, existing_answer=response
+                ),
+                context_msg=text_chunk,
+            )
+    return response or "Empty Response"
+
+
+async def asummarize_documents(
+    documents: Sequence[Document],
+    query_str: str,
+    service_context: Optional[ServiceContext] = None,
+    num_children: int = 10,
+) -> str:
+    """Summarize documents like a tree_summarize query, with async LLM calls.
+
+    The text is split into chunks small enough for num_children of them to fit
+    in one prompt, and groups of chunks are summarized concurrently until a
+    single prompt is left.
+    """
+    service_context = service_context or ServiceContext.from_defaults()
+    llm_predictor = service_context.llm_predictor
+    text_qa_template = DEFAULT_TEXT_QA_PROMPT.partial_format(query_str=query_str)
+
+    text_splitter = service_context.prompt_helper.get_text_splitter_given_prompt(
+        text_qa_template, num_children
+    )
+    text_chunks = text_splitter.split_text(
+        "\n\n".join(x.get_text().strip() for x in documents)
+    )
+    while len(text_chunks) > num_children:
+        summaries = await asyncio.gather(
+            *(
+                llm_predictor.apredict(
+                    text_qa_template,
+                    context_str="\n\n".join(text_chunks[i : i + num_children]),
+                )
+                for i in range(0, len(text_chunks), num_children)
+            )
+        )
+        text_chunks = [summary for summary, _ in summaries]
+
+    summary, _ = await llm_predictor.apredict(
+        text_qa_template, context_str="\n\n".join(text_chunks)
+    )
+    return summary
+
+
 def initialize_search_index(
     documents: List[Document], service_context: Optional[ServiceContext] = None
 ) -> BaseGPTIndex[Any]:
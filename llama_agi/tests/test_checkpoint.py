@@ -0,0 +1,115 @@
+import copy
+from pathlib import Path
+from typing import Any, Dict, List
+
+import pytest
+from llama_index.utils import globals_helper
+
+from llama_agi.checkpoint import CheckpointStore, CheckpointWriter
+from llama_agi.task_manager import LlamaTaskManager
+
+OBJECTIVE = "Plan a product launch"
+PROMPTS = {"execution_prompt": "Do {cur_task}"}
+
+
+def start_run(store: CheckpointStore, run_id: str = "run") -> CheckpointWriter:
+    writer = store.open(run_id)
+    writer.write_start(OBJECTIVE, "Create a list of tasks", None, PROMPTS)
+    return writer
+
+
+def test_task_manager_round_trip(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(globals_helper, "_tokenizer", str.split)
+    task_manager = LlamaTaskManager(["Research the competitors"])
+    task_manager.add_new_tasks(["Write the press release", "Book the launch venue"])
+    task = task_manager.get_next_task()
+    task_manager.add_completed_task(task, "Booked the town hall")
+    state = task_manager.get_state()
+
+    store = CheckpointStore(str(tmp_path))
+    writer = start_run(store)
+    writer.write_iteration(1, "Booked a venue", state)
+    writer.close()
+
+    run_state = store.load("run")
+    assert run_state.objective == OBJECTIVE
+    assert run_state.agent_prompts == PROMPTS
+    assert run_state.iteration == 1
+    assert run_state.completed_tasks_summary == "Booked a venue"
+    assert run_state.task_manager_state == state
+
+    restored = LlamaTaskManager([])
+    restored.load_state(run_state.task_manager_state)
+    assert restored.get_state() == state
+    assert restored.get_next_task() == "Write the press release"
+
+
+def test_replay_multiple_diffs(tmp_path: Path) -> None:
+    states: List[Dict[str, Any]] = [
+        {"tasks": ["a", "b", "c"], "scores": {"a": 1, "b": 2}, "summary": "0"},
+        # pop from the end and append
+        {"tasks": ["a", "b", "d", "e"], "scores": {"a": 1, "b": 3}, "summary": "0"},
+        # reorder, remove a key and add a new value
+        {"tasks": ["e", "a"], "scores": {"e": 4}, "summary": "2", "new": [1]},
+        # unchanged
+        {"tasks": ["e", "a"], "scores": {"e": 4}, "summary": "2", "new": [1]},
+    ]
+    store = CheckpointStore(str(tmp_path))
+    writer = start_run(store)
+    for iteration, state in enumerate(states):
+        writer.write_iteration(iteration, f"summary {iteration}", copy.deepcopy(state))
+        assert store.load("run").task_manager_state == state
+    writer.close()
+
+    # a resumed run diffs its records against the loaded state
+    run_state = store.load("run")
+    writer = store.open("run", run_state)
+    final_state: Dict[str, Any] = {"tasks": ["e"], "scores": {}, "summary": "3"}
+    writer.write_iteration(4, "summary 4", final_state)
+    writer.close()
+
+    run_state = store.load("run")
+    assert run_state.iteration == 4
+    assert run_state.completed_tasks_summary == "summary 4"
+    assert run_state.task_manager_state == {**final_state, "new": [1]}
+
+
+def test_truncated_last_line(tmp_path: Path) -> None:
+    store = CheckpointStore(str(tmp_path))
+    writer = start_run(store)
+    writer.write_iteration(1, "summary 1", {"tasks": ["a", "b"]})
+    writer.write_iteration(2, "summary 2", {"tasks": ["a", "c"]})
+    writer.close()
+
+    path = Path(store.get_path("run"))
+    data = path.read_bytes()
+    path.write_bytes(data[: data.rfind(b"summary 2")])
+
+    run_state = store.load("run")
+    assert run_state.iteration == 1
+    assert run_state.task_manager_state == {"tasks": ["a", "b"]}
+
+    # resuming drops the partial record before appending
+    writer = store.open("run", run_state)
+    writer.write_iteration(2, "summary 2", {"tasks": ["a", "d"]})
+    writer.close()
+    run_state = store.load("run")
+    assert run_state.iteration == 2
+    assert run_state.task_manager_state == {"tasks": ["a", "d"]}
+
+
+def test_corrupt_record_before_last_line(tmp_path: Path) -> None:
+    store = CheckpointStore(str(tmp_path))
+    writer = start_run(store)
+    writer.write_iteration(1, "summary 1", {"tasks": ["a"]})
+    writer.write_iteration(2, "summary 2", {"tasks": ["b"]})
+    writer.close()
+
+    path = Path(store.get_path("run"))
+    lines = path.read_text().split("\n")
+    lines[1] = lines[1][:10]
+    path.write_text("\n".join(lines))
+    with pytest.raises(ValueError, match="Corrupt record on line 2"):
+        store.load("run")
@@ -0,0 +1,74 @@
+from pathlib import Path
+from typing import List
+
+import pytest
+from langchain.llms.fake import FakeListLLM
+from llama_index import LLMPredictor, ServiceContext
+from llama_index.embeddings.base import BaseEmbedding
+from llama_index.utils import globals_helper
+
+# importing llama_agi.tools creates the default note store, whose
+# OpenAIEmbedding would download the tiktoken vocabulary
+globals_helper._tokenizer = str.split
+
+from llama_agi.tools import NoteTakingTools  # noqa: E402
+from llama_agi.tools.NoteStore import NoteStore  # noqa: E402
+
+
+class FakeEmbedding(BaseEmbedding):
+    """Embeds texts as dim sized vectors of their length."""
+
+    def __init__(self, dim: int) -> None:
+        super().__init__(tokenizer=str.split)
+        self.dim = dim
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return [float(len(query))] * self.dim
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return [float(len(text))] * self.dim
+
+
+def test_reload_with_other_embedding_size(tmp_path: Path) -> None:
+    store = NoteStore(persist_dir=str(tmp_path), embed_model=FakeEmbedding(8))
+    store.add("first note")
+    store.flush()
+
+    store = NoteStore(persist_dir=str(tmp_path), embed_model=FakeEmbedding(4))
+    store.add("second note")
+    with pytest.raises(ValueError, match="size 4.*size 8"):
+        store.flush()
+    with pytest.raises(ValueError, match="size 4.*size 8"):
+        store.search("note")
+
+
+def test_reload_with_same_embedding_size(tmp_path: Path) -> None:
+    store = NoteStore(persist_dir=str(tmp_path), embed_model=FakeEmbedding(8))
+    store.add("first note")
+    store.flush()
+
+    store = NoteStore(persist_dir=str(tmp_path), embed_model=FakeEmbedding(8))
+    store.add("second note")
+    assert store.search("note") == ["first note", "second note"]
+
+
+def test_search_notes_answers_from_notes(monkeypatch: pytest.MonkeyPatch) -> None:
+    llm = FakeListLLM(responses=["The launch is on Friday."])
+    monkeypatch.setattr(
+        NoteTakingTools, "note_store", NoteStore(embed_model=FakeEmbedding(4))
+    )
+    monkeypatch.setattr(
+        NoteTakingTools,
+        "notes_service_context",
+        ServiceContext.from_defaults(
+            llm_predictor=LLMPredictor(llm=llm), embed_model=FakeEmbedding(4)
+        ),
+    )
+
+    assert NoteTakingTools.search_notes.run("launch") == (
+        "No notes have been recorded yet."
+    )
+    NoteTakingTools.record_note.run("The launch moved to Friday")
+    assert NoteTakingTools.search_notes.run("When is the launch?") == (
+        "The launch is on Friday."
+    )
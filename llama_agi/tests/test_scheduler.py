@@ -0,0 +1,204 @@
+import threading
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+import pytest
+from llama_index.callbacks import CallbackManager
+from llama_index.callbacks.base import BaseCallbackHandler
+from llama_index.callbacks.schema import CBEventType
+from llama_index.embeddings.base import BaseEmbedding
+
+from llama_agi import scheduler
+from llama_agi.scheduler import LLMScheduler, Priority, ScheduledEmbedding
+
+
+class FakeClock:
+    """Stands in for the time module of the scheduler; sleeping advances it."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def perf_counter(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.now += seconds
+
+
+class FakeEvent:
+    """A threading.Event whose timed waits advance the fake clock instead."""
+
+    def __init__(self, clock: FakeClock) -> None:
+        self._clock = clock
+        self._event = threading.Event()
+
+    def set(self) -> None:
+        self._event.set()
+
+    def clear(self) -> None:
+        self._event.clear()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        if timeout is None:
+            return self._event.wait()
+        if not self._event.is_set():
+            self._clock.sleep(timeout)
+        return True
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> FakeClock:
+    clock = FakeClock()
+    monkeypatch.setattr(scheduler, "time", clock)
+    monkeypatch.setattr(
+        scheduler,
+        "threading",
+        SimpleNamespace(Lock=threading.Lock, Event=lambda: FakeEvent(clock)),
+    )
+    return clock
+
+
+class RateLimitError(Exception):
+    http_status = 429
+
+
+def test_requests_per_minute(clock: FakeClock) -> None:
+    llm_scheduler = LLMScheduler(requests_per_minute=60)
+    call_times = [llm_scheduler.run(clock.monotonic) for _ in range(4)]
+    assert call_times == pytest.approx([0.0, 1.0, 2.0, 3.0])
+
+
+def test_tokens_per_minute(clock: FakeClock) -> None:
+    # 10 tokens a second, and calls of 20 tokens go into debt
+    llm_scheduler = LLMScheduler(tokens_per_minute=600)
+    call_times = [llm_scheduler.run(clock.monotonic, tokens=20) for _ in range(3)]
+    assert call_times == pytest.approx([0.0, 2.0, 4.0])
+
+
+def test_rate_limited_call_is_retried(clock: FakeClock) -> None:
+    llm_scheduler = LLMScheduler(
+        requests_per_minute=600, initial_backoff=5.0, jitter=0.0
+    )
+    attempts: List[float] = []
+
+    def call() -> str:
+        attempts.append(clock.monotonic())
+        if len(attempts) == 1:
+            raise RateLimitError()
+        return "done"
+
+    assert llm_scheduler.run(call) == "done"
+    assert attempts == pytest.approx([0.0, 5.0])
+    metrics = llm_scheduler.metrics()
+    assert metrics["rate_limited"] == 1
+    assert metrics["retries"] == 1
+    # halved by the 429, then recovering with the successful call
+    assert metrics["rate_multiplier"] == pytest.approx(0.55)
+
+
+def test_waiting_calls_are_served_by_priority() -> None:
+    llm_scheduler = LLMScheduler(max_concurrency=1)
+    release = threading.Event()
+    order: List[str] = []
+
+    blocker = threading.Thread(target=llm_scheduler.run, args=(release.wait,))
+    blocker.start()
+    while llm_scheduler.num_in_flight == 0:
+        time.sleep(0.001)
+
+    threads = []
+    waiting = [
+        ("summarize", Priority.SUMMARIZATION),
+        ("create 1", Priority.TASK_CREATION),
+        ("execute", Priority.EXECUTION),
+        ("create 2", Priority.TASK_CREATION),
+    ]
+    for i, (name, priority) in enumerate(waiting):
+        thread = threading.Thread(
+            target=llm_scheduler.run,
+            args=(lambda name=name: order.append(name),),
+            kwargs={"priority": priority},
+        )
+        thread.start()
+        threads.append(thread)
+        # wait for each call to queue, so arrival order is known
+        while llm_scheduler.metrics()["queue_depth"] < i + 1:
+            time.sleep(0.001)
+
+    release.set()
+    for thread in [blocker, *threads]:
+        thread.join(timeout=5)
+
+    assert order == ["execute", "create 1", "create 2", "summarize"]
+    metrics = llm_scheduler.metrics()
+    assert metrics["max_in_flight"] == 1
+    assert metrics["task_creation_calls"] == 2
+
+
+class RecordingHandler(BaseCallbackHandler):
+    def __init__(self) -> None:
+        super().__init__(event_starts_to_ignore=[], event_ends_to_ignore=[])
+        self.events: List[CBEventType] = []
+
+    def on_event_start(
+        self,
+        event_type: CBEventType,
+        payload: Optional[Dict[str, Any]] = None,
+        event_id: str = "",
+        **kwargs: Any,
+    ) -> str:
+        self.events.append(event_type)
+        return event_id
+
+    def on_event_end(
+        self,
+        event_type: CBEventType,
+        payload: Optional[Dict[str, Any]] = None,
+        event_id: str = "",
+        **kwargs: Any,
+    ) -> None:
+        pass
+
+    def start_trace(self, trace_id: Optional[str] = None) -> None:
+        pass
+
+    def end_trace(
+        self,
+        trace_id: Optional[str] = None,
+        trace_map: Optional[Dict[str, List[str]]] = None,
+    ) -> None:
+        pass
+
+
+class FakeEmbedding(BaseEmbedding):
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return [float(len(query))]
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return [float(len(text))]
+
+
+def test_scheduled_embedding_shares_callback_manager() -> None:
+    handler = RecordingHandler()
+    embed_model = FakeEmbedding(
+        embed_batch_size=2,
+        tokenizer=str.split,
+        callback_manager=CallbackManager([handler]),
+    )
+    llm_scheduler = LLMScheduler()
+    scheduled = ScheduledEmbedding(embed_model, llm_scheduler)
+    assert scheduled.callback_manager is embed_model.callback_manager
+    assert scheduled._embed_batch_size == 2
+
+    for i, text in enumerate(["a", "bb", "ccc"]):
+        scheduled.queue_text_for_embedding(str(i), text)
+    _, embeddings = scheduled.get_queued_text_embeddings()
+
+    assert embeddings == [[1.0], [2.0], [3.0]]
+    # one call and one embedding event per batch
+    assert llm_scheduler.metrics()["embedding_calls"] == 2
+    assert handler.events == [CBEventType.EMBEDDING] * 2
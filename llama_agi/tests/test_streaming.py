@@ -0,0 +1,93 @@
+from pathlib import Path
+from typing import Any, List, Optional
+
+import langchain
+import pytest
+from langchain.callbacks.manager import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain.chat_models.base import BaseChatModel
+from langchain.schema import AIMessage, BaseMessage, ChatGeneration, ChatResult
+from llama_index.utils import globals_helper
+
+from llama_agi.completion_cache import enable_completion_cache, get_base_llm
+from llama_agi.execution_agent.SimpleExecutionAgent import SimpleExecutionAgent
+from llama_agi.execution_agent.streaming import ExecutionEvent
+
+TASK = {
+    "objective": "Plan a product launch",
+    "completed_tasks_summary": "Nothing yet",
+    "task": "Write a press release",
+}
+OUTPUT = "The press release is written."
+
+
+class FakeStreamingChatModel(BaseChatModel):
+    """Streams its output word by word, like a chat model with streaming=True."""
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+    ) -> ChatResult:
+        for word in OUTPUT.split(" "):
+            if run_manager:
+                run_manager.on_llm_new_token(word + " ")
+        message = AIMessage(content=OUTPUT)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+    ) -> ChatResult:
+        raise NotImplementedError
+
+
+@pytest.fixture
+def agent(monkeypatch: pytest.MonkeyPatch) -> SimpleExecutionAgent:
+    # count tokens without downloading the tiktoken vocabulary
+    monkeypatch.setattr(globals_helper, "_tokenizer", str.split)
+    return SimpleExecutionAgent(llm=FakeStreamingChatModel())
+
+
+def get_token_events(agent: SimpleExecutionAgent) -> List[ExecutionEvent]:
+    events: List[ExecutionEvent] = []
+    agent.execute_task_streaming(events.append, **TASK)
+    assert events[-1].type == "result"
+    return [x for x in events if x.type == "token"]
+
+
+@pytest.mark.parametrize(
+    "model_name,model_class",
+    [("text-davinci-003", "OpenAI"), ("gpt-3.5-turbo", "ChatOpenAI")],
+)
+def test_default_llm_streams(
+    monkeypatch: pytest.MonkeyPatch, model_name: str, model_class: str
+) -> None:
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.setattr(globals_helper, "_tokenizer", str.split)
+    llm: Any = get_base_llm(SimpleExecutionAgent(model_name=model_name)._llm)
+    assert type(llm).__name__ == model_class
+    assert llm.streaming
+
+
+def test_cached_chat_model_streams_tokens(agent: SimpleExecutionAgent) -> None:
+    assert len(get_token_events(agent)) > 1
+
+
+def test_cached_chat_model_streams_tokens_with_cache(
+    agent: SimpleExecutionAgent, monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    monkeypatch.setattr(langchain, "llm_cache", None)
+    cache = enable_completion_cache(str(tmp_path / "cache.db"))
+    try:
+        assert len(get_token_events(agent)) > 1
+        # a cached completion is reported as a single token
+        tokens = get_token_events(agent)
+        assert [x.text for x in tokens] == [OUTPUT]
+    finally:
+        cache.close()
@@ -0,0 +1,48 @@
+import pytest
+
+from llama_agi.task_manager.TaskDeduplicator import TaskDeduplicator
+
+DISTINCT_TASKS = [
+    ("Summarize chapter 1 of the book", "Summarize chapter 11 of the book"),
+    (
+        "Collect the sales figures of the past week",
+        "Collect the sales figures of the past month",
+    ),
+    ("Research sub-problem number 17", "Research sub-problem number 1"),
+]
+
+
+@pytest.mark.parametrize("seen,task", DISTINCT_TASKS)
+def test_distinct_tasks_are_kept(seen: str, task: str) -> None:
+    deduplicator = TaskDeduplicator()
+    deduplicator.add(seen)
+    assert not deduplicator.is_duplicate(task)
+
+
+def test_exact_duplicates_ignore_case_and_punctuation() -> None:
+    deduplicator = TaskDeduplicator()
+    deduplicator.add("Research sub-problem number 17.")
+    assert deduplicator.is_duplicate("research  sub problem number 17")
+
+
+def test_near_duplicates_with_threshold() -> None:
+    deduplicator = TaskDeduplicator(threshold=0.5)
+    deduplicator.add("Collect the sales figures of the past week")
+    assert deduplicator.is_duplicate("Collect all the sales figures of the past week")
+    assert not deduplicator.is_duplicate("Draft a press release for the launch")
+
+
+def test_state_round_trip() -> None:
+    deduplicator = TaskDeduplicator(threshold=0.5)
+    deduplicator.add("Collect the sales figures of the past week")
+    deduplicator.add("Draft a press release")
+
+    restored = TaskDeduplicator(threshold=0.5)
+    restored.load_state(deduplicator.get_state())
+    assert len(restored) == 2
+    assert restored.is_duplicate("Collect all the sales figures of the past week")
+
+    exact_only = TaskDeduplicator()
+    exact_only.load_state(deduplicator.get_state())
+    assert exact_only.is_duplicate("draft a press release")
+    assert not exact_only.is_duplicate("Collect all the sales figures of the past week")
@@ -0,0 +1,61 @@
+from typing import List
+
+import pytest
+from langchain.llms.fake import FakeListLLM
+from llama_index import Document, LLMPredictor, ServiceContext
+from llama_index.utils import globals_helper
+
+from llama_agi.utils import TaskListIndex
+
+
+@pytest.fixture
+def task_list_index(monkeypatch: pytest.MonkeyPatch) -> TaskListIndex:
+    # chunk tasks without downloading the tiktoken vocabulary
+    monkeypatch.setattr(globals_helper, "_tokenizer", str.split)
+    service_context = ServiceContext.from_defaults(
+        llm_predictor=LLMPredictor(llm=FakeListLLM(responses=["Done"]))
+    )
+    return TaskListIndex(
+        [Document(f"Task {i}") for i in range(5)], service_context=service_context
+    )
+
+
+def get_indexed_tasks(task_list_index: TaskListIndex) -> List[str]:
+    index = task_list_index.index
+    return [index.docstore.get_node(x).get_text() for x in index.index_struct.nodes]
+
+
+def test_index_is_updated_in_place(task_list_index: TaskListIndex) -> None:
+    index = task_list_index.index
+    task_list_index.pop()
+    task_list_index.pop(1)
+    task_list_index.insert(0, Document("First task"))
+    task_list_index.insert(-1, Document("Next to last task"))
+    task_list_index.append(Document("Last task"))
+
+    assert task_list_index.index is index
+    assert get_indexed_tasks(task_list_index) == [
+        "First task",
+        "Task 0",
+        "Task 2",
+        "Next to last task",
+        "Task 3",
+        "Last task",
+    ]
+    assert len(index.docstore.docs) == len(task_list_index)
+
+
+def test_insert_before_tasks_not_indexed_yet(task_list_index: TaskListIndex) -> None:
+    task_list_index.index
+    task_list_index.append(Document("Task 5"))
+    task_list_index.insert(5, Document("Task 4.5"))
+    task_list_index.pop(0)
+
+    assert get_indexed_tasks(task_list_index) == [
+        "Task 1",
+        "Task 2",
+        "Task 3",
+        "Task 4",
+        "Task 4.5",
+        "Task 5",
+    ]
@@ -0,0 +1,69 @@
+from typing import List
+
+import pytest
+from langchain.llms.fake import FakeListLLM
+from llama_index import LLMPredictor, ServiceContext
+from llama_index.embeddings.base import BaseEmbedding
+from llama_index.utils import globals_helper
+
+from llama_agi.task_manager import LlamaTaskManager
+from llama_agi.task_manager.EmbeddingTaskScorer import EmbeddingTaskScorer
+
+OBJECTIVE = "Plan a product launch"
+TASKS = [
+    "Research the competitors",
+    "Write the press release",
+    "Book the launch venue",
+]
+
+
+class CountingEmbedding(BaseEmbedding):
+    """Embeds texts by their length, counting the texts embedded per call."""
+
+    def __init__(self) -> None:
+        super().__init__(tokenizer=str.split)
+        self.calls: List[List[str]] = []
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return [float(len(query)), 1.0]
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        self.calls.append([text])
+        return [float(len(text)), 1.0]
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        self.calls.append(list(texts))
+        return [[float(len(x)), 1.0] for x in texts]
+
+
+def make_task_manager(
+    monkeypatch: pytest.MonkeyPatch, embed_model: BaseEmbedding, responses: List[str]
+) -> LlamaTaskManager:
+    # chunk tasks without downloading the tiktoken vocabulary
+    monkeypatch.setattr(globals_helper, "_tokenizer", str.split)
+    service_context = ServiceContext.from_defaults(
+        llm_predictor=LLMPredictor(llm=FakeListLLM(responses=responses)),
+        embed_model=embed_model,
+    )
+    return LlamaTaskManager(
+        TASKS,
+        task_service_context=service_context,
+        task_scorer=EmbeddingTaskScorer(embed_model=embed_model),
+    )
+
+
+def test_prioritized_tasks_are_embedded_in_one_batch(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    embed_model = CountingEmbedding()
+    prioritized = "\n".join(f"{i + 1}. {x}" for i, x in enumerate(TASKS))
+    task_manager = make_task_manager(monkeypatch, embed_model, [prioritized] * 2)
+
+    task_manager.prioritize_tasks(OBJECTIVE)
+    assert embed_model.calls == [list(reversed(TASKS))]
+
+    # unchanged tasks keep their scores, so only new tasks are embedded
+    task_manager.add_new_tasks(["Order the launch snacks", "Hire a photographer"])
+    assert embed_model.calls[1:] == [["Order the launch snacks", "Hire a photographer"]]
+    task_manager.prioritize_tasks(OBJECTIVE)
+    assert len(embed_model.calls) == 2
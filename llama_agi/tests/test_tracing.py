@@ -0,0 +1,61 @@
+import asyncio
+import gc
+import warnings
+from typing import Dict, List, Optional
+
+import pytest
+from langchain.callbacks.manager import AsyncCallbackManagerForLLMRun
+from langchain.llms.fake import FakeListLLM
+from llama_index.utils import globals_helper
+
+from llama_agi.execution_agent.SimpleExecutionAgent import SimpleExecutionAgent
+from llama_agi.tracing import Tracer
+
+TASK = {
+    "objective": "Plan a product launch",
+    "completed_tasks_summary": "Nothing yet",
+    "task": "Write a press release",
+}
+
+
+class FakeLLM(FakeListLLM):
+    async def _acall(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+    ) -> str:
+        return self._call(prompt, stop=stop)
+
+
+@pytest.fixture
+def agent(monkeypatch: pytest.MonkeyPatch) -> SimpleExecutionAgent:
+    # count tokens without downloading the tiktoken vocabulary
+    monkeypatch.setattr(globals_helper, "_tokenizer", str.split)
+    agent = SimpleExecutionAgent(llm=FakeLLM(responses=["Done"] * 2))
+    agent.tracer = Tracer()
+    agent.tracer.instrument(agent._llm)
+    return agent
+
+
+def get_llm_calls(agent: SimpleExecutionAgent, stage: str) -> int:
+    assert agent.tracer is not None
+    return next(x["llm_calls"] for x in agent.tracer.summary() if x["stage"] == stage)
+
+
+def test_sync_call_in_event_loop_is_traced(agent: SimpleExecutionAgent) -> None:
+    async def run() -> Dict[str, str]:
+        return agent.execute_task(**TASK)
+
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        assert asyncio.run(run()) == {"output": "Done"}
+        gc.collect()
+
+    assert get_llm_calls(agent, "execute_task") == 1
+    assert not [x for x in caught if "never awaited" in str(x.message)]
+
+
+def test_async_call_is_traced(agent: SimpleExecutionAgent) -> None:
+    assert asyncio.run(agent.aexecute_task(**TASK)) == {"output": "Done"}
+    assert get_llm_calls(agent, "execute_task") == 1